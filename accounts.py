@@ -0,0 +1,130 @@
+import os
+import re
+from urllib.parse import quote
+from database import create_transactions_table
+from config import connect, data_path
+
+ACCOUNTS_DIR = 'accounts'
+MAIN_ACCOUNT = 'main'
+ALL_ACCOUNTS = 'All'
+# SQLite attaches at most 10 databases to a connection, and reports attach every
+# ledger at once, so main plus nine ledgers keeps one slot free for other tools
+MAX_ACCOUNTS = 9
+
+# Transactions without an account stay in the main database's own table
+TRANSACTION_COLUMNS = 'id, date, description, amount, category_id, payee, month, year, currency'
+# The same columns for each split of a transaction, taking the rest from its parent row
+SPLIT_COLUMNS = 't.id, t.date, t.description, s.amount, s.category_id, t.payee, t.month, t.year, t.currency'
+# Only what category reports read, so the reporting index covers the view
+AMOUNT_COLUMNS = 'date, amount, category_id, month, year, currency'
+
+
+def account_slug(name):
+    """Turn an account name into a safe file and schema name."""
+    slug = re.sub(r'[^a-z0-9]+', '_', name.strip().lower()).strip('_')
+    if not slug:
+        raise ValueError(f"Invalid account name: {name!r}")
+    return slug
+
+
+def account_path(name):
+    return data_path(ACCOUNTS_DIR, f"{account_slug(name)}.db")
+
+
+def account_schema(name):
+    return f"acct_{account_slug(name)}"
+
+
+def list_accounts():
+    """List the accounts that have their own ledger file."""
+    accounts_dir = data_path(ACCOUNTS_DIR)
+    if not os.path.isdir(accounts_dir):
+        return []
+    return sorted(f[:-3] for f in os.listdir(accounts_dir) if f.endswith('.db'))
+
+
+def check_account_limit(name):
+    """Raise ValueError if name would be a new ledger beyond MAX_ACCOUNTS."""
+    slug = account_slug(name)
+    accounts = list_accounts()
+    if slug != MAIN_ACCOUNT and slug not in accounts and len(accounts) >= MAX_ACCOUNTS:
+        raise ValueError(
+            f"Can't create account {name!r}: there are already {len(accounts)} account ledgers, "
+            f"the most reports can read at once. Use an existing account, or delete one first."
+        )
+
+
+def create_account(name):
+    """Create an account ledger file if it doesn't exist yet."""
+    check_account_limit(name)
+    os.makedirs(data_path(ACCOUNTS_DIR), exist_ok=True)
+    conn = connect(account_path(name))
+    create_transactions_table(conn.cursor())
+    conn.commit()
+    conn.close()
+    return account_slug(name)
+
+
+def delete_account(name):
+    """Drop an account by removing its ledger file."""
+    path = account_path(name)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def attach_account(conn, name, read_only=False):
+    """Attach one account's ledger to a connection and return its schema name.
+
+    With read_only the ledger is opened read-only and left as it is, which
+    needs a connection opened with uri=True.
+    """
+    schema = account_schema(name)
+    attached = [row[1] for row in conn.execute('PRAGMA database_list')]
+    if schema not in attached and read_only:
+        conn.execute('ATTACH DATABASE ? AS ' + schema, (f"file:{quote(account_path(name))}?mode=ro",))
+    elif schema not in attached:
+        check_account_limit(name)
+        os.makedirs(data_path(ACCOUNTS_DIR), exist_ok=True)
+        conn.execute('ATTACH DATABASE ? AS ' + schema, (account_path(name),))
+        # Creates the ledger, or upgrades an older one against main's categories
+        create_transactions_table(conn.cursor(), schema)
+        conn.commit()
+    return schema
+
+
+def attach_all_accounts(conn, read_only=False):
+    """Attach every account ledger and create the views across them.
+
+    all_transactions has one row per transaction. all_category_amounts is
+    what reports sum by category: every transaction's amount plus one row
+    per split, joined to its parent for the date and currency. Split parents
+    have no category, so reports that group by category skip them.
+
+    SQLite limits how many databases one connection can attach, so new
+    ledgers are refused beyond MAX_ACCOUNTS. With read_only the ledgers are
+    attached read-only, for connections that have PRAGMA query_only on.
+    """
+    accounts = list_accounts()
+    if len(accounts) > MAX_ACCOUNTS:
+        raise ValueError(f"Found {len(accounts)} account ledgers, but reports can read at most {MAX_ACCOUNTS}. "
+                         f"Delete or merge accounts in {data_path(ACCOUNTS_DIR)}.")
+    ledgers = [(MAIN_ACCOUNT, 'main')] + [(name, attach_account(conn, name, read_only)) for name in accounts]
+    selects = [f"SELECT '{name}' AS account, {TRANSACTION_COLUMNS} FROM {schema}.transactions" for name, schema in ledgers]
+    amount_selects = [f"SELECT '{name}' AS account, {AMOUNT_COLUMNS} FROM {schema}.transactions" for name, schema in ledgers]
+    amount_selects += [
+        f"SELECT '{name}' AS account, t.date, s.amount, s.category_id, t.month, t.year, t.currency "
+        f"FROM {schema}.transaction_splits s JOIN {schema}.transactions t ON t.id = s.transaction_id"
+        for name, schema in ledgers
+    ]
+
+    if read_only:
+        # query_only refuses even temp views, so it is lifted for just these statements
+        conn.execute('PRAGMA query_only = OFF')
+    try:
+        conn.execute('DROP VIEW IF EXISTS temp.all_transactions')
+        conn.execute('CREATE TEMP VIEW all_transactions AS ' + ' UNION ALL '.join(selects))
+        conn.execute('DROP VIEW IF EXISTS temp.all_category_amounts')
+        conn.execute('CREATE TEMP VIEW all_category_amounts AS ' + ' UNION ALL '.join(amount_selects))
+    finally:
+        if read_only:
+            conn.execute('PRAGMA query_only = ON')
@@ -0,0 +1,175 @@
+import pandas as pd
+from accounts import ALL_ACCOUNTS, attach_all_accounts
+from archive import TransactionArchive
+from forecast import load_daily_totals
+from config import connect
+
+# Standard score, or modified z-score for month totals, above which an amount counts as unusual
+THRESHOLD = 3.5
+# Scales a median absolute deviation to match a standard deviation
+MAD_SCALE = 1.4826
+# When a category's amounts barely vary, anything this far from its usual size is unusual
+MIN_RELATIVE_SCALE = 0.1
+BASELINE_MONTHS = 12
+MIN_BASELINE_MONTHS = 3
+MIN_TRANSACTIONS = 5
+
+
+def create_category_stats_table(cursor):
+    """Create the cached per-category stats, replacing the older median-based table."""
+    cursor.execute("PRAGMA main.table_info(category_stats)")
+    columns = [row[1] for row in cursor.fetchall()]
+    if columns and 'total_squares' not in columns:
+        # It is only a cache; the app rebuilds it when it finds it empty
+        cursor.execute("DROP TABLE category_stats")
+    # Running sums of absolute amounts, so new rows can be added without rereading old ones
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS category_stats (
+            category_id INTEGER PRIMARY KEY,
+            count INTEGER,
+            total REAL,
+            total_squares REAL
+        )
+        """)
+
+
+def running_stats(df):
+    """Count, sum and sum of squares of absolute amounts per category, all groups at once."""
+    size = df['amount'].abs()
+    grouped = pd.DataFrame({'size': size, 'square': size * size}).groupby(df['category_id'])
+    return pd.DataFrame({
+        'count': grouped['size'].size(),
+        'total': grouped['size'].sum(),
+        'total_squares': grouped['square'].sum(),
+    })
+
+
+def refresh_category_stats(conn, category_ids=None, archive=None):
+    """Recompute cached stats for the given categories, or all of them.
+
+    Works on the caller's connection without committing, so the stats change
+    in the same transaction as whatever write touched those categories.
+    """
+    attach_all_accounts(conn)
+    cursor = conn.cursor()
+    create_category_stats_table(cursor)
+
+    where = 'WHERE category_id IS NOT NULL'
+    params = []
+    if category_ids is not None:
+        category_ids = [int(c) for c in category_ids if c is not None]
+        if not category_ids:
+            return
+        where += f" AND category_id IN ({', '.join('?' * len(category_ids))})"
+        params = category_ids
+    frames = [pd.read_sql_query(f'''
+        SELECT category_id, COUNT(*) AS count, TOTAL(ABS(amount)) AS total, TOTAL(amount * amount) AS total_squares
+        FROM all_category_amounts
+        {where}
+        GROUP BY category_id
+    ''', conn, params=params)]
+
+    archive = archive or TransactionArchive()
+    for year in archive.archived_years():
+        archived = archive.read(year, columns=['category_id', 'amount'], category_ids=category_ids)
+        frames.append(running_stats(archived.dropna(subset=['category_id'])).reset_index())
+    stats = pd.concat(frames, ignore_index=True).groupby('category_id').sum()
+
+    if category_ids is None:
+        cursor.execute('DELETE FROM category_stats')
+    else:
+        cursor.executemany('DELETE FROM category_stats WHERE category_id = ?', [(c,) for c in category_ids])
+    cursor.executemany(
+        'INSERT INTO category_stats (category_id, count, total, total_squares) VALUES (?, ?, ?, ?)',
+        [(int(category_id), int(row['count']), row['total'], row['total_squares'])
+         for category_id, row in stats.iterrows()]
+    )
+
+
+def update_category_stats(conn, rows):
+    """Add newly written (category_id, amount) rows to the cached stats.
+
+    Only the new rows are read, so the cost doesn't grow with the ledger.
+    Like refresh_category_stats it leaves committing to the caller. It runs
+    for every saved batch, so it sums in plain Python rather than pandas.
+    """
+    sums = {}
+    for category_id, amount in rows:
+        if category_id is None or pd.isna(category_id):
+            continue
+        count, total, total_squares = sums.get(int(category_id), (0, 0.0, 0.0))
+        sums[int(category_id)] = (count + 1, total + abs(amount), total_squares + amount * amount)
+    conn.executemany('''
+        INSERT INTO main.category_stats (category_id, count, total, total_squares) VALUES (?, ?, ?, ?)
+        ON CONFLICT (category_id) DO UPDATE SET
+            count = count + excluded.count,
+            total = total + excluded.total,
+            total_squares = total_squares + excluded.total_squares
+    ''', [(category_id, *values) for category_id, values in sums.items()])
+
+
+def flagged_transaction_counts(conn, year, month, account=ALL_ACCOUNTS):
+    """Count unusually large or small transactions per category in a month.
+
+    A transaction is unusual when its size is more than THRESHOLD standard
+    deviations from its category's mean. Both sides are squared so the
+    comparison needs no square root, which not every SQLite build has.
+    """
+    create_category_stats_table(conn.cursor())
+    rows = conn.execute('''
+        WITH s AS (
+            SELECT category_id, total / count AS mean, total_squares / count AS mean_square
+            FROM category_stats
+            WHERE count >= ?
+        )
+        SELECT t.category_id, COUNT(*)
+        FROM all_category_amounts t
+        JOIN s ON s.category_id = t.category_id
+        WHERE t.month = ? AND t.year = ?
+          AND (? = ? OR t.account = ?)
+          AND (ABS(t.amount) - s.mean) * (ABS(t.amount) - s.mean)
+              > ? * MAX(s.mean_square - s.mean * s.mean, s.mean * s.mean * ?)
+        GROUP BY t.category_id
+    ''', (MIN_TRANSACTIONS, month, year, account, ALL_ACCOUNTS, account,
+          THRESHOLD ** 2, MIN_RELATIVE_SCALE ** 2)).fetchall()
+    return dict(rows)
+
+
+def month_anomalies(conn, year, month, account=ALL_ACCOUNTS, baseline_months=BASELINE_MONTHS):
+    """Return the categories whose month total strays far from their rolling baseline."""
+    period = year * 12 + month - 1
+    daily = load_daily_totals(conn, period - baseline_months, period, account)
+    totals = daily.groupby(['category_id', 'period'])['amount'].sum().abs().unstack(fill_value=0)
+    return unusual_totals(totals, period, baseline_months)
+
+
+def unusual_totals(totals, period, baseline_months=BASELINE_MONTHS):
+    """Return the categories whose total for a period strays far from the periods before it.
+
+    totals holds absolute amounts with a row per category and a column per
+    period. The baseline is the median and MAD of each category's totals over
+    the preceding months, computed for every category in one grouped pass.
+    """
+    if period not in totals.columns:
+        return set()
+
+    # Only months the ledger covers form the baseline, counting quiet months as zero
+    history = totals[[p for p in totals.columns if period - baseline_months <= p < period]]
+    if history.shape[1] < MIN_BASELINE_MONTHS:
+        return set()
+    median = history.median(axis=1)
+    mad = history.sub(median, axis=0).abs().median(axis=1)
+    scale = (mad * MAD_SCALE).clip(lower=median * MIN_RELATIVE_SCALE)
+
+    deviation = (totals[period] - median).abs()
+    flagged = (scale > 0) & (deviation > THRESHOLD * scale)
+    return set(flagged[flagged].index.astype(int))
+
+
+if __name__ == "__main__":
+    conn = connect()
+    refresh_category_stats(conn)
+    conn.commit()
+    for row in conn.execute('SELECT * FROM category_stats ORDER BY category_id'):
+        print(row)
+    conn.close()
@@ -0,0 +1,380 @@
+import os
+import json
+import math
+import time
+import queue
+import sqlite3
+import argparse
+import threading
+import urllib.request
+import urllib.error
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, quote
+from accounts import ALL_ACCOUNTS, attach_all_accounts, list_accounts
+from archive import TransactionArchive
+from categories import get_categories
+from forecast import forecast_month
+from anomalies import flagged_transaction_counts, month_anomalies
+from breakdown import fetch_category_totals, fetch_comparison_totals, build_breakdown
+from spending_trends import fetch_trend_totals
+from config import add_arguments, configure_from_args, get_db_path, get_mode
+from net_worth import fetch_networth_data
+from transaction_store import data_version
+
+DEFAULT_PORT = 8765
+POOL_SIZE = 4
+# Rendered responses kept in memory, keyed by data version and request
+RESPONSE_CACHE_SIZE = 256
+MAX_SEARCH_RESULTS = 1000
+
+
+class ReadOnlyPool:
+    """A fixed set of read-only connections shared by the request threads.
+
+    Each connection keeps the account ledgers attached; they are re-attached
+    when the list of accounts changes.
+    """
+
+    def __init__(self, db_path=None, size=POOL_SIZE):
+        self.db_path = db_path or get_db_path()
+        self.idle = queue.Queue()
+        self.attached = {}
+        for _ in range(size):
+            self.idle.put(self._connect())
+
+    def _connect(self):
+        if get_mode() == 'memory':
+            # A shared in-memory database can't be opened read-only; query_only refuses writes instead
+            conn = sqlite3.connect(self.db_path, uri=True, check_same_thread=False)
+        else:
+            uri = f"file:{quote(os.path.abspath(self.db_path))}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        conn.execute('PRAGMA query_only = ON')
+        self._attach(conn)
+        return conn
+
+    def _attach(self, conn):
+        attach_all_accounts(conn, read_only=True)
+        self.attached[id(conn)] = list_accounts()
+
+    @contextmanager
+    def connection(self):
+        conn = self.idle.get()
+        try:
+            if self.attached.get(id(conn)) != list_accounts():
+                self._attach(conn)
+            yield conn
+        finally:
+            self.idle.put(conn)
+
+    def close(self):
+        while not self.idle.empty():
+            self.idle.get().close()
+
+
+def _int_param(params, name, default=None):
+    value = params.get(name, [None])[0]
+    if value is None or value == '':
+        if default is None:
+            raise ValueError(f"Missing parameter: {name}")
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Parameter {name} must be a whole number")
+
+
+def _clean(value):
+    """Turn NumPy scalars and NaN into plain JSON values."""
+    if isinstance(value, dict):
+        return {str(key): _clean(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_clean(item) for item in value]
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def breakdown(conn, params, db_path):
+    """Budget against actual per category for one month, as on the Monthly Breakdown page."""
+    today = datetime.now()
+    year = _int_param(params, 'year', today.year)
+    month = _int_param(params, 'month', today.month)
+    account = params.get('account', [ALL_ACCOUNTS])[0]
+    if not 1 <= month <= 12:
+        raise ValueError("Parameter month must be between 1 and 12")
+
+    categories = get_categories(db_path)
+    archive = TransactionArchive(db_path)
+    totals = fetch_category_totals(conn, year, month, account, archive)
+    forecasts = {}
+    if (year, month) == (today.year, today.month):
+        forecasts = forecast_month(year, month, today.day, account, db_path, categories, conn=conn)
+    flagged = set(flagged_transaction_counts(conn, year, month, account))
+    flagged |= month_anomalies(conn, year, month, account)
+
+    comparisons = fetch_comparison_totals(conn, year, month, account, archive)
+
+    section_data, type_amounts = build_breakdown(categories, totals, forecasts, flagged, comparisons)
+    return {'year': year, 'month': month, 'account': account,
+            'sections': section_data, 'totals': type_amounts}
+
+
+def trends(conn, params, db_path):
+    """Monthly totals per category for a year, as on the Spending Trends page."""
+    year = _int_param(params, 'year', datetime.now().year)
+    categories = get_categories(db_path)
+    names = params.get('categories', [','.join(categories.names())])[0].split(',')
+    ids = [categories.id_for(name) for name in names]
+    unknown = [name for name, category_id in zip(names, ids) if category_id is None]
+    if unknown:
+        raise ValueError(f"Unknown categories: {', '.join(unknown)}")
+
+    df = fetch_trend_totals(conn, year, ids, TransactionArchive(db_path))
+    series = {name: [0.0] * 12 for name in names}
+    for month, category_id, amount in df[['month', 'category_id', 'amount']].itertuples(index=False):
+        series[categories.name(category_id)][int(month) - 1] = amount
+    return {'year': year, 'series': series}
+
+
+def networth(conn, params, db_path):
+    """Latest assets and liabilities and the net worth history, as on the Net Worth page."""
+    data = fetch_networth_data(conn)
+    if not data:
+        return {'assets': {}, 'liabilities': {}, 'history': []}
+    return {
+        'assets': dict(data['assets']),
+        'liabilities': dict(data['liabilities']),
+        'history': [{'date': date, 'assets': assets, 'liabilities': liabilities, 'net_worth': assets - liabilities}
+                    for date, assets, liabilities in data['total_by_entry']],
+    }
+
+
+def transactions(conn, params, db_path):
+    """Search live transactions by text in the payee or description, newest first."""
+    where = []
+    args = []
+    text = params.get('q', [''])[0]
+    if text:
+        where.append('(t.payee LIKE ? OR t.description LIKE ?)')
+        args += [f'%{text}%'] * 2
+    if 'category' in params:
+        category_id = get_categories(db_path).id_for(params['category'][0])
+        if category_id is None:
+            raise ValueError(f"Unknown category: {params['category'][0]}")
+        where.append('t.category_id = ?')
+        args.append(category_id)
+    if 'account' in params and params['account'][0] != ALL_ACCOUNTS:
+        where.append('t.account = ?')
+        args.append(params['account'][0])
+    for name in ('year', 'month'):
+        if name in params:
+            where.append(f't.{name} = ?')
+            args.append(_int_param(params, name))
+
+    limit = min(_int_param(params, 'limit', 100), MAX_SEARCH_RESULTS)
+    offset = _int_param(params, 'offset', 0)
+    rows = conn.execute(f'''
+        SELECT t.account, t.id, t.date, t.payee, t.description, t.amount, c.name
+        FROM all_transactions t
+        LEFT JOIN categories c ON c.id = t.category_id
+        {'WHERE ' + ' AND '.join(where) if where else ''}
+        ORDER BY t.date DESC, t.id DESC
+        LIMIT ? OFFSET ?
+    ''', args + [limit, offset]).fetchall()
+    columns = ['account', 'id', 'date', 'payee', 'description', 'amount', 'category']
+    return {'limit': limit, 'offset': offset, 'transactions': [dict(zip(columns, row)) for row in rows]}
+
+
+ROUTES = {
+    '/api/breakdown': breakdown,
+    '/api/trends': trends,
+    '/api/networth': networth,
+    '/api/transactions': transactions,
+}
+
+
+class FinanceRequestHandler(BaseHTTPRequestHandler):
+    """Serve the JSON endpoints; the server carries the pool and response cache."""
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        handler = ROUTES.get(url.path)
+        if handler is None:
+            self.send_json(404, {'error': f"Unknown endpoint: {url.path}"})
+            return
+
+        # Responses only change when the data does, so the version doubles as the ETag
+        version = data_version(self.server.db_path)
+        etag = f'"{version}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        key = (version, url.path, url.query)
+        body = self.server.cached_response(key)
+        if body is None:
+            try:
+                with self.server.pool.connection() as conn:
+                    result = handler(conn, parse_qs(url.query), self.server.db_path)
+            except ValueError as e:
+                self.send_json(400, {'error': str(e)})
+                return
+            except Exception as e:
+                self.send_json(500, {'error': f"Failed to load data: {str(e)}"})
+                return
+            body = json.dumps(_clean(result)).encode()
+            self.server.store_response(key, body)
+        self.send_body(200, body, etag)
+
+    def send_json(self, status, payload):
+        self.send_body(status, json.dumps(payload).encode())
+
+    def send_body(self, status, body, etag=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+class FinanceServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, db_path=None, pool_size=POOL_SIZE, quiet=False):
+        super().__init__(address, FinanceRequestHandler)
+        self.db_path = db_path or get_db_path()
+        self.pool = ReadOnlyPool(self.db_path, pool_size)
+        self.quiet = quiet
+        self.responses = OrderedDict()
+        self.responses_lock = threading.Lock()
+
+    def cached_response(self, key):
+        with self.responses_lock:
+            body = self.responses.get(key)
+            if body is not None:
+                self.responses.move_to_end(key)
+            return body
+
+    def store_response(self, key, body):
+        with self.responses_lock:
+            self.responses[key] = body
+            while len(self.responses) > RESPONSE_CACHE_SIZE:
+                self.responses.popitem(last=False)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.close()
+
+
+def load_test(base_url, paths, total_requests=2000, concurrency=8, revalidate=False):
+    """Fire requests at the server from several threads and report the throughput.
+
+    With revalidate, each request sends the ETag from a first fetch, measuring
+    the 304 path dashboards take when polling unchanged data.
+    """
+    etags = {}
+    if revalidate:
+        for path in paths:
+            with urllib.request.urlopen(base_url + path) as response:
+                etags[path] = response.headers['ETag']
+
+    def fetch(i):
+        path = paths[i % len(paths)]
+        request = urllib.request.Request(base_url + path)
+        if path in etags:
+            request.add_header('If-None-Match', etags[path])
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        return status, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(fetch, range(total_requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for _, latency in results)
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    return {
+        'requests': total_requests,
+        'seconds': elapsed,
+        'requests_per_second': total_requests / elapsed,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p95_ms': latencies[int(len(latencies) * 0.95)] * 1000,
+        'statuses': statuses,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Read-only JSON API over the finance database.")
+    subparsers = parser.add_subparsers(dest='action', required=True)
+
+    serve_parser = subparsers.add_parser('serve', help="run the API server")
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument('--pool', type=int, default=POOL_SIZE, help="read-only connections to keep open")
+
+    load_parser = subparsers.add_parser('loadtest', help="measure requests per second")
+    load_parser.add_argument('--url', help="server to test; by default one is started on a free port")
+    load_parser.add_argument('--requests', type=int, default=2000)
+    load_parser.add_argument('--concurrency', type=int, default=8)
+
+    add_arguments(parser)
+    args = parser.parse_args()
+    configure_from_args(args)
+
+    if args.action == 'serve':
+        server = FinanceServer((args.host, args.port), pool_size=args.pool)
+        print(f"Serving on http://{args.host}:{args.port}/api/")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+    else:
+        server = None
+        base_url = args.url
+        if base_url is None:
+            server = FinanceServer(('127.0.0.1', 0), quiet=True)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+        today = datetime.now()
+        paths = [
+            f'/api/breakdown?year={today.year}&month={today.month}',
+            f'/api/trends?year={today.year}',
+            '/api/networth',
+            '/api/transactions?limit=50',
+        ]
+        for revalidate in (False, True):
+            result = load_test(base_url, paths, args.requests, args.concurrency, revalidate)
+            label = 'conditional (304)' if revalidate else 'full responses'
+            print(f"{label}: {result['requests_per_second']:.0f} req/s over {result['requests']} requests, "
+                  f"p50 {result['p50_ms']:.1f}ms, p95 {result['p95_ms']:.1f}ms, statuses {result['statuses']}")
+
+        if server:
+            server.shutdown()
+            server.server_close()
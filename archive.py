@@ -0,0 +1,299 @@
+import os
+import argparse
+from datetime import datetime
+import pandas as pd
+from fx import to_reporting_currency
+from accounts import SPLIT_COLUMNS
+from config import add_arguments, configure_from_args, connect, data_path
+
+# Parquet needs pyarrow; without it archives fall back to gzip-compressed CSV
+try:
+    import pyarrow.parquet
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+ARCHIVE_DIR = 'archive'
+# Rewritten years wait here until the database change they belong to has committed
+STAGING_DIR = 'staging'
+ARCHIVE_COLUMNS = ['id', 'date', 'description', 'amount', 'category_id', 'payee', 'month', 'year', 'currency']
+ARCHIVE_EXTENSIONS = ('parquet', 'csv.gz')
+
+
+def archive_file_year(file_name):
+    """Return the year a finished archive file holds, or None for anything else, such as a half-written .tmp."""
+    for extension in ARCHIVE_EXTENSIONS:
+        suffix = f".{extension}"
+        if file_name.startswith('transactions_') and file_name.endswith(suffix):
+            year = file_name[len('transactions_'):-len(suffix)]
+            if year.isdigit():
+                return int(year)
+    return None
+
+
+class TransactionArchive:
+    """Move closed years of transactions into year-partitioned columnar files."""
+
+    def __init__(self, db_path=None, archive_dir=None):
+        self.db_path = db_path
+        self.archive_dir = archive_dir or data_path(ARCHIVE_DIR)
+        # year -> staged file that reads see in place of the year's archive until committed
+        self.staged = {}
+
+    def _year_path(self, year, extension):
+        return os.path.join(self.archive_dir, f"transactions_{int(year)}.{extension}")
+
+    def _find_year_file(self, year, staged=True):
+        """Return the archive file for a year, or None if it is not archived."""
+        if staged and year in self.staged:
+            return self.staged[year]
+        for extension in ARCHIVE_EXTENSIONS:
+            path = self._year_path(year, extension)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def archived_years(self):
+        """List the years that have an archive file."""
+        if not os.path.isdir(self.archive_dir):
+            return []
+        years = {archive_file_year(file_name) for file_name in os.listdir(self.archive_dir)}
+        return sorted(years - {None})
+
+    def _file_columns(self, path):
+        if path.endswith('.parquet'):
+            return pyarrow.parquet.read_schema(path).names
+        return list(pd.read_csv(path, nrows=0, compression='gzip').columns)
+
+    def _read_file(self, path, columns=None, filters=None):
+        """Read one archive file, pushing column and row filters down where possible."""
+        # Files archived before a column existed read it back as empty
+        if columns is not None:
+            available = self._file_columns(path)
+            missing = [column for column in columns if column not in available]
+            if missing:
+                df = self._read_file(path, [column for column in columns if column in available], filters)
+                return df.assign(**{column: None for column in missing})[columns]
+
+        if path.endswith('.parquet'):
+            return pd.read_parquet(path, columns=columns, filters=filters or None)
+
+        # CSV has no pushdown, so project columns while parsing and filter afterwards
+        usecols = None
+        if columns is not None:
+            usecols = list(dict.fromkeys(columns + [f[0] for f in (filters or [])]))
+        df = pd.read_csv(path, usecols=usecols, compression='gzip')
+        for column, op, value in filters or []:
+            if op == '=':
+                df = df[df[column] == value]
+            elif op == 'in':
+                df = df[df[column].isin(value)]
+        return df[columns] if columns is not None else df
+
+    def _write_file(self, df, year, staged=False):
+        extension = 'parquet' if PARQUET_AVAILABLE else 'csv.gz'
+        path = self._year_path(year, extension)
+        if staged:
+            path = os.path.join(self.archive_dir, STAGING_DIR, os.path.basename(path))
+            self.staged[year] = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        if PARQUET_AVAILABLE:
+            df.to_parquet(tmp_path, index=False)
+        else:
+            df.to_csv(tmp_path, index=False, compression='gzip')
+        os.replace(tmp_path, path)
+        return path
+
+    def archive_year(self, year):
+        """Move every transaction for a closed year out of the database into its archive file."""
+        year = int(year)
+        if year >= datetime.now().year:
+            raise ValueError(f"{year} is not a closed year and cannot be archived")
+
+        conn = connect(self.db_path)
+        try:
+            df = pd.read_sql_query(
+                f"SELECT {', '.join(ARCHIVE_COLUMNS)} FROM transactions WHERE year = ?",
+                conn, params=(year,)
+            )
+            if df.empty:
+                return 0
+
+            # Archives are only read for reporting, so a split transaction is
+            # stored as one row per split, each keeping the parent's id
+            splits = pd.read_sql_query(f"""
+                SELECT {SPLIT_COLUMNS}
+                FROM transaction_splits s
+                JOIN transactions t ON t.id = s.transaction_id
+                WHERE t.year = ?
+            """, conn, params=(year,))
+            if not splits.empty:
+                df = pd.concat([df[~df['id'].isin(splits['id'])], splits], ignore_index=True)
+
+            # Merge with anything archived earlier for the same year
+            existing_path = self._find_year_file(year)
+            if existing_path:
+                df = pd.concat([self._read_file(existing_path), df], ignore_index=True)
+
+            path = self._write_file(df, year)
+            if existing_path and existing_path != path:
+                os.remove(existing_path)
+
+            # Only drop the rows once the archive file is safely on disk
+            cursor = conn.cursor()
+            cursor.execute(
+                'DELETE FROM transaction_splits WHERE transaction_id IN (SELECT id FROM transactions WHERE year = ?)',
+                (year,)
+            )
+            cursor.execute('DELETE FROM transactions WHERE year = ?', (year,))
+            conn.commit()
+            return len(df)
+        finally:
+            conn.close()
+
+    def restore_year(self, year):
+        """Load an archived year back into the database and remove its archive file."""
+        path = self._find_year_file(year)
+        if not path:
+            return 0
+
+        df = self._read_file(path)
+
+        # Rows sharing an id are the splits of one transaction: rebuild the
+        # uncategorized parent row and move the lines back to the splits table
+        split = df['id'].notna() & df['id'].duplicated(keep=False)
+        splits = df.loc[split, ['id', 'category_id', 'amount']].rename(columns={'id': 'transaction_id'})
+        parents = df[split].groupby('id', as_index=False).agg(
+            {**{column: 'first' for column in df.columns if column != 'id'}, 'amount': 'sum'}
+        ).assign(category_id=None)[df.columns]
+
+        conn = connect(self.db_path)
+        try:
+            pd.concat([df[~split], parents], ignore_index=True).to_sql('transactions', conn, if_exists='append', index=False)
+            splits.to_sql('transaction_splits', conn, if_exists='append', index=False)
+            conn.commit()
+        finally:
+            conn.close()
+        os.remove(path)
+        return len(df)
+
+    def migrate_category_ids(self, conn):
+        """Rewrite years archived while transactions stored the category name as text.
+
+        As with the ledgers, names that are no longer categories are registered
+        first so no archived row is orphaned. Returns the number of years
+        rewritten; years already using category_id are left alone.
+        """
+        stale = {}
+        for year in self.archived_years():
+            path = self._find_year_file(year)
+            if 'category' in self._file_columns(path) and 'category_id' not in self._file_columns(path):
+                stale[year] = path
+        if not stale:
+            return 0
+
+        frames = {year: self._read_file(path) for year, path in stale.items()}
+        names = set().union(*(set(df['category'].dropna()) for df in frames.values()))
+        known = {name for name, in conn.execute('SELECT name FROM categories')}
+        conn.executemany("INSERT INTO categories (name, type, budget) VALUES (?, 'Spending', 0)",
+                         [(name,) for name in sorted(names - known)])
+        conn.commit()
+        ids = dict(conn.execute('SELECT name, MIN(id) FROM categories GROUP BY name').fetchall())
+
+        for year, df in frames.items():
+            df.insert(df.columns.get_loc('category'), 'category_id', df['category'].map(ids).astype('Int64'))
+            path = self._write_file(df.drop(columns='category'), year)
+            if stale[year] != path:
+                os.remove(stale[year])
+        return len(frames)
+
+    def replace_category(self, source_id, target_id):
+        """Stage archived years with rows in one category moved to another.
+
+        The rewritten years are read in place of the originals by this archive
+        but only replace them on commit_staged(), so a caller can swap them in
+        after its own database transaction commits, or discard_staged() if it
+        rolls back. Returns the number of rows moved.
+        """
+        moved = 0
+        for year in self.archived_years():
+            path = self._find_year_file(year)
+            df = self._read_file(path)
+            matches = df['category_id'] == source_id
+            if matches.any():
+                df.loc[matches, 'category_id'] = target_id
+                self._write_file(df, year, staged=True)
+                moved += int(matches.sum())
+        return moved
+
+    def commit_staged(self):
+        """Move staged years into place, replacing their current archive files."""
+        for year, staged_path in sorted(self.staged.items()):
+            existing_path = self._find_year_file(year, staged=False)
+            path = os.path.join(self.archive_dir, os.path.basename(staged_path))
+            os.replace(staged_path, path)
+            if existing_path and existing_path != path:
+                os.remove(existing_path)
+        self.staged = {}
+
+    def discard_staged(self):
+        """Drop staged years, leaving the archive as it was."""
+        for staged_path in self.staged.values():
+            if os.path.exists(staged_path):
+                os.remove(staged_path)
+        self.staged = {}
+
+    def read(self, year, columns=None, month=None, category_ids=None, payees=None):
+        """Read archived transactions for a year, filtered by month, category ids and payees."""
+        path = self._find_year_file(year)
+        if not path:
+            return pd.DataFrame(columns=columns or ARCHIVE_COLUMNS)
+
+        filters = []
+        if month is not None:
+            filters.append(('month', '=', month))
+        if category_ids is not None:
+            filters.append(('category_id', 'in', list(category_ids)))
+        if payees is not None:
+            filters.append(('payee', 'in', list(payees)))
+        return self._read_file(path, columns=columns, filters=filters)
+
+    def category_totals(self, year, month):
+        """Sum archived amounts per category id for one month, in the reporting currency."""
+        df = self.read(year, columns=['category_id', 'amount', 'currency', 'date'], month=month)
+        df = to_reporting_currency(df, ['amount'], date_column='date', db_path=self.db_path)
+        return df.groupby('category_id')['amount'].sum().to_dict()
+
+    def monthly_totals(self, year, category_ids):
+        """Sum archived amounts per month and category id for a year, in the reporting currency."""
+        df = self.read(year, columns=['month', 'category_id', 'amount', 'currency', 'date'], category_ids=category_ids)
+        df = to_reporting_currency(df, ['amount'], date_column='date', db_path=self.db_path)
+        return df.groupby(['month', 'category_id'], as_index=False)['amount'].sum()
+
+    def available_periods(self):
+        """Return the distinct (month, year) pairs held in the archive."""
+        periods = set()
+        for year in self.archived_years():
+            df = self.read(year, columns=['month', 'year'])
+            periods.update(zip(df['month'], df['year']))
+        return sorted(periods, key=lambda p: (p[1], p[0]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive closed years of transactions.")
+    parser.add_argument('action', choices=['archive', 'restore', 'list'])
+    parser.add_argument('years', nargs='*', type=int)
+    add_arguments(parser)
+    args = parser.parse_args()
+    configure_from_args(args)
+
+    archive = TransactionArchive()
+    if args.action == 'list':
+        for year in archive.archived_years():
+            print(year)
+    for year in args.years:
+        if args.action == 'archive':
+            print(f"{year}: archived {archive.archive_year(year)} transactions")
+        elif args.action == 'restore':
+            print(f"{year}: restored {archive.restore_year(year)} transactions")
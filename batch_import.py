@@ -0,0 +1,78 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from config import configure_worker, worker_settings
+from parsers import sniff_format
+
+# Starting a worker process costs around a second, mostly importing pandas, and
+# one parses about 6 MB of statements a second, so smaller batches are parsed
+# in this process; a typical monthly statement is well under 1 MB
+PARALLEL_MIN_BYTES = 8 * 1024 * 1024
+
+
+def read_statement(file_path):
+    """Read a bank statement into date, payee and amount columns.
+
+    The file format is sniffed from its first few KB and the matching parser
+    streams records, so any registered layout can be imported.
+    """
+    parser = sniff_format(file_path)
+    df = pd.DataFrame.from_records(parser.records(file_path), columns=['date', 'payee', 'amount'])
+
+    # Parse the whole date column up front so bad rows are reported before review starts
+    dates = pd.to_datetime(df['date'], format=parser.date_format, errors='coerce')
+    invalid = df[dates.isna()]
+    if not invalid.empty:
+        raise ValueError(format_invalid_dates(file_path, invalid))
+
+    # Normalize every parser's native date layout to the ledger's format
+    df['date'] = dates.dt.strftime('%Y/%m/%d')
+    df['month'] = dates.dt.month
+    df['year'] = dates.dt.year
+    return df
+
+
+def format_invalid_dates(file_path, invalid, limit=20):
+    """Describe every row whose date could not be parsed."""
+    lines = [f"{os.path.basename(file_path)}: {len(invalid)} row(s) with invalid dates"]
+    for index, row in invalid.head(limit).iterrows():
+        lines.append(f"  row {index + 1}: {row['date']!r} ({row['payee']})")
+    if len(invalid) > limit:
+        lines.append(f"  ... and {len(invalid) - limit} more")
+    return "\n".join(lines)
+
+
+def parse_statements(paths, max_workers=None, min_bytes=PARALLEL_MIN_BYTES):
+    """Parse many statement files, in parallel worker processes when they are large.
+
+    Each file is read and normalized as a single import is, and the results
+    are combined into one DataFrame in file order. Problems in every file
+    are reported together in one ValueError rather than stopping at the first.
+    """
+    if not paths:
+        return pd.DataFrame(columns=['date', 'payee', 'amount', 'month', 'year'])
+
+    workers = min(len(paths), max_workers or os.cpu_count() or 1)
+    if workers == 1 or sum(os.path.getsize(path) for path in paths if os.path.exists(path)) < min_bytes:
+        results = [read_statement_checked(path) for path in paths]
+    else:
+        # Spawn rather than fork so workers don't inherit the Tk interpreter; this module doesn't import Tk
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=configure_worker, initargs=(worker_settings(),)) as pool:
+            results = list(pool.map(read_statement_checked, paths))
+
+    errors = [error for _, error in results if error]
+    if errors:
+        raise ValueError("\n".join(errors))
+
+    return pd.concat([frame for frame, _ in results], ignore_index=True)
+
+
+def read_statement_checked(file_path):
+    """Read one statement in a worker, returning any error instead of raising it."""
+    try:
+        return read_statement(file_path), None
+    except Exception as e:
+        return None, str(e)
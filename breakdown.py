@@ -0,0 +1,185 @@
+import pandas as pd
+from accounts import ALL_ACCOUNTS, MAIN_ACCOUNT
+from archive import TransactionArchive
+from fx import FX_DATE, to_reporting_currency
+
+SECTIONS = ['Income', 'Expenses', 'Spending', 'Assets']
+PIE_TYPES = ["Spending", "Expenses", "Assets"]
+# Table columns as (id, heading), shared by the page's treeview and rendered reports
+COLUMNS = (
+    ('category', 'Category'),
+    ('budget', 'Budget'),
+    ('actual', 'Actual'),
+    ('difference', '% Difference'),
+    ('projected', 'Projected'),
+    ('overspend', 'Overspend Risk'),
+    ('last_year', 'Last Year'),
+    ('average_3', '3-Month Avg'),
+    ('average_12', '12-Month Avg'),
+)
+
+
+def fetch_category_totals(conn, year, month, account=ALL_ACCOUNTS, archive=None):
+    """Sum a month's amounts per category id across live ledgers and archived years.
+
+    Amounts are converted to the reporting currency. The connection must
+    already have the account ledgers attached.
+    """
+    df = pd.read_sql_query(f'''
+        SELECT category_id, currency, {FX_DATE} AS fx_date, SUM(amount) AS amount
+        FROM all_category_amounts
+        WHERE month = ? AND year = ?
+          AND (? = ? OR account = ?)
+        GROUP BY category_id, currency, fx_date
+    ''', conn, params=(month, year, account, ALL_ACCOUNTS, account))
+    totals = to_reporting_currency(df, ['amount']).groupby('category_id')['amount'].sum().to_dict()
+
+    # Archives only hold the main ledger
+    archive = archive or TransactionArchive()
+    if account in (ALL_ACCOUNTS, MAIN_ACCOUNT) and year in archive.archived_years():
+        for category_id, amount in archive.category_totals(year, month).items():
+            totals[category_id] = totals.get(category_id, 0) + amount
+    return totals
+
+
+def fetch_comparison_totals(conn, year, month, account=ALL_ACCOUNTS, archive=None):
+    """Same month last year and trailing 3 and 12 month averages per category id.
+
+    All three come from one conditional aggregate over the twelve months
+    before the given one; months without spending count as zero in the
+    averages. Returns {category_id: (last_year, average_3, average_12)} in
+    the reporting currency.
+    """
+    period = year * 12 + month - 1
+    # Written as two (year, month) ranges so both are answered from the period index
+    df = pd.read_sql_query(f'''
+        SELECT category_id, currency, {FX_DATE} AS fx_date,
+               SUM(CASE WHEN year = ? AND month = ? THEN amount ELSE 0 END) AS last_year,
+               SUM(CASE WHEN year * 12 + month - 1 >= ? THEN amount ELSE 0 END) AS trailing_3,
+               SUM(amount) AS trailing_12
+        FROM all_category_amounts
+        WHERE ((year = ? AND month >= ?) OR (year = ? AND month < ?))
+          AND (? = ? OR account = ?)
+        GROUP BY category_id, currency, fx_date
+    ''', conn, params=(year - 1, month, period - 3, year - 1, month, year, month, account, ALL_ACCOUNTS, account))
+    frames = [df]
+
+    # Archives only hold the main ledger
+    archive = archive or TransactionArchive()
+    if account in (ALL_ACCOUNTS, MAIN_ACCOUNT):
+        for archived_year in archive.archived_years():
+            if not year - 1 <= archived_year <= year:
+                continue
+            archived = archive.read(archived_year, columns=['category_id', 'year', 'month', 'amount', 'currency', 'date'])
+            periods = archived['year'] * 12 + archived['month'] - 1
+            frames.append(pd.DataFrame({
+                'category_id': archived['category_id'],
+                'currency': archived['currency'],
+                'fx_date': archived['date'],
+                'last_year': archived['amount'].where(periods == period - 12, 0),
+                'trailing_3': archived['amount'].where(periods >= period - 3, 0),
+                'trailing_12': archived['amount'],
+            })[(periods >= period - 12) & (periods <= period - 1)])
+
+    columns = ['last_year', 'trailing_3', 'trailing_12']
+    df = to_reporting_currency(pd.concat(frames, ignore_index=True), columns)
+    sums = df.dropna(subset=['category_id']).groupby('category_id')[columns].sum()
+    return {
+        int(category_id): (last_year, trailing_3 / 3, trailing_12 / 12)
+        for category_id, (last_year, trailing_3, trailing_12) in sums.iterrows()
+    }
+
+
+def build_breakdown(categories, totals, forecasts=None, flagged=(), comparisons=None):
+    """Group each category's budget and actual into sections.
+
+    Returns the per-section rows and the totals used by the pie chart.
+    """
+    forecasts = forecasts or {}
+    comparisons = comparisons or {}
+    section_data = {}
+    for category_id, name, cat_type, budget in categories:
+        actual = abs(totals.get(category_id, 0))
+        diff_percent = ((actual - budget) / budget * 100) if budget != 0 else 0
+        projected, overspend = forecasts.get(category_id, (actual, None))
+        last_year, average_3, average_12 = comparisons.get(category_id, (0, 0, 0))
+
+        if cat_type not in section_data:
+            section_data[cat_type] = []
+
+        section_data[cat_type].append({
+            "category": name,
+            "budget": budget,
+            "actual": actual,
+            "diff": diff_percent,
+            "projected": projected,
+            "overspend": overspend,
+            "anomaly": category_id in flagged,
+            "last_year": abs(last_year),
+            "average_3": abs(average_3),
+            "average_12": abs(average_12)
+        })
+
+    # Calculate totals for Spending, Expenses, Assets
+    type_amounts = {section: 0 for section in PIE_TYPES}
+    for section in section_data:
+        if section in type_amounts:
+            type_amounts[section] = sum(entry["actual"] for entry in section_data[section])
+
+    return section_data, type_amounts
+
+
+def breakdown_rows(section_data):
+    """Yield formatted table rows and their style tag: each section's heading, categories and total."""
+    for section in SECTIONS:
+        if section not in section_data:
+            continue
+
+        yield (f'{section}', '', '', '', '', '', '', '', ''), 'section'
+
+        total_budget = 0
+        total_actual = 0
+        total_projected = 0
+        total_last_year = 0
+        total_average_3 = 0
+        total_average_12 = 0
+
+        for entry in section_data[section]:
+            total_budget += entry["budget"]
+            total_actual += entry["actual"]
+            total_projected += entry["projected"]
+            total_last_year += entry["last_year"]
+            total_average_3 += entry["average_3"]
+            total_average_12 += entry["average_12"]
+            overspend = entry["overspend"]
+            yield (
+                entry["category"],
+                f"${entry['budget']:,.2f}",
+                f"${entry['actual']:,.2f}",
+                f"{entry['diff']:.0f}%",
+                f"${entry['projected']:,.2f}",
+                f"{overspend:.0%}" if pd.notna(overspend) else '',
+                f"${entry['last_year']:,.2f}",
+                f"${entry['average_3']:,.2f}",
+                f"${entry['average_12']:,.2f}"
+            ), 'anomaly' if entry["anomaly"] else None
+
+        total_diff = ((total_actual - total_budget) / total_budget * 100) if total_budget != 0 else 0
+        yield ('Total', f"${total_budget:,.2f}", f"${total_actual:,.2f}", f"{total_diff:.0f}%", f"${total_projected:,.2f}", '',
+               f"${total_last_year:,.2f}", f"${total_average_3:,.2f}", f"${total_average_12:,.2f}"), 'total'
+
+
+def draw_pie_chart(ax, amounts):
+    """Draw the spending vs expenses vs assets pie onto a matplotlib axes."""
+    values = [amounts.get(cat, 0) for cat in PIE_TYPES]
+    colors = ['#FF9999', '#66B3FF', '#99FF99']
+    ax.pie(
+        values, 
+        labels=PIE_TYPES, 
+        autopct='%1.1f%%', 
+        startangle=90,
+        colors=colors,
+        wedgeprops={'edgecolor': 'white'}
+    )
+    ax.set_title("Spending vs Expenses vs Assets", fontsize=10)
+    ax.axis('equal')
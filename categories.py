@@ -0,0 +1,73 @@
+from collections import namedtuple
+from config import connect, get_db_path
+
+Category = namedtuple('Category', ['id', 'name', 'type', 'budget'])
+
+# One lookup per database, loaded on first use and kept for the session
+_lookups = {}
+
+
+class CategoryLookup:
+    """In-memory map between category ids and their name, type and budget."""
+
+    def __init__(self, rows):
+        self.by_id = {row[0]: Category(*row) for row in rows}
+        self.ids_by_name = {category.name: category.id for category in self.by_id.values()}
+        # The categories_version the lookup was loaded at
+        self.version = None
+
+    @classmethod
+    def load(cls, db_path=None):
+        conn = connect(db_path)
+        try:
+            version = categories_version(conn)
+            rows = conn.execute('SELECT id, name, type, budget FROM categories ORDER BY id').fetchall()
+        finally:
+            conn.close()
+        lookup = cls(rows)
+        lookup.version = version
+        return lookup
+
+    def __iter__(self):
+        return iter(self.by_id.values())
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def names(self):
+        return [category.name for category in self.by_id.values()]
+
+    def name(self, category_id):
+        category = self.by_id.get(category_id)
+        return category.name if category else None
+
+    def id_for(self, name):
+        return self.ids_by_name.get(name)
+
+
+def categories_version(conn):
+    """Summarize the categories table, so renames, merges and budget changes made elsewhere can be noticed."""
+    return conn.execute("""
+        SELECT COUNT(*), TOTAL(budget), GROUP_CONCAT(id || ':' || name || ':' || IFNULL(type, ''), ',')
+        FROM (SELECT * FROM categories ORDER BY id)
+    """).fetchone()
+
+
+def get_categories(db_path=None):
+    """Return the cached category lookup, reloading it if categories changed since, e.g. in another process."""
+    db_path = db_path or get_db_path()
+    if db_path in _lookups:
+        conn = connect(db_path)
+        try:
+            current = categories_version(conn) == _lookups[db_path].version
+        finally:
+            conn.close()
+        if current:
+            return _lookups[db_path]
+    _lookups[db_path] = CategoryLookup.load(db_path)
+    return _lookups[db_path]
+
+
+def invalidate_categories():
+    """Forget cached lookups so the next call reloads from the database."""
+    _lookups.clear()
@@ -0,0 +1,244 @@
+import argparse
+from accounts import attach_all_accounts, list_accounts, account_schema
+from archive import TransactionArchive
+from categories import get_categories, invalidate_categories
+from anomalies import refresh_category_stats
+from transaction_store import invalidate_transaction_store
+from events import CATEGORIES, TRANSACTIONS, DataChange, publish
+from config import add_arguments, configure_from_args, connect
+
+
+def _ledger_schemas(conn):
+    """Attach every account ledger and return the schemas holding transactions."""
+    attach_all_accounts(conn)
+    return ['main'] + [account_schema(name) for name in list_accounts()]
+
+
+def _category_id(categories, name):
+    category_id = categories.id_for(name)
+    if category_id is None:
+        raise ValueError(f"Unknown category: {name}")
+    return category_id
+
+
+def _payee_filter(pattern, source_id=None):
+    """WHERE clause and parameters for a payee LIKE pattern, optionally within one category.
+
+    The clause has a {schema} placeholder to fill in for each ledger.
+    """
+    # Split transactions keep their categories on the splits, so they are left alone
+    where = 'payee LIKE ? AND id NOT IN (SELECT transaction_id FROM {schema}.transaction_splits)'
+    params = [pattern]
+    if source_id is not None:
+        where += ' AND category_id = ?'
+        params.append(source_id)
+    return where, params
+
+
+def _count(conn, schemas, where, params, tables=('transactions',)):
+    """Count matching rows per ledger, skipping ledgers with none."""
+    counts = {}
+    for schema in schemas:
+        count = sum(
+            conn.execute(f'SELECT COUNT(*) FROM {schema}.{table} WHERE {where.format(schema=schema)}', params).fetchone()[0]
+            for table in tables
+        )
+        if count:
+            counts[schema] = count
+    return counts
+
+
+def preview_merge(source, target, db_path=None):
+    """Return how many transactions per ledger a merge would move."""
+    categories = get_categories(db_path)
+    source_id = _category_id(categories, source)
+    _category_id(categories, target)
+
+    conn = connect(db_path)
+    try:
+        return _count(conn, _ledger_schemas(conn), 'category_id = ?', [source_id],
+                      tables=('transactions', 'transaction_splits'))
+    finally:
+        conn.close()
+
+
+def merge_categories(source, target, db_path=None):
+    """Move every transaction from one category into another and remove the source.
+
+    All ledgers are updated with one set-based UPDATE each inside a single
+    transaction, the source budget is added to the target's, and archived
+    years are rewritten so they don't keep pointing at the removed category.
+    """
+    categories = get_categories(db_path)
+    source_id = _category_id(categories, source)
+    target_id = _category_id(categories, target)
+    if source_id == target_id:
+        raise ValueError("Source and target categories are the same")
+
+    archive = TransactionArchive(db_path)
+    conn = connect(db_path)
+    try:
+        schemas = _ledger_schemas(conn)
+        moved = 0
+        for schema in schemas:
+            cursor = conn.execute(
+                f'UPDATE {schema}.transactions SET category_id = ? WHERE category_id = ?',
+                (target_id, source_id)
+            )
+            moved += cursor.rowcount
+            cursor = conn.execute(
+                f'UPDATE {schema}.transaction_splits SET category_id = ? WHERE category_id = ?',
+                (target_id, source_id)
+            )
+            moved += cursor.rowcount
+
+        conn.execute('''
+            UPDATE categories
+            SET budget = budget + (SELECT budget FROM categories WHERE id = ?)
+            WHERE id = ?
+        ''', (source_id, target_id))
+        conn.execute('DELETE FROM categories WHERE id = ?', (source_id,))
+
+        # Archived years are rewritten to staging files and only swapped in once
+        # the ledgers have committed, so a failure leaves both as they were
+        moved += archive.replace_category(source_id, target_id)
+
+        # Cached outlier stats change in the same transaction as the rows they
+        # describe, reading the staged archives so they match the merged rows
+        refresh_category_stats(conn, [source_id, target_id], archive)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        archive.discard_staged()
+        raise
+    finally:
+        conn.close()
+    archive.commit_staged()
+
+    invalidate_categories()
+    invalidate_transaction_store()
+    publish(CATEGORIES, DataChange(categories={source_id, target_id}))
+    return moved
+
+
+def preview_reassign(pattern, target, source=None, db_path=None):
+    """Return how many transactions per ledger match a payee pattern."""
+    categories = get_categories(db_path)
+    _category_id(categories, target)
+    source_id = _category_id(categories, source) if source else None
+
+    conn = connect(db_path)
+    try:
+        where, params = _payee_filter(pattern, source_id)
+        return _count(conn, _ledger_schemas(conn), where, params)
+    finally:
+        conn.close()
+
+
+def reassign_payees(pattern, target, source=None, db_path=None):
+    """Give every live transaction whose payee matches a LIKE pattern a new category.
+
+    Restricting to a source category lets one category be split in two.
+    Archived years are left as they were categorized.
+    """
+    categories = get_categories(db_path)
+    target_id = _category_id(categories, target)
+    source_id = _category_id(categories, source) if source else None
+
+    conn = connect(db_path)
+    try:
+        where, params = _payee_filter(pattern, source_id)
+        schemas = _ledger_schemas(conn)
+
+        # Note which categories lose rows so their cached stats can be refreshed too
+        touched = {target_id}
+        for schema in schemas:
+            rows = conn.execute(
+                f'SELECT DISTINCT category_id FROM {schema}.transactions WHERE {where.format(schema=schema)}', params
+            )
+            touched.update(row[0] for row in rows)
+
+        updated = 0
+        for schema in schemas:
+            cursor = conn.execute(
+                f'UPDATE {schema}.transactions SET category_id = ? WHERE {where.format(schema=schema)}',
+                [target_id] + params
+            )
+            updated += cursor.rowcount
+
+        refresh_category_stats(conn, touched)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    invalidate_transaction_store()
+    publish(TRANSACTIONS, DataChange(categories=touched))
+    return updated
+
+
+def rename_category(old_name, new_name, db_path=None):
+    """Rename a category; transactions refer to it by id so history follows."""
+    categories = get_categories(db_path)
+    category_id = _category_id(categories, old_name)
+    if categories.id_for(new_name) is not None:
+        raise ValueError(f"A category named {new_name} already exists")
+
+    conn = connect(db_path)
+    try:
+        conn.execute('UPDATE categories SET name = ? WHERE id = ?', (new_name, category_id))
+        conn.commit()
+    finally:
+        conn.close()
+    invalidate_categories()
+    publish(CATEGORIES, DataChange(categories={category_id}))
+
+
+def _confirm(counts, dry_run, assume_yes):
+    """Print the preview counts and decide whether to go ahead."""
+    total = sum(counts.values())
+    for schema, count in counts.items():
+        print(f"  {schema}: {count} transactions")
+    print(f"{total} transactions affected")
+    if dry_run or total == 0:
+        return False
+    return assume_yes or input("Apply? [y/N] ").strip().lower() == 'y'
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rename, merge and reassign categories.")
+    subparsers = parser.add_subparsers(dest='action', required=True)
+
+    merge_parser = subparsers.add_parser('merge', help="merge SOURCE into TARGET")
+    merge_parser.add_argument('source')
+    merge_parser.add_argument('target')
+
+    reassign_parser = subparsers.add_parser('reassign', help="recategorize payees matching a LIKE pattern")
+    reassign_parser.add_argument('pattern', help="e.g. %%NETFLIX%%")
+    reassign_parser.add_argument('target')
+    reassign_parser.add_argument('--from', dest='source', help="only move rows from this category")
+
+    rename_parser = subparsers.add_parser('rename', help="rename a category")
+    rename_parser.add_argument('old_name')
+    rename_parser.add_argument('new_name')
+
+    for sub in (merge_parser, reassign_parser):
+        sub.add_argument('--dry-run', action='store_true', help="only show the affected row counts")
+        sub.add_argument('--yes', action='store_true', help="apply without asking")
+
+    add_arguments(parser)
+    args = parser.parse_args()
+    configure_from_args(args)
+
+    if args.action == 'rename':
+        rename_category(args.old_name, args.new_name)
+        print(f"Renamed {args.old_name} to {args.new_name}")
+    elif args.action == 'merge':
+        counts = preview_merge(args.source, args.target)
+        if _confirm(counts, args.dry_run, args.yes):
+            print(f"Moved {merge_categories(args.source, args.target)} transactions")
+    elif args.action == 'reassign':
+        counts = preview_reassign(args.pattern, args.target, args.source)
+        if _confirm(counts, args.dry_run, args.yes):
+            print(f"Updated {reassign_payees(args.pattern, args.target, args.source)} transactions")
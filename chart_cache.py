@@ -0,0 +1,116 @@
+import os
+import hashlib
+import tkinter as tk
+from tkinter import ttk
+import matplotlib
+from matplotlib.figure import Figure
+from PIL import Image, ImageTk
+from config import data_path
+
+CHART_CACHE_DIR = 'chart_cache'
+MAX_CACHE_BYTES = 50 * 1024 * 1024
+# Bump when a chart's drawing code changes so old renders stop matching
+CHART_VERSION = 2
+
+
+def chart_fingerprint(kind, data, figsize, dpi=100, theme=None):
+    """Hash everything that decides how a chart looks into a cache key."""
+    payload = repr((CHART_VERSION, matplotlib.__version__, kind, data, tuple(figsize), dpi, theme))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ChartCache:
+    """Rendered chart PNGs on disk, evicting the least recently used past a size limit.
+
+    A file's modification time doubles as its last-used time, so the LRU
+    order survives restarts without a separate index.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir or data_path(CHART_CACHE_DIR)
+        self.max_bytes = max_bytes
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.png")
+
+    def get(self, key):
+        """Return the path of a cached render, or None on a miss."""
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key, fig):
+        """Render a figure into the cache and return its path."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path(key)
+        # Write to a temporary file first so a crash never leaves a half-written PNG
+        tmp_path = f"{path}.tmp"
+        fig.savefig(tmp_path, format='png', facecolor=fig.get_facecolor())
+        os.replace(tmp_path, path)
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep=None):
+        """Delete the least recently used renders until the cache fits its size limit."""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.png'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        if os.path.isdir(self.cache_dir):
+            for entry in os.scandir(self.cache_dir):
+                os.remove(entry.path)
+
+
+_cache = None
+
+
+def get_chart_cache():
+    global _cache
+    if _cache is None:
+        _cache = ChartCache()
+    return _cache
+
+
+def show_chart(master, kind, data, draw, figsize, dpi=100, theme=None, cache=None):
+    """Show a chart as an image in master, rendering it only when the cache has no match.
+
+    draw(fig) fills in a blank Figure; it is only called on a miss. data must
+    hold every input the drawing depends on, since it is what gets fingerprinted.
+    """
+    cache = cache or get_chart_cache()
+    key = chart_fingerprint(kind, data, figsize, dpi, theme)
+    path = cache.get(key)
+    try:
+        if path is None:
+            raise FileNotFoundError(key)
+        with Image.open(path) as image:
+            photo = ImageTk.PhotoImage(image)
+    except OSError:
+        # Missed, or the cached file was unreadable: render it afresh
+        fig = Figure(figsize=figsize, dpi=dpi)
+        draw(fig)
+        path = cache.put(key, fig)
+        with Image.open(path) as image:
+            photo = ImageTk.PhotoImage(image)
+
+    label = ttk.Label(master, image=photo)
+    label.image = photo  # Keep a reference to prevent garbage collection
+    label.pack(fill=tk.BOTH, expand=True)
+    return label
@@ -0,0 +1,173 @@
+import os
+import atexit
+import shutil
+import sqlite3
+import tempfile
+import configparser
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_NAME = 'financial_data.db'
+CONFIG_FILE = 'finance.ini'
+DB_ENV = 'FINANCE_DB'
+MODE_ENV = 'FINANCE_DB_MODE'
+# Reports are shown in this currency unless the config file names another
+DEFAULT_REPORTING_CURRENCY = 'NZD'
+
+# file uses the database in place. memory loads a copy into a shared-cache
+# database in RAM (empty for :memory:), and ramdisk copies it to a
+# RAM-backed filesystem. Both discard their changes at exit and keep account
+# ledgers and archives in a scratch folder, so the real data is never touched.
+MODES = ('file', 'memory', 'ramdisk')
+RAMDISK_DIR = '/dev/shm'
+# Folders kept beside the database that hold data rather than caches
+DATA_DIRS = ('accounts', 'archive', 'fx_rates')
+
+_settings = {}
+# Holds the shared in-memory database open; it is dropped when the last connection closes
+_keeper = None
+
+
+def read_config_file(path=None, section='database'):
+    """Return a section's settings from the config file, or {} if there is none.
+
+        [database]
+        path = data/financial_data.db
+        mode = file
+
+        [reporting]
+        currency = NZD
+
+    Without a path, finance.ini is looked for in the working directory and
+    then beside the app. A relative database path is taken relative to the
+    file it was set in.
+    """
+    candidates = [path] if path else [os.path.join(os.getcwd(), CONFIG_FILE), os.path.join(APP_DIR, CONFIG_FILE)]
+    for candidate in candidates:
+        parser = configparser.ConfigParser()
+        if parser.read(candidate) and parser.has_section(section):
+            settings = dict(parser[section])
+            if section == 'database' and settings.get('path') and settings['path'] != ':memory:':
+                settings['path'] = os.path.join(os.path.dirname(os.path.abspath(candidate)), settings['path'])
+            return settings
+    return {}
+
+
+def configure(db_path=None, mode=None, config_file=None):
+    """Decide which database every module uses and return its path.
+
+    A value passed in (normally from --db and --db-mode) wins over the
+    FINANCE_DB and FINANCE_DB_MODE environment variables, which win over the
+    config file. Otherwise the database beside the app is used, so the app
+    works whichever directory it is launched from.
+    """
+    global _keeper
+    file_settings = read_config_file(config_file)
+    db_path = db_path or os.environ.get(DB_ENV) or file_settings.get('path') or os.path.join(APP_DIR, DB_NAME)
+    mode = mode or os.environ.get(MODE_ENV) or file_settings.get('mode') or 'file'
+    if db_path == ':memory:':
+        mode = 'memory'
+    if mode not in MODES:
+        raise ValueError(f"Unknown database mode {mode!r}; expected one of {', '.join(MODES)}")
+
+    if _keeper is not None:
+        _keeper.close()
+        _keeper = None
+
+    source = None if db_path == ':memory:' else os.path.abspath(db_path)
+    if mode == 'file':
+        data_dir = os.path.dirname(source)
+        path = source
+    else:
+        data_dir = _scratch_dir(RAMDISK_DIR if mode == 'ramdisk' and os.path.isdir(RAMDISK_DIR) else None)
+        if mode == 'memory':
+            path = f"file:finance_{os.getpid()}_{os.path.basename(data_dir)}?mode=memory&cache=shared"
+            _keeper = sqlite3.connect(path, uri=True, check_same_thread=False)
+        else:
+            path = os.path.join(data_dir, os.path.basename(source))
+        if source:
+            _copy_data(source, path, data_dir)
+
+    # Transactions store no currency when they are in this one, so it should be set before importing
+    currency = read_config_file(config_file, 'reporting').get('currency') or DEFAULT_REPORTING_CURRENCY
+    _settings.update(db_path=path, data_dir=data_dir, mode=mode, reporting_currency=currency.strip().upper())
+    return path
+
+
+def worker_settings():
+    """Return the resolved settings, to hand to configure_worker in a spawned process."""
+    get_db_path()
+    return dict(_settings)
+
+
+def configure_worker(settings):
+    """Pool initializer that points a spawned worker at the parent's files.
+
+    The parent's choice is reused as resolved rather than decided again, so
+    scratch copies aren't made twice. A memory database can't be shared with
+    another process; workers see only their own empty one.
+    """
+    _settings.clear()
+    _settings.update(settings)
+
+
+def _scratch_dir(parent=None):
+    """Make a folder that is removed when the program exits."""
+    scratch = tempfile.mkdtemp(prefix='finance_', dir=parent)
+    atexit.register(shutil.rmtree, scratch, True)
+    return scratch
+
+
+def _copy_data(source, path, data_dir):
+    """Copy a database and its data folders into a scratch location, if they exist."""
+    if os.path.exists(source):
+        # The backup API gives a consistent copy even if the app is writing to the source
+        src = sqlite3.connect(source)
+        dst = sqlite3.connect(path, uri=True)
+        try:
+            src.backup(dst)
+        finally:
+            dst.close()
+            src.close()
+    for name in DATA_DIRS:
+        folder = os.path.join(os.path.dirname(source), name)
+        if os.path.isdir(folder):
+            shutil.copytree(folder, os.path.join(data_dir, name))
+
+
+def get_db_path():
+    """Return the configured database path, configuring from the defaults on first use."""
+    if not _settings:
+        configure()
+    return _settings['db_path']
+
+
+def get_mode():
+    get_db_path()
+    return _settings['mode']
+
+
+def get_reporting_currency():
+    """Return the currency every report is shown in, from the [reporting] section of the config file."""
+    get_db_path()
+    return _settings['reporting_currency']
+
+
+def data_path(*parts):
+    """Return a path in the folder that holds the database's accounts, archives and backups."""
+    get_db_path()
+    return os.path.join(_settings['data_dir'], *parts)
+
+
+def connect(db_path=None, **kwargs):
+    """Open a connection to the given database, or the configured one."""
+    return sqlite3.connect(db_path or get_db_path(), uri=True, **kwargs)
+
+
+def add_arguments(parser):
+    """Add the --db and --db-mode options to a command's argument parser."""
+    parser.add_argument('--db', help=f"database file, or :memory: (default: ${DB_ENV}, {CONFIG_FILE} or {DB_NAME} beside the app)")
+    parser.add_argument('--db-mode', choices=MODES, help=f"how to open the database (default: ${MODE_ENV} or file)")
+
+
+def configure_from_args(args):
+    return configure(args.db, args.db_mode)
@@ -0,0 +1,153 @@
+# Shared table definitions so the main ledger and per-account ledgers stay identical
+
+def create_transactions_table(cursor, schema='main'):
+    """Create the transactions table and its indexes in the given database schema.
+
+    Older ledgers that stored the category name as text are upgraded to the
+    integer category_id first. The categories table always lives in main.
+    """
+    cursor.execute(f"PRAGMA {schema}.table_info(transactions)")
+    columns = [row[1] for row in cursor.fetchall()]
+    if 'category' in columns and 'category_id' not in columns:
+        migrate_category_ids(cursor, schema)
+
+    # Foreign keys can't point across attached databases, so only main declares one
+    reference = ' REFERENCES categories(id)' if schema == 'main' else ''
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {schema}.transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT,
+            description TEXT,
+            amount REAL,
+            category_id INTEGER{reference},
+            payee TEXT,
+            month REAL,
+            year REAL,
+            currency TEXT
+        )
+        """)
+
+    # Ledgers from before multi-currency support are all in the reporting currency
+    if columns and 'currency' not in columns:
+        cursor.execute(f"ALTER TABLE {schema}.transactions ADD COLUMN currency TEXT")
+    # Covers the per-month totals queries, including the currency and date
+    # needed to convert foreign amounts, so they are answered from the index
+    # alone; it replaces the older period indexes
+    for old_index in ('idx_transactions_period', 'idx_transactions_period_totals'):
+        cursor.execute(f"DROP INDEX IF EXISTS {schema}.{old_index}")
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS {schema}.idx_transactions_reporting
+        ON transactions (year, month, category_id, currency, date, amount)
+        """)
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS {schema}.idx_transactions_category
+        ON transactions (category_id)
+        """)
+    # Covers reading a few payees' history, for category suggestions and subscription checks
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS {schema}.idx_transactions_payee
+        ON transactions (payee, category_id, date, amount)
+        """)
+
+    # A split transaction keeps a NULL category_id and spreads its amount over
+    # these rows, which must sum to it. They live in the same ledger as their parent.
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {schema}.transaction_splits (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            transaction_id INTEGER NOT NULL REFERENCES transactions(id) ON DELETE CASCADE,
+            category_id INTEGER{reference},
+            amount REAL NOT NULL
+        )
+        """)
+    # Covers the join from a parent to its split amounts
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS {schema}.idx_transaction_splits_transaction
+        ON transaction_splits (transaction_id, category_id, amount)
+        """)
+
+
+def migrate_category_ids(cursor, schema='main'):
+    """Rebuild a transactions table so it references categories by id instead of name."""
+    # Register names that only appear in history so no transaction is orphaned
+    cursor.execute(f"""
+        INSERT INTO main.categories (name, type, budget)
+        SELECT DISTINCT category, 'Spending', 0
+        FROM {schema}.transactions
+        WHERE category IS NOT NULL
+          AND category NOT IN (SELECT name FROM main.categories)
+        """)
+
+    cursor.execute(f"DROP INDEX IF EXISTS {schema}.idx_transactions_period")
+    cursor.execute(f"ALTER TABLE {schema}.transactions RENAME TO transactions_old")
+    create_transactions_table(cursor, schema)
+    cursor.execute(f"""
+        INSERT INTO {schema}.transactions (id, date, description, amount, category_id, payee, month, year)
+        SELECT t.id, t.date, t.description, t.amount,
+               (SELECT MIN(c.id) FROM main.categories c WHERE c.name = t.category),
+               t.payee, t.month, t.year
+        FROM {schema}.transactions_old t
+        """)
+    cursor.execute(f"DROP TABLE {schema}.transactions_old")
+
+
+def create_networth_tables(cursor):
+    """Create the net worth account registry and the snapshot values keyed to it.
+
+    Older databases that repeated the asset name and type on every snapshot
+    row are upgraded first.
+    """
+    cursor.execute("PRAGMA main.table_info(networth)")
+    columns = [row[1] for row in cursor.fetchall()]
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS networth_accounts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            type TEXT NOT NULL,
+            active INTEGER NOT NULL DEFAULT 1,
+            position INTEGER NOT NULL DEFAULT 0,
+            currency TEXT,
+            UNIQUE (name, type)
+        )
+        """)
+    cursor.execute("PRAGMA main.table_info(networth_accounts)")
+    if 'currency' not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute("ALTER TABLE networth_accounts ADD COLUMN currency TEXT")
+
+    if 'asset_name' in columns:
+        migrate_networth_accounts(cursor)
+
+    # One value per account per day, so saving twice in a day replaces rather than grows
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS networth (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT,
+            account_id INTEGER REFERENCES networth_accounts(id),
+            amount REAL,
+            UNIQUE (date, account_id)
+        )
+        """)
+
+
+def migrate_networth_accounts(cursor):
+    """Move asset names out of the snapshot rows into the account registry."""
+    # Register each distinct asset in the order it first appeared
+    cursor.execute("""
+        INSERT OR IGNORE INTO networth_accounts (name, type, position)
+        SELECT asset_name, type, MIN(id)
+        FROM networth
+        WHERE asset_name IS NOT NULL
+        GROUP BY asset_name, type
+        ORDER BY MIN(id)
+        """)
+
+    cursor.execute("ALTER TABLE networth RENAME TO networth_old")
+    create_networth_tables(cursor)
+    cursor.execute("""
+        INSERT INTO networth (date, account_id, amount)
+        SELECT n.date, a.id, SUM(n.amount)
+        FROM networth_old n
+        JOIN networth_accounts a ON a.name = n.asset_name AND a.type = n.type
+        GROUP BY n.date, a.id
+        """)
+    cursor.execute("DROP TABLE networth_old")
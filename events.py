@@ -0,0 +1,120 @@
+# Topics a change can be published under
+TRANSACTIONS = 'transactions'
+NETWORTH = 'networth'
+CATEGORIES = 'categories'
+
+# Bursts of writes, such as an import committing batch after batch, become one refresh
+COALESCE_MS = 200
+
+
+class DataChange:
+    """What a write touched: (year, month) periods, category ids, accounts and net worth dates.
+
+    Each is a set, or None when the write could have touched any of them.
+    """
+    FIELDS = ('periods', 'categories', 'accounts', 'dates')
+
+    def __init__(self, periods=None, categories=None, accounts=None, dates=None):
+        self.periods = None if periods is None else set(periods)
+        self.categories = None if categories is None else set(categories)
+        self.accounts = None if accounts is None else set(accounts)
+        self.dates = None if dates is None else set(dates)
+
+    def merge(self, other):
+        """Return a change covering both this one and another."""
+        merged = DataChange()
+        for field in self.FIELDS:
+            mine, theirs = getattr(self, field), getattr(other, field)
+            setattr(merged, field, None if mine is None or theirs is None else mine | theirs)
+        return merged
+
+    def touches(self, field, values):
+        """Whether the change may have touched any of the given values of a field."""
+        touched = getattr(self, field)
+        return touched is None or not touched.isdisjoint(values)
+
+    def __repr__(self):
+        fields = ', '.join(f"{field}={getattr(self, field)!r}" for field in self.FIELDS)
+        return f"DataChange({fields})"
+
+
+class EventBus:
+    """In-process notifications of data changes, so open pages refresh only what a write touched.
+
+    Writers publish a DataChange under a topic once their rows are committed,
+    and pages subscribe to the topics they show. Once attached to the Tk root,
+    changes published within a short delay are merged and delivered in one
+    call per topic; until then they are delivered immediately.
+    """
+
+    def __init__(self):
+        self.subscribers = {}
+        # Changes waiting to be delivered, merged per topic
+        self.pending = {}
+        self.widget = None
+        self.delay = COALESCE_MS
+        self.scheduled = None
+
+    def attach(self, widget, delay=COALESCE_MS):
+        """Deliver on the widget's event loop, coalescing changes published within delay ms."""
+        self.widget = widget
+        self.delay = delay
+
+    def close(self):
+        """Stop delivering changes once the window and the pages that subscribed are gone.
+
+        Writes flushed while the process exits then go unannounced instead of
+        reaching destroyed widgets.
+        """
+        self.widget = None
+        self.scheduled = None
+        self.subscribers = {}
+        self.pending = {}
+
+    def subscribe(self, topic, callback):
+        """Call callback(change) after writes to a topic. Returns a function that unsubscribes."""
+        self.subscribers.setdefault(topic, []).append(callback)
+        return lambda: self.unsubscribe(topic, callback)
+
+    def unsubscribe(self, topic, callback):
+        callbacks = self.subscribers.get(topic, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+
+    def publish(self, topic, change=None):
+        change = change or DataChange()
+        self.pending[topic] = self.pending[topic].merge(change) if topic in self.pending else change
+        if self.widget is None:
+            self.flush()
+        elif self.scheduled is None:
+            self.scheduled = self.widget.after(self.delay, self.flush)
+
+    def flush(self):
+        """Deliver every pending change now, in the order subscribers signed up.
+
+        Subscribers handle their own errors, so one failing page doesn't stop
+        the others hearing about the change.
+        """
+        if self.scheduled is not None and self.widget is not None:
+            self.widget.after_cancel(self.scheduled)
+        self.scheduled = None
+        pending, self.pending = self.pending, {}
+        for topic, change in pending.items():
+            for callback in list(self.subscribers.get(topic, [])):
+                callback(change)
+
+
+# The session's bus, shared by every module
+_bus = EventBus()
+
+
+def get_event_bus():
+    return _bus
+
+
+def subscribe(topic, callback):
+    return _bus.subscribe(topic, callback)
+
+
+def publish(topic, change=None):
+    _bus.publish(topic, change)
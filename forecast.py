@@ -0,0 +1,119 @@
+import calendar
+import numpy as np
+import pandas as pd
+from accounts import ALL_ACCOUNTS, MAIN_ACCOUNT, attach_all_accounts
+from archive import TransactionArchive
+from categories import get_categories
+from fx import FX_DATE, to_reporting_currency
+from config import connect
+
+
+def load_daily_totals(conn, start_period, end_period, account=ALL_ACCOUNTS, archive=None):
+    """Sum amounts per category, month and day of month for a range of periods.
+
+    Periods are year * 12 + (month - 1). Archived years are included when the
+    main ledger is part of the selection. Amounts are in the reporting currency.
+    """
+    df = pd.read_sql_query(f'''
+        SELECT category_id, year, month,
+               CAST(substr(date, 9, 2) AS INTEGER) AS day,
+               currency, {FX_DATE} AS fx_date,
+               SUM(amount) AS amount
+        FROM all_category_amounts
+        WHERE year * 12 + month - 1 BETWEEN ? AND ?
+          AND (? = ? OR account = ?)
+        GROUP BY category_id, year, month, day, currency, fx_date
+    ''', conn, params=(start_period, end_period, account, ALL_ACCOUNTS, account))
+    df = to_reporting_currency(df, ['amount']).drop(columns=['currency', 'fx_date'])
+
+    archive = archive or TransactionArchive()
+    if account in (ALL_ACCOUNTS, MAIN_ACCOUNT):
+        frames = [df]
+        for year in archive.archived_years():
+            if start_period // 12 <= year <= end_period // 12:
+                archived = archive.read(year, columns=['category_id', 'year', 'month', 'date', 'amount', 'currency'])
+                archived = to_reporting_currency(archived, ['amount'], date_column='date')
+                archived['day'] = archived['date'].str[8:10].astype(int)
+                frames.append(archived.drop(columns=['date', 'currency']))
+        df = pd.concat(frames, ignore_index=True)
+
+    df = df.dropna(subset=['category_id'])
+    df['period'] = (df['year'] * 12 + df['month'] - 1).astype(int)
+    return df.groupby(['category_id', 'period', 'day'], as_index=False)['amount'].sum()
+
+
+def project_month_end(daily, category_ids, budgets, period, day, history_months=12):
+    """Project month-end totals and overspend probabilities for every category at once.
+
+    For each of the last history_months months, the amount a category spent
+    after the given day is added to this month's spending so far. The mean of
+    those outcomes is the projection, and the share of them over budget is the
+    overspend probability (NaN where a category has no budget).
+    """
+    index = {category_id: i for i, category_id in enumerate(category_ids)}
+    n_categories = len(category_ids)
+    first_period = period - history_months
+
+    # Dense category x month x day array; the last month slot is the current month
+    grid = np.zeros((n_categories, history_months + 1, 31))
+    rows = daily[daily['category_id'].isin(index.keys())
+                 & (daily['period'] >= first_period) & (daily['period'] <= period)]
+    if not rows.empty:
+        c = rows['category_id'].map(index).to_numpy(dtype=int)
+        m = (rows['period'] - first_period).to_numpy(dtype=int)
+        d = rows['day'].clip(1, 31).to_numpy(dtype=int) - 1
+        np.add.at(grid, (c, m, d), rows['amount'].to_numpy())
+
+    cumulative = grid.cumsum(axis=2)
+    to_date = cumulative[:, -1, day - 1]
+
+    # What each past month still spent between this day and its month end
+    history = cumulative[:, :-1, :]
+    remaining = history[:, :, -1] - history[:, :, day - 1]
+
+    # Only months the ledger actually covers count, for every category alike
+    covered = grid[:, :-1, :].any(axis=(0, 2))
+    active = np.broadcast_to(covered, remaining.shape)
+    months_used = active.sum(axis=1)
+
+    outcomes = np.abs(to_date[:, None] + remaining)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        projected = np.where(
+            months_used > 0,
+            (outcomes * active).sum(axis=1) / months_used,
+            # Without history, extrapolate this month's pace linearly
+            np.abs(to_date) * calendar.monthrange(period // 12, period % 12 + 1)[1] / day
+        )
+        over = (outcomes > np.asarray(budgets)[:, None]) & active
+        probability = np.where(
+            (np.asarray(budgets) > 0) & (months_used > 0),
+            over.sum(axis=1) / months_used,
+            np.nan
+        )
+    return projected, probability
+
+
+def forecast_month(year, month, day, account=ALL_ACCOUNTS, db_path=None,
+                   categories=None, history_months=12, conn=None):
+    """Return {category_id: (projected total, overspend probability)} for a month in progress.
+
+    Reads through conn when given, which must already have the account
+    ledgers attached, such as a connection from the API's read-only pool.
+    """
+    categories = categories or get_categories(db_path)
+    category_ids = [category.id for category in categories]
+    budgets = [category.budget or 0 for category in categories]
+    period = year * 12 + month - 1
+
+    if conn is not None:
+        daily = load_daily_totals(conn, period - history_months, period, account)
+    else:
+        conn = connect(db_path)
+        try:
+            attach_all_accounts(conn)
+            daily = load_daily_totals(conn, period - history_months, period, account)
+        finally:
+            conn.close()
+
+    projected, probability = project_month_end(daily, category_ids, budgets, period, day, history_months)
+    return {category_id: (projected[i], probability[i]) for i, category_id in enumerate(category_ids)}
@@ -0,0 +1,269 @@
+import os
+import glob
+import sqlite3
+import argparse
+import warnings
+import numpy as np
+import pandas as pd
+from config import add_arguments, configure_from_args, connect, data_path, get_db_path, get_reporting_currency
+
+FX_DIR = 'fx_rates'
+
+# Group foreign-currency rows by date so each can be converted at its own rate,
+# while rows in the reporting currency still collapse into one group
+FX_DATE = 'CASE WHEN currency IS NULL THEN NULL ELSE date END'
+
+# One rate table per database, loaded on first use and kept for the session
+_rates = {}
+
+
+def create_fx_tables(cursor):
+    # rate is how many units of the reporting currency one unit of currency buys
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS fx_rates (
+            currency TEXT,
+            date TEXT,
+            rate REAL,
+            PRIMARY KEY (currency, date)
+        )
+        """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS account_currencies (
+            account TEXT PRIMARY KEY,
+            currency TEXT
+        )
+        """)
+
+
+def normalize_currency(currency):
+    """Upper-case a currency code, treating the reporting currency as no currency.
+
+    Every report is shown in the reporting currency, set in the config file;
+    transactions with no currency are already in it.
+    """
+    if currency is None or pd.isna(currency):
+        return None
+    currency = str(currency).strip().upper()
+    return None if currency in ('', get_reporting_currency()) else currency
+
+
+class FxRates:
+    """Every known rate, sorted by currency and date for vectorized as-of lookups."""
+
+    def __init__(self, rows):
+        df = pd.DataFrame(rows, columns=['currency', 'date', 'rate'])
+        df['date'] = pd.to_datetime(df['date'], format='%Y/%m/%d', errors='coerce')
+        df = df.dropna(subset=['date', 'rate'])
+        df['day'] = df['date'].to_numpy(dtype='datetime64[D]').astype(np.int64)
+
+        self.currencies = sorted(df['currency'].unique())
+        self.codes = {currency: i for i, currency in enumerate(self.currencies)}
+        keys = self._keys(df['currency'].map(self.codes).to_numpy(dtype=np.int64), df['day'].to_numpy())
+        order = np.argsort(keys)
+        self.keys = keys[order]
+        self.rates = df['rate'].to_numpy(dtype=float)[order]
+        # Index of each currency's earliest rate, used for dates before it
+        self.first = np.searchsorted(self.keys, self._keys(np.arange(len(self.currencies)), np.iinfo(np.int32).min))
+        # The fx_version the rates were loaded at
+        self.version = None
+
+    @staticmethod
+    def _keys(codes, days):
+        # Currency in the high bits and day in the low bits, so one sorted array serves every currency
+        return (np.asarray(codes, dtype=np.int64) << 32) + (np.asarray(days, dtype=np.int64) + 2 ** 31)
+
+    @classmethod
+    def load(cls, db_path=None):
+        conn = connect(db_path)
+        try:
+            version = fx_version(conn)
+            rows = conn.execute('SELECT currency, date, rate FROM fx_rates').fetchall()
+        except sqlite3.OperationalError:
+            # Databases from before multi-currency support have no rate table
+            rows = []
+        finally:
+            conn.close()
+        rates = cls(rows)
+        rates.version = version
+        return rates
+
+    def rates_for(self, currencies, dates):
+        """Return the rate in effect on each date for each currency, in one pass.
+
+        Rows without a currency get 1. A date before a currency's first known
+        rate uses that first rate. Rows in a currency with no rates loaded get
+        NaN, with a warning, so one missing rate file doesn't stop every report.
+        """
+        # Normalize and look up each distinct currency once rather than per row
+        row_codes, uniques = pd.factorize(pd.Series(currencies, dtype=object))
+        normalized = [normalize_currency(currency) for currency in uniques]
+        # The trailing -1 is what missing values (factorize code -1) pick up; -2 marks currencies without rates
+        unique_codes = np.array([self.codes.get(c, -2) if c else -1 for c in normalized] + [-1], dtype=np.int64)
+        codes = unique_codes[row_codes]
+
+        result = np.ones(len(codes))
+        unknown = codes == -2
+        if unknown.any():
+            missing = sorted({c for c in normalized if c and c not in self.codes})
+            warnings.warn(f"No exchange rates loaded for {', '.join(missing)}; "
+                          f"{int(unknown.sum())} row(s) in them are left out until rates are loaded")
+            result[unknown] = np.nan
+
+        foreign = codes >= 0
+        if not foreign.any():
+            return result
+
+        codes = codes[foreign]
+        days = np.asarray(pd.to_datetime(pd.Series(dates)), dtype='datetime64[D]')[foreign]
+        if np.isnat(days).any():
+            raise ValueError("Foreign currency rows need a valid date to be converted")
+
+        # Latest rate on or before each date; a match in another currency means none yet
+        found = np.searchsorted(self.keys, self._keys(codes, days.astype(np.int64)), side='right') - 1
+        before_first = (found < 0) | ((self.keys[np.maximum(found, 0)] >> 32) != codes)
+        found = np.where(before_first, self.first[codes], found)
+        result[foreign] = self.rates[found]
+        return result
+
+
+def fx_version(conn):
+    """Summarize the rate and account currency tables, so changes made elsewhere can be noticed."""
+    try:
+        rates = conn.execute('SELECT COUNT(*), TOTAL(rate), MIN(date), MAX(date) FROM fx_rates').fetchone()
+        accounts = conn.execute('SELECT account, currency FROM account_currencies ORDER BY account').fetchall()
+    except sqlite3.OperationalError:
+        return None
+    return rates, tuple(accounts)
+
+
+def get_fx_rates(db_path=None):
+    """Return the cached rate table, reloading it if rates were loaded since, e.g. by python fx.py."""
+    db_path = db_path or get_db_path()
+    if db_path in _rates:
+        conn = connect(db_path)
+        try:
+            current = fx_version(conn) == _rates[db_path].version
+        finally:
+            conn.close()
+        if current:
+            return _rates[db_path]
+    _rates[db_path] = FxRates.load(db_path)
+    return _rates[db_path]
+
+
+def invalidate_fx_rates():
+    """Forget cached rates so the next call reloads from the database."""
+    _rates.clear()
+
+
+def to_reporting_currency(df, columns, date_column='fx_date', currency_column='currency',
+                          date_format='%Y/%m/%d', db_path=None):
+    """Return a copy of df with the amount columns converted to the reporting currency.
+
+    Rows in a currency with no rates loaded are dropped, with a warning.
+    """
+    dates = pd.to_datetime(df[date_column], format=date_format, errors='coerce')
+    rates = get_fx_rates(db_path).rates_for(df[currency_column], dates)
+    df = df.copy()
+    df[columns] = df[columns].mul(rates, axis=0)
+    return df[~np.isnan(rates)]
+
+
+def account_currency(account, db_path=None):
+    """Return the currency an account's statements are in, or None for the reporting currency."""
+    conn = connect(db_path)
+    try:
+        row = conn.execute('SELECT currency FROM account_currencies WHERE account = ?', (account,)).fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    finally:
+        conn.close()
+    return normalize_currency(row[0]) if row else None
+
+
+def set_account_currency(account, currency, db_path=None):
+    conn = connect(db_path)
+    try:
+        create_fx_tables(conn.cursor())
+        conn.execute(
+            'INSERT OR REPLACE INTO account_currencies (account, currency) VALUES (?, ?)',
+            (account, normalize_currency(currency))
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def read_rate_file(path):
+    """Read a CSV of date and rate columns, plus currency unless the file is named after one."""
+    df = pd.read_csv(path)
+    df.columns = [column.strip().lower() for column in df.columns]
+    if 'currency' not in df.columns:
+        df['currency'] = os.path.splitext(os.path.basename(path))[0]
+    missing = {'date', 'rate'} - set(df.columns)
+    if missing:
+        raise ValueError(f"{os.path.basename(path)}: missing column(s) {', '.join(sorted(missing))}")
+
+    dates = pd.to_datetime(df['date'], errors='coerce')
+    if dates.isna().any():
+        raise ValueError(f"{os.path.basename(path)}: {int(dates.isna().sum())} row(s) with invalid dates")
+    return pd.DataFrame({
+        'currency': df['currency'].map(normalize_currency),
+        'date': dates.dt.strftime('%Y/%m/%d'),
+        'rate': pd.to_numeric(df['rate'], errors='raise'),
+    }).dropna(subset=['currency'])
+
+
+def load_rate_files(paths=None, db_path=None):
+    """Load rate CSVs into the fx_rates table, replacing rates already held for the same days."""
+    paths = paths or sorted(glob.glob(data_path(FX_DIR, '*.csv')))
+    df = pd.concat([read_rate_file(path) for path in paths], ignore_index=True) if paths else None
+    if df is None or df.empty:
+        return 0
+
+    conn = connect(db_path)
+    try:
+        create_fx_tables(conn.cursor())
+        conn.executemany(
+            'INSERT OR REPLACE INTO fx_rates (currency, date, rate) VALUES (?, ?, ?)',
+            df.itertuples(index=False, name=None)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    invalidate_fx_rates()
+    return len(df)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage exchange rates into the reporting currency.")
+    subparsers = parser.add_subparsers(dest='action', required=True)
+
+    load_parser = subparsers.add_parser('load', help=f"load rate CSVs (default: {FX_DIR}/*.csv)")
+    load_parser.add_argument('paths', nargs='*')
+
+    account_parser = subparsers.add_parser('set-account', help="set the currency an account is held in")
+    account_parser.add_argument('account')
+    account_parser.add_argument('currency')
+
+    subparsers.add_parser('list', help="show the loaded rate ranges")
+
+    add_arguments(parser)
+    args = parser.parse_args()
+    configure_from_args(args)
+
+    if args.action == 'load':
+        print(f"Loaded {load_rate_files(args.paths)} rates")
+    elif args.action == 'set-account':
+        set_account_currency(args.account, args.currency)
+        print(f"{args.account} is held in {args.currency.upper()}")
+    else:
+        conn = connect()
+        try:
+            create_fx_tables(conn.cursor())
+            for row in conn.execute('''
+                SELECT currency, MIN(date), MAX(date), COUNT(*) FROM fx_rates GROUP BY currency
+            '''):
+                print("{}: {} to {} ({} rates)".format(*row))
+        finally:
+            conn.close()
@@ -1,12 +1,19 @@
+import os
+import argparse
 import tkinter as tk
 from tkinter import ttk
 from PIL import Image, ImageTk
-import sqlite3
-import datetime
 from monthly_breakdown import MonthlyBreakdown
 from transaction_manager import TransactionManager
 from net_worth import NetWorth
 from theme import ThemeManager
+from database import create_transactions_table, create_networth_tables
+from fx import create_fx_tables
+from anomalies import create_category_stats_table, refresh_category_stats
+from maintenance import create_maintenance_table
+from archive import TransactionArchive
+from config import APP_DIR, add_arguments, configure_from_args, connect
+from events import get_event_bus
 
 
 class FinancialApp:
@@ -16,6 +23,9 @@ class FinancialApp:
         self.root = root
         self.root.title("Financial Management System")
         self.root.geometry("1200x800")
+
+        # Data changes reach the pages through the Tk loop, so a burst of writes is one refresh
+        get_event_bus().attach(self.root)
         
         # Apply theme
         ThemeManager.apply_theme(self.root)
@@ -35,52 +45,30 @@ class FinancialApp:
         # Show the home page initially
         self.show_page(self.home_page)
 
-    def create_db(self):
+    @staticmethod
+    def create_db():
         # create a db if it doesnt exist
-        conn = sqlite3.connect("financial_data.db") 
+        conn = connect()
         cursor = conn.cursor()
 
-        # create transactions table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS transactions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT,
-                description TEXT,
-                amount REAL,
-                category TEXT,
-                payee TEXT,
-                month REAL,
-                year REAL
-            )
-            """)
-        
-        # Create 'networth' table
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS networth (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            date TEXT,
-            asset_name TEXT,
-            amount REAL,
-            type TEXT
-        )
-        """)
+        # Create the net worth account registry and snapshot tables
+        create_networth_tables(cursor)
 
-        # Check if any rows already exist
-        cursor.execute("SELECT COUNT(*) FROM networth")
+        # Start with a few common accounts when the registry is empty
+        cursor.execute("SELECT COUNT(*) FROM networth_accounts")
         row_count = cursor.fetchone()[0]
 
         if row_count == 0:
-            networth_categories = [
+            networth_accounts = [
                 ('Cash', 'asset'),
                 ('Savings Account', 'asset'),
                 ('Student Loan', 'liability'),        
             ]
 
-            for catergory in networth_categories:
-                cursor.execute("""
-                INSERT INTO networth (date, asset_name, amount, type)
-                VALUES (?, ?, ?, ?) 
-                """, (datetime.datetime.now().date(), catergory[0], 0, catergory[1]))
+            cursor.executemany("""
+            INSERT INTO networth_accounts (name, type, position)
+            VALUES (?, ?, ?) 
+            """, [(name, type, position) for position, (name, type) in enumerate(networth_accounts)])
 
         # Create 'settings' table
         cursor.execute("""
@@ -130,8 +118,26 @@ class FinancialApp:
                 """, (catergory[0], catergory[1], catergory[2]))
 
 
+        # create transactions table after categories, which it references by id
+        create_transactions_table(cursor)
+
+        # Exchange rates and per-account currencies for foreign accounts
+        create_fx_tables(cursor)
+
+        # Build the cached outlier stats once; imports keep them up to date afterwards
+        create_category_stats_table(cursor)
+        cursor.execute("SELECT COUNT(*) FROM category_stats")
+        if cursor.fetchone()[0] == 0:
+            refresh_category_stats(conn)
+
+        # Record of backups, snapshots and checks, used to tell when each is next due
+        create_maintenance_table(cursor)
+
         # Save (commit) the changes and close the connection
         conn.commit()
+
+        # Archived years from before categories were referenced by id are upgraded too
+        TransactionArchive().migrate_category_ids(conn)
         conn.close()
 
 
@@ -149,7 +155,7 @@ class FinancialApp:
         title_label.pack(side=tk.LEFT)
 
         # Load and display logo from images folder
-        logo_image = Image.open("images/ZAP Logo.png")
+        logo_image = Image.open(os.path.join(APP_DIR, "images", "ZAP Logo.png"))
         logo_image = logo_image.resize((72, 35))
         logo_photo = ImageTk.PhotoImage(logo_image)
         logo_label = ttk.Label(
@@ -230,6 +236,14 @@ class HomePage(ttk.Frame):
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Financial Management System")
+    add_arguments(parser)
+    configure_from_args(parser.parse_args())
+
     root = tk.Tk()
     app = FinancialApp(root)
-    root.mainloop()
+    try:
+        root.mainloop()
+    finally:
+        # Reviewed rows still pending are written at exit, after the pages are gone
+        get_event_bus().close()
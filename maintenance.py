@@ -0,0 +1,292 @@
+import os
+import time
+import shutil
+import argparse
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import messagebox
+from accounts import ACCOUNTS_DIR, account_path, list_accounts
+from config import add_arguments, configure_from_args, connect, data_path, get_db_path, get_mode
+
+BACKUP_DIR = 'backups'
+SNAPSHOT_DIR = os.path.join(BACKUP_DIR, 'snapshots')  # Both are inside the database's data folder
+KEEP_SNAPSHOTS = 7
+# Pages copied per backup step; the source is unlocked between steps so imports aren't held up
+BACKUP_PAGES = 1024
+BACKUP_SLEEP = 0.01
+# A write from another connection restarts a stepped backup; after this many it copies in one step
+MAX_BACKUP_RESTARTS = 3
+
+# How long after its last run each task is due again, in the order they run
+TASK_INTERVALS = {
+    'backup': timedelta(0),
+    'snapshot': timedelta(days=1),
+    'optimize': timedelta(0),
+    'analyze': timedelta(days=7),
+    'integrity': timedelta(days=7),
+}
+
+# A single worker so runs queue up rather than overlap
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='maintenance')
+_pending = None
+
+
+def create_maintenance_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS maintenance_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task TEXT,
+            finished TEXT,
+            seconds REAL,
+            bytes INTEGER,
+            detail TEXT
+        )
+        """)
+
+
+def database_files(db_path=None):
+    """List (path, relative name) for the main database and every account ledger."""
+    db_path = db_path or get_db_path()
+    files = [(db_path, os.path.basename(db_path))]
+    for name in list_accounts():
+        files.append((account_path(name), os.path.join(ACCOUNTS_DIR, f"{name}.db")))
+    return files
+
+
+class BackupRestarted(Exception):
+    """Raised to abandon a stepped backup that keeps being restarted by writes."""
+
+
+def backup_database(source, dest, pages=BACKUP_PAGES, sleep=BACKUP_SLEEP):
+    """Copy a live database with SQLite's backup API, a few pages at a time.
+
+    Other connections can keep reading and writing between steps. Each
+    write restarts the copy, so under steady writes it falls back to a
+    single step, which only holds writers off for as long as the copy takes.
+    The copy is written beside dest and moved into place once complete.
+    """
+    os.makedirs(os.path.dirname(dest) or '.', exist_ok=True)
+    tmp_path = f"{dest}.tmp"
+    src = connect(source)
+    dst = connect(tmp_path)
+    progress = {'remaining': None, 'restarts': 0}
+
+    def check_restarts(status, remaining, total):
+        if progress['remaining'] is not None and remaining > progress['remaining']:
+            progress['restarts'] += 1
+            if progress['restarts'] >= MAX_BACKUP_RESTARTS:
+                raise BackupRestarted()
+        progress['remaining'] = remaining
+
+    try:
+        try:
+            src.backup(dst, pages=pages, progress=check_restarts, sleep=sleep)
+        except BackupRestarted:
+            src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+    os.replace(tmp_path, dest)
+    return os.path.getsize(dest)
+
+
+def backup_all(db_path=None, backup_dir=None):
+    """Refresh the latest backup of every database file and return the bytes written."""
+    backup_dir = backup_dir or data_path(BACKUP_DIR)
+    return sum(
+        backup_database(path, os.path.join(backup_dir, relative))
+        for path, relative in database_files(db_path)
+    )
+
+
+def snapshot_all(db_path=None, snapshot_dir=None, keep=KEEP_SNAPSHOTS):
+    """Write a compacted copy of every database file with VACUUM INTO, keeping the newest few."""
+    snapshot_dir = snapshot_dir or data_path(SNAPSHOT_DIR)
+    name = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+    # Built under a temporary name so an interrupted snapshot is never mistaken for a whole one
+    tmp_dir = os.path.join(snapshot_dir, f".{name}")
+    total = 0
+    for path, relative in database_files(db_path):
+        dest = os.path.join(tmp_dir, relative)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        conn = connect(path)
+        try:
+            conn.execute('VACUUM INTO ?', (dest,))
+        finally:
+            conn.close()
+        total += os.path.getsize(dest)
+    os.replace(tmp_dir, os.path.join(snapshot_dir, name))
+    rotate_snapshots(snapshot_dir, keep)
+    return total
+
+
+def rotate_snapshots(snapshot_dir=None, keep=KEEP_SNAPSHOTS):
+    """Delete all but the newest snapshots, plus any left half-written."""
+    snapshot_dir = snapshot_dir or data_path(SNAPSHOT_DIR)
+    entries = sorted(os.listdir(snapshot_dir)) if os.path.isdir(snapshot_dir) else []
+    stale = [entry for entry in entries if entry.startswith('.')]
+    complete = [entry for entry in entries if not entry.startswith('.')]
+    for entry in stale + complete[:max(len(complete) - keep, 0)]:
+        shutil.rmtree(os.path.join(snapshot_dir, entry), ignore_errors=True)
+
+
+def optimize_all(db_path=None, full=False):
+    """Refresh query planner statistics, fully with ANALYZE or only where stale with PRAGMA optimize."""
+    total = 0
+    for path, _ in database_files(db_path):
+        conn = connect(path)
+        try:
+            conn.execute('ANALYZE' if full else 'PRAGMA optimize')
+            conn.commit()
+        finally:
+            conn.close()
+        total += os.path.getsize(path)
+    return total
+
+
+def check_integrity(db_path=None):
+    """Run SQLite's integrity check over every database file.
+
+    Returns the bytes checked and a list of problems, empty when all is well.
+    """
+    total = 0
+    problems = []
+    for path, relative in database_files(db_path):
+        conn = connect(path)
+        try:
+            rows = [row[0] for row in conn.execute('PRAGMA integrity_check')]
+        finally:
+            conn.close()
+        total += os.path.getsize(path)
+        if rows != ['ok']:
+            problems.extend(f"{relative}: {row}" for row in rows)
+    return total, problems
+
+
+def due_tasks(db_path=None, now=None):
+    """List the tasks whose interval has passed since they last ran."""
+    now = now or datetime.now()
+    conn = connect(db_path)
+    try:
+        create_maintenance_table(conn.cursor())
+        last_run = dict(conn.execute('SELECT task, MAX(finished) FROM maintenance_log GROUP BY task'))
+    finally:
+        conn.close()
+    return [
+        task for task, interval in TASK_INTERVALS.items()
+        if task not in last_run or now - datetime.fromisoformat(last_run[task]) >= interval
+    ]
+
+
+def run_maintenance(db_path=None, tasks=None):
+    """Run the given tasks, or those that are due, and log how long each took and how many bytes it covered.
+
+    Returns a list of result dicts. A failing task is recorded and the rest still run.
+    """
+    if get_mode() == 'memory':
+        # Nothing is on disk to back up or check, even when db_path is the shared-cache URI
+        return []
+    tasks = due_tasks(db_path) if tasks is None else tasks
+
+    def integrity():
+        total, problems = check_integrity(db_path)
+        return total, '; '.join(problems) or 'ok'
+
+    runners = {
+        'backup': lambda: (backup_all(db_path), 'ok'),
+        'snapshot': lambda: (snapshot_all(db_path), 'ok'),
+        'optimize': lambda: (optimize_all(db_path), 'ok'),
+        'analyze': lambda: (optimize_all(db_path, full=True), 'ok'),
+        'integrity': integrity,
+    }
+
+    results = []
+    for task in [task for task in TASK_INTERVALS if task in tasks]:
+        started = time.perf_counter()
+        try:
+            size, detail = runners[task]()
+        except Exception as e:
+            size, detail = 0, f"failed: {e}"
+        results.append({
+            'task': task,
+            'finished': datetime.now().isoformat(timespec='seconds'),
+            'seconds': time.perf_counter() - started,
+            'bytes': size,
+            'detail': detail,
+        })
+
+    if results:
+        conn = connect(db_path)
+        try:
+            create_maintenance_table(conn.cursor())
+            conn.executemany('''
+                INSERT INTO maintenance_log (task, finished, seconds, bytes, detail)
+                VALUES (:task, :finished, :seconds, :bytes, :detail)
+            ''', results)
+            conn.commit()
+        finally:
+            conn.close()
+    return results
+
+
+def format_result(result):
+    return "{task}: {seconds:.2f}s, {size:,} bytes, {detail}".format(size=result['bytes'], **result)
+
+
+def schedule_maintenance(widget, db_path=None, tasks=None):
+    """Run due maintenance on a background thread without blocking the UI.
+
+    widget is polled with after() until the run finishes, and any failures
+    are shown then. If a run is already queued it covers this request too.
+    """
+    global _pending
+    if _pending is not None and not _pending.done():
+        return _pending
+    future = _pending = _executor.submit(run_maintenance, db_path, tasks)
+
+    def check():
+        if not future.done():
+            widget.after(500, check)
+            return
+        try:
+            failed = [r for r in future.result() if r['detail'] != 'ok']
+        except Exception as e:
+            messagebox.showerror("Error", f"Database maintenance failed: {str(e)}")
+            return
+        if failed:
+            messagebox.showwarning(
+                "Database maintenance",
+                "\n".join(format_result(result) for result in failed)
+            )
+
+    widget.after(500, check)
+    return future
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Back up, snapshot, optimize and check the database.")
+    parser.add_argument('tasks', nargs='*', default=['due'],
+                        help=f"any of {', '.join(TASK_INTERVALS)}; due (the default) runs whichever are due "
+                             "and report shows recent runs")
+    add_arguments(parser)
+    args = parser.parse_args()
+    configure_from_args(args)
+    unknown = set(args.tasks) - set(TASK_INTERVALS) - {'due', 'report'}
+    if unknown:
+        parser.error(f"unknown task(s): {', '.join(sorted(unknown))}")
+
+    if 'report' in args.tasks:
+        conn = connect()
+        try:
+            create_maintenance_table(conn.cursor())
+            rows = conn.execute('''
+                SELECT task, finished, seconds, bytes, detail FROM maintenance_log ORDER BY id DESC LIMIT 20
+            ''').fetchall()
+        finally:
+            conn.close()
+        for task, finished, seconds, size, detail in reversed(rows):
+            print(f"{finished} {task}: {seconds:.2f}s, {size:,} bytes, {detail}")
+    else:
+        tasks = None if 'due' in args.tasks else args.tasks
+        for result in run_maintenance(tasks=tasks):
+            print(format_result(result))
@@ -1,18 +1,26 @@
 import tkinter as tk
 from tkinter import ttk
 import tkinter.messagebox as messagebox
-import sqlite3
-import matplotlib.pyplot as plt
-import pandas as pd
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from datetime import datetime
 import calendar
+from archive import TransactionArchive
+from categories import get_categories
+from forecast import forecast_month
+from anomalies import flagged_transaction_counts, month_anomalies
+from breakdown import COLUMNS, PIE_TYPES, build_breakdown, breakdown_rows, draw_pie_chart
+from accounts import ALL_ACCOUNTS, MAIN_ACCOUNT, attach_all_accounts, list_accounts
+from chart_cache import show_chart
+from theme import ThemeManager
+from transaction_store import get_transaction_store
+from config import connect
+from events import CATEGORIES, TRANSACTIONS, subscribe
 
 
 class MonthlyBreakdown(ttk.Frame):
     def __init__(self, parent, app):
         super().__init__(parent)
         self.app = app
+        self.archive = TransactionArchive()
 
         # Create main content frame (self.frame) within this page
         self.frame = ttk.Frame(self, style='Card.TFrame')
@@ -36,24 +44,38 @@ class MonthlyBreakdown(ttk.Frame):
         # Create right frame for pie chart
         self.chart_frame = ttk.Frame(self.content_frame, style='Card.TFrame', width=400)
         self.chart_frame.pack(fill=tk.BOTH, expand=True, padx=(0, 10), side='left')
-        
+
+        # What is on screen, so a data change can be compared against it
+        self.tree = None
+        self.rows = []
+        self.pie_amounts = None
+        self.shown = None
+
+        # Imports and category edits elsewhere refresh this page when they touch the shown month
+        subscribe(TRANSACTIONS, self.on_data_changed)
+        subscribe(CATEGORIES, self.on_data_changed)
+
         # Load initial data
         self.load_data()
 
     def create_date_selection(self):
         # Query available months and years from the database
         try:
-            conn = sqlite3.connect('financial_data.db')
+            conn = connect()
+            attach_all_accounts(conn)
             cursor = conn.cursor()
-            cursor.execute('SELECT DISTINCT month, year FROM transactions ORDER BY year, month')
+            cursor.execute('SELECT DISTINCT month, year FROM all_transactions ORDER BY year, month')
             results = cursor.fetchall()
             conn.close()
+            # Include months that only exist in archived years
+            results += self.archive.available_periods()
             # Build sets of available months and years
             available_months = sorted(set(int(row[0]) for row in results))
             available_years = sorted(set(int(row[1]) for row in results))
         except Exception as e:
             available_months = list(range(1, 13))
             available_years = list(range(2020, 2026))
+        self.available_years = available_years
 
         # Month selection
         ttk.Label(self.controls_frame, text="Month:", style='Body.TLabel').pack(side=tk.LEFT, padx=5)
@@ -81,6 +103,18 @@ class MonthlyBreakdown(ttk.Frame):
         )
         self.year_combo.pack(side=tk.LEFT, padx=5)
 
+        # Account selection, defaulting to the combined view across all ledgers
+        ttk.Label(self.controls_frame, text="Account:", style='Body.TLabel').pack(side=tk.LEFT, padx=5)
+        self.account_var = tk.StringVar(value=ALL_ACCOUNTS)
+        self.account_combo = ttk.Combobox(
+            self.controls_frame,
+            textvariable=self.account_var,
+            values=[ALL_ACCOUNTS, MAIN_ACCOUNT] + list_accounts(),
+            state='readonly',
+            width=12
+        )
+        self.account_combo.pack(side=tk.LEFT, padx=5)
+
         # Set default to latest available month/year if possible
         now = datetime.now()
         default_year = str(now.year) if now.year in available_years else str(available_years[-1]) if available_years else ''
@@ -105,22 +139,43 @@ class MonthlyBreakdown(ttk.Frame):
             style='Primary.TButton'
         ).pack(side=tk.RIGHT, padx=20)
 
+    def add_date_choices(self, periods):
+        """Offer months and years that new transactions have just created."""
+        months = {month for _, month in periods} - set(self.month_map.values())
+        years = {year for year, _ in periods} - set(self.available_years)
+        if months:
+            all_months = sorted(set(self.month_map.values()) | months)
+            self.month_map = {calendar.month_abbr[m].upper(): m for m in all_months}
+            self.month_combo['values'] = list(self.month_map)
+        if years:
+            self.available_years = sorted(set(self.available_years) | years)
+            self.year_combo['values'] = [str(y) for y in self.available_years]
+
+    def add_account_choices(self, accounts):
+        choices = list(self.account_combo['values'])
+        added = [account for account in sorted(accounts) if account not in choices]
+        if added:
+            self.account_combo['values'] = choices + added
+
     def return_home(self):
         self.app.show_page(self.app.home_page)  
         
     def create_table(self):
-        columns = ('category', 'budget', 'actual', 'difference')
+        columns = tuple(column for column, _ in COLUMNS)
         self.tree = ttk.Treeview(self.table_frame, columns=columns, show='headings', height=20)
 
-        self.tree.heading('category', text='Category')
-        self.tree.heading('budget', text='Budget')
-        self.tree.heading('actual', text='Actual')
-        self.tree.heading('difference', text='% Difference')
+        for column, heading in COLUMNS:
+            self.tree.heading(column, text=heading)
 
         self.tree.column('category', width=200, anchor='w')
         self.tree.column('budget', width=100, anchor='center')
         self.tree.column('actual', width=100, anchor='center')
         self.tree.column('difference', width=120, anchor='center')
+        self.tree.column('projected', width=100, anchor='center')
+        self.tree.column('overspend', width=110, anchor='center')
+        self.tree.column('last_year', width=100, anchor='center')
+        self.tree.column('average_3', width=100, anchor='center')
+        self.tree.column('average_12', width=100, anchor='center')
 
         style = ttk.Style()
     
@@ -157,85 +212,90 @@ class MonthlyBreakdown(ttk.Frame):
             # Convert month name to number
             month = self.month_map[self.month_var.get()]
             year = int(self.year_var.get())
+            account = self.account_var.get()
+            self.show_breakdown(year, month, account)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load data: {str(e)}")
 
-            conn = sqlite3.connect('financial_data.db')
-            cursor = conn.cursor()
+    def show_breakdown(self, year, month, account):
+        """Fill the table and pie chart for a month, redrawing only the parts whose numbers changed."""
+        conn = connect()
+        try:
+            attach_all_accounts(conn)
 
-            self.create_table()
+            # Categories come from the in-memory lookup loaded once per session
+            categories = get_categories()
 
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-
-            # Get all categories and their types
-            cursor.execute("SELECT name, budget, type FROM categories")
-            all_categories = cursor.fetchall()
-
-            section_data = {}
-            for name, budget, cat_type in all_categories:
-                # Get actual total
-                cursor.execute('''
-                    SELECT COALESCE(SUM(amount), 0)
-                    FROM transactions
-                    WHERE category = ? AND month = ? AND year = ?
-                ''', (name, month, year))
-                actual = abs(cursor.fetchone()[0])
-                diff_percent = ((actual - budget) / budget * 100) if budget != 0 else 0
-
-                if cat_type not in section_data:
-                    section_data[cat_type] = []
-
-                section_data[cat_type].append({
-                    "category": name,
-                    "budget": budget,
-                    "actual": actual,
-                    "diff": diff_percent
-                })
-
-            # Insert into treeview with formatting
-            for section in ['Income', 'Expenses', 'Spending', 'Assets']:
-                if section not in section_data:
-                    continue
-
-                self.tree.insert('', 'end', values=(f'{section}', '', '', ''), tags=('section',))
-
-                total_budget = 0
-                total_actual = 0
-
-                for entry in section_data[section]:
-                    total_budget += entry["budget"]
-                    total_actual += entry["actual"]
-                    self.tree.insert('', 'end', values=(
-                        entry["category"],
-                        f"${entry['budget']:,.2f}",
-                        f"${entry['actual']:,.2f}",
-                        f"{entry['diff']:.0f}%" 
-                    ))
-
-                total_diff = ((total_actual - total_budget) / total_budget * 100) if total_budget != 0 else 0
-                self.tree.insert('', 'end', values=('Total', f"${total_budget:,.2f}", f"${total_actual:,.2f}", f"{total_diff:.0f}%"), tags=('total',))
-
-
-            # Calculate totals for Spending, Expenses, Assets
-            type_amounts = {"Spending": 0, "Expenses": 0, "Assets": 0}
-
-            for section in section_data:
-                total_actual = sum(entry["actual"] for entry in section_data[section])
-                if section in type_amounts:
-                    type_amounts[section] = total_actual
-    
-            # Show pie chart
-            self.show_pie_chart(type_amounts)
+            # Totals and comparisons come from the shared in-memory store, which holds archived rows too
+            store = get_transaction_store()
+            totals = store.category_totals(year, month, account)
+
+            # Project month-end totals while the selected month is still in progress
+            today = datetime.now()
+            forecasts = {}
+            if (year, month) == (today.year, today.month):
+                forecasts = forecast_month(year, month, today.day, account, categories=categories)
 
+            # Categories with unusual transactions or an unusual month total get highlighted
+            flagged = set(flagged_transaction_counts(conn, year, month, account))
+            flagged |= month_anomalies(conn, year, month, account)
 
+            # Same month last year and trailing averages
+            comparisons = store.comparison_totals(year, month, account)
+        finally:
             conn.close()
+
+        section_data, type_amounts = build_breakdown(categories, totals, forecasts, flagged, comparisons)
+
+        # The table is built once and its rows rewritten in place
+        if self.tree is None:
+            self.create_table()
             self.apply_treeview_styles()
-            
+        self.update_rows(list(breakdown_rows(section_data)))
+
+        # Show pie chart
+        if type_amounts != self.pie_amounts:
+            self.show_pie_chart(type_amounts)
+            self.pie_amounts = type_amounts
+        self.shown = (year, month, account)
+
+    def update_rows(self, rows):
+        """Show (values, tag) rows, rewriting only those that differ from what is on screen."""
+        items = self.tree.get_children()
+        if len(items) != len(rows):
+            self.tree.delete(*items)
+            items = [self.tree.insert('', 'end') for _ in rows]
+            self.rows = [None] * len(rows)
+        for item, row, shown in zip(items, rows, self.rows):
+            if row != shown:
+                values, tag = row
+                self.tree.item(item, values=values, tags=(tag,) if tag else ())
+        self.rows = rows
+
+    def shows(self, change):
+        """Whether a data change reaches the month on screen."""
+        year, month, account = self.shown
+        period = year * 12 + month - 1
+        # The comparison columns reach back twelve months, so changes to those show here too
+        periods = {(p // 12, p % 12 + 1) for p in range(period - 12, period + 1)}
+        return change.touches('periods', periods) and (account == ALL_ACCOUNTS or change.touches('accounts', {account}))
+
+    def on_data_changed(self, change):
+        """Offer any new months and accounts, and refresh the shown month if the change reaches it."""
+        try:
+            if change.periods is not None:
+                self.add_date_choices(change.periods)
+            if change.accounts is not None:
+                self.add_account_choices(change.accounts)
+            if self.shown is not None and self.shows(change):
+                self.show_breakdown(*self.shown)
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to load data: {str(e)}")
+            messagebox.showerror("Error", f"Failed to refresh data: {str(e)}")
 
     def apply_treeview_styles(self):
         self.tree.tag_configure('section', font=('Helvetica', 10, 'bold'), background='#e6f0ff')
         self.tree.tag_configure('total', font=('Helvetica', 10, 'bold'), background='#d9ead3')
+        self.tree.tag_configure('anomaly', background='#f8d7da')
 
     
     def show_pie_chart(self, amounts):
@@ -243,34 +303,16 @@ class MonthlyBreakdown(ttk.Frame):
         for widget in self.chart_frame.winfo_children():
             widget.destroy()
 
-        # Define categories and values
-        categories = ["Spending", "Expenses", "Assets"]
-        values = [amounts.get(cat, 0) for cat in categories]
-
         # Avoid zero-only chart
-        if all(v == 0 for v in values):
+        if all(amounts.get(cat, 0) == 0 for cat in PIE_TYPES):
             ttk.Label(self.chart_frame, text="No data available", style="Body.TLabel").pack()
             return
 
-        # Create pie chart
-        fig, ax = plt.subplots(figsize=(4, 4))
-        colors = ['#FF9999', '#66B3FF', '#99FF99']
-        ax.pie(
-            values, 
-            labels=categories, 
-            autopct='%1.1f%%', 
-            startangle=90,
-            colors=colors,
-            wedgeprops={'edgecolor': 'white'}
+        # Only the pie's own numbers go into the fingerprint, so a month with
+        # unchanged totals is served straight from the chart cache
+        data = tuple(round(float(amounts.get(cat, 0)), 2) for cat in PIE_TYPES)
+        show_chart(
+            self.chart_frame, 'breakdown_pie', data,
+            lambda fig: draw_pie_chart(fig.add_subplot(111), dict(zip(PIE_TYPES, data))),
+            figsize=(4, 4), theme=ThemeManager.current_theme()
         )
-        ax.set_title("Spending vs Expenses vs Assets", fontsize=10)
-        ax.axis('equal')
-
-        # Display chart in chart_frame
-        canvas = FigureCanvasTkAgg(fig, master=self.chart_frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill='both', expand=True)
-
-            
-
-    
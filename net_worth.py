@@ -1,11 +1,153 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import sqlite3
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 from matplotlib.figure import Figure
+import matplotlib.dates as mdates
+import numpy as np
+from chart_cache import show_chart
+from theme import ThemeManager
+from fx import normalize_currency, to_reporting_currency
 import os
 from datetime import datetime
 import pandas as pd
+from config import connect, get_reporting_currency
+from events import NETWORTH, DataChange, publish, subscribe
+from projection import DEFAULT_PATHS, DEFAULT_YEARS, project_networth
+
+
+# Most points drawn in the zoom window, matching its width in pixels
+MAX_ZOOM_POINTS = 1000
+# Markers are only drawn when the points are far enough apart to see them
+MARKER_POINTS = 60
+
+
+def lttb(x, y, threshold):
+    """Return the indices of threshold points that keep a series' visual shape.
+
+    Largest-Triangle-Three-Buckets: the first and last points are kept, the
+    rest are split into equal buckets, and from each bucket the point forming
+    the largest triangle with the previous pick and the next bucket's mean wins.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        mean_x = x[end:next_end].mean()
+        mean_y = y[end:next_end].mean()
+
+        # Twice the triangle areas for every candidate in the bucket at once
+        area = np.abs(
+            (x[previous] - mean_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (mean_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+
+def networth_series(total_by_entry):
+    """Turn (date, assets, liabilities) rows into arrays of real dates and net worth."""
+    history = pd.DataFrame(total_by_entry, columns=['date', 'assets', 'liabilities'])
+    dates = pd.to_datetime(history['date'], errors='coerce')
+    valid = dates.notna().to_numpy()
+    net_worth = (history['assets'] - history['liabilities']).to_numpy(dtype=float)
+    return dates.to_numpy()[valid], net_worth[valid]
+
+
+def plot_networth(ax, dates, net_worth, max_points):
+    """Plot net worth over time, downsampled to at most max_points, and return the line."""
+    keep = lttb(mdates.date2num(dates), net_worth, max_points)
+    line, = ax.plot(dates[keep], net_worth[keep], color='navy', label='Net Worth',
+                    marker='o' if len(keep) <= MARKER_POINTS else '')
+    ax.set_title("Net Worth Over Time", fontweight='bold')
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Amount")
+    ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(ax.xaxis.get_major_locator()))
+    ax.grid(True, linestyle='--', alpha=0.5)
+    ax.legend()
+    return line
+
+
+def plot_projection(ax, projection, real=True):
+    """Plot a projection's median with its 25-75 and 10-90 percentile bands shaded around it."""
+    dates = projection.index
+    ax.fill_between(dates, projection[10], projection[90], color='navy', alpha=0.15, label='10th to 90th percentile')
+    ax.fill_between(dates, projection[25], projection[75], color='navy', alpha=0.3, label='25th to 75th percentile')
+    ax.plot(dates, projection[50], color='navy', label='Median')
+    ax.set_title("Projected Net Worth (" + ("today's dollars" if real else "future dollars") + ")", fontweight='bold')
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Amount")
+    ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(ax.xaxis.get_major_locator()))
+    ax.grid(True, linestyle='--', alpha=0.5)
+    ax.legend(loc='upper left')
+
+
+def fetch_latest_networth(conn):
+    """Assets and liabilities as (name, total) lists on the latest date, or None when nothing is recorded."""
+    cursor = conn.cursor()
+
+    # Get latest date
+    cursor.execute('SELECT MAX(date) FROM networth')
+    latest_date = cursor.fetchone()[0]
+    if not latest_date:
+        return None
+
+    # Get assets and liabilities, converting foreign accounts at the latest date's rates
+    latest = pd.read_sql_query('''
+        SELECT a.name, a.type, a.currency, n.date, SUM(n.amount) as total
+        FROM networth n
+        JOIN networth_accounts a ON a.id = n.account_id
+        WHERE n.date = ?
+        GROUP BY a.id
+        ORDER BY a.position, a.id
+    ''', conn, params=(latest_date,))
+    latest = to_reporting_currency(latest, ['total'], date_column='date', date_format='%Y-%m-%d')
+    assets = list(latest.loc[latest['type'] == 'asset', ['name', 'total']].itertuples(index=False, name=None))
+    liabilities = list(latest.loc[latest['type'] == 'liability', ['name', 'total']].itertuples(index=False, name=None))
+    return assets, liabilities
+
+
+def fetch_networth_history(conn, dates=None):
+    """Total assets and liabilities as (date, assets, liabilities) rows, for every date or just the given ones."""
+    where, params = '', []
+    if dates is not None:
+        params = sorted(dates)
+        where = f"WHERE n.date IN ({', '.join('?' * len(params))})"
+
+    # Each currency is summed per date, then converted in one pass
+    history = pd.read_sql_query(f'''
+        SELECT n.date, a.currency,
+               SUM(CASE WHEN a.type = 'asset' THEN n.amount ELSE 0 END) as assets,
+               SUM(CASE WHEN a.type = 'liability' THEN n.amount ELSE 0 END) as liabilities
+        FROM networth n
+        JOIN networth_accounts a ON a.id = n.account_id
+        {where}
+        GROUP BY n.date, a.currency
+    ''', conn, params=params)
+    history = to_reporting_currency(history, ['assets', 'liabilities'], date_column='date', date_format='%Y-%m-%d')
+    history = history.groupby('date', as_index=False)[['assets', 'liabilities']].sum()
+    return list(history.itertuples(index=False, name=None))
+
+
+def fetch_networth_data(conn):
+    """Latest assets and liabilities plus the net worth history, or None when nothing is recorded."""
+    latest = fetch_latest_networth(conn)
+    if latest is None:
+        return None
+    assets, liabilities = latest
+    return {
+        'assets': assets,
+        'liabilities': liabilities,
+        'total_by_entry': fetch_networth_history(conn)
+    }
+
 
 class NetWorth(ttk.Frame):
     def __init__(self, parent, app):
@@ -25,6 +167,13 @@ class NetWorth(ttk.Frame):
         self.chart_frame = ttk.Frame(self.frame, style='Card.TFrame')
         self.chart_frame.pack(fill=tk.BOTH, expand=True, padx=(0, 10), side='left')
 
+        # What is on screen: the latest (assets, liabilities) and {date: (assets, liabilities)}
+        self.latest = None
+        self.totals_by_date = None
+
+        # Saves publish the dates they wrote, so only those are read back
+        subscribe(NETWORTH, self.on_networth_changed)
+
         # Load initial data
         self.update_charts()
 
@@ -40,6 +189,13 @@ class NetWorth(ttk.Frame):
             style='Primary.TButton'
         ).pack(side=tk.LEFT, padx=20)
 
+        ttk.Button(
+            self.heading_frame,
+            text="Projection",
+            command=self.show_projection_dialog,
+            style='Primary.TButton'
+        ).pack(side=tk.LEFT)
+
         # Back home button
         ttk.Button(
             self.heading_frame,
@@ -66,17 +222,20 @@ class NetWorth(ttk.Frame):
         
         # Create entry fields
         self.entries = {}
+        # Currencies chosen for accounts added in this dialog
+        self.new_currencies = {}
 
         # Connect to database
-        conn = sqlite3.connect('financial_data.db')
+        conn = connect()
         cursor = conn.cursor()
                 
-        # Get all assets and libilities
-        cursor.execute("SELECT asset_name FROM networth WHERE type = 'asset'")
-        asset_types = [row[0] for row in cursor.fetchall()]  
+        # Get the active assets and liabilities from the registry, one row each
+        query = "SELECT name FROM networth_accounts WHERE type = ? AND active = 1 ORDER BY position, id"
+        cursor.execute(query, ('asset',))
+        asset_types = [row[0] for row in cursor.fetchall()]
 
-        cursor.execute("SELECT asset_name FROM networth WHERE type = 'liability'")
-        liability_types = [row[0] for row in cursor.fetchall()]  
+        cursor.execute(query, ('liability',))
+        liability_types = [row[0] for row in cursor.fetchall()]
 
         conn.close()
         
@@ -123,53 +282,94 @@ class NetWorth(ttk.Frame):
         frame.pack(fill='x', pady=5)
         ttk.Label(frame, text=name, style='Body.TLabel').pack(side='left', padx=5)
         entry = ttk.Entry(frame)
+        ttk.Button(
+            frame,
+            text="Remove",
+            command=lambda: self._remove_entry_row(frame, name, entry_type)
+        ).pack(side='right', padx=5)
         entry.pack(side='right', fill='x', expand=True, padx=5)
         self.entries[(entry_type, name)] = entry
 
+    def _remove_entry_row(self, frame, name, entry_type):
+        if not messagebox.askyesno("Remove", f"Stop tracking {name}? Its past values are kept."):
+            return
+        try:
+            # Deactivate rather than delete so the history still adds up
+            conn = connect()
+            conn.execute(
+                "UPDATE networth_accounts SET active = 0 WHERE name = ? AND type = ?",
+                (name, entry_type)
+            )
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            messagebox.showerror("Error", f"Error removing {name}: {str(e)}")
+            return
+        del self.entries[(entry_type, name)]
+        frame.destroy()
+
     def _prompt_and_add_new_row(self, container, entry_type):
         def on_confirm():
             name = name_entry.get().strip()
             if name:
                 self._add_entry_row(container, name, entry_type)
+                self.new_currencies[(entry_type, name)] = normalize_currency(currency_entry.get())
                 popup.destroy()
             else:
                 messagebox.showerror("Error", "Name cannot be empty.")
 
         popup = tk.Toplevel(self)
         popup.title(f"Add New {entry_type.title()}")
-        popup.geometry("300x120")
+        popup.geometry("300x180")
 
         ttk.Label(popup, text=f"{entry_type.title()} Name:").pack(pady=10)
         name_entry = ttk.Entry(popup)
         name_entry.pack(pady=5, padx=10, fill='x')
+        ttk.Label(popup, text=f"Currency (blank for {get_reporting_currency()}):").pack()
+        currency_entry = ttk.Entry(popup)
+        currency_entry.pack(pady=5, padx=10, fill='x')
         ttk.Button(popup, text="Add", command=on_confirm).pack(pady=10)
 
     
     def save_net_worth(self, entries, dialog):
         try:
-            conn = sqlite3.connect('financial_data.db')
-            cursor = conn.cursor()
-            
             # Get current date
             current_date = datetime.now().strftime('%Y-%m-%d')
-            
-            # Save all
-            for asset_type, entry in entries.items():
-                type = asset_type[0]
-                name = asset_type[1]
-                if entry.get().strip():
-                    amount = float(entry.get())
-                    cursor.execute('''
-                        INSERT INTO networth (date, asset_name, amount, type)
-                        VALUES (?, ?, ?, ?)
-                    ''', (current_date, name, amount, type))
+
+            # Check every value before writing anything
+            values = [
+                (current_date, float(entry.get()), type, name)
+                for (type, name), entry in entries.items() if entry.get().strip()
+            ]
+
+            conn = connect()
+            cursor = conn.cursor()
+
+            # New accounts join the registry after the existing ones; re-adding a removed one revives it
+            cursor.execute('SELECT COALESCE(MAX(position), -1) + 1 FROM networth_accounts')
+            next_position = cursor.fetchone()[0]
+            cursor.executemany('''
+                INSERT INTO networth_accounts (name, type, position, currency)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (name, type) DO UPDATE SET active = 1
+            ''', [
+                (name, type, next_position + i, self.new_currencies.get((type, name)))
+                for i, (type, name) in enumerate(entries)
+            ])
+
+            # Save all in one transaction; saving again on the same day replaces that day's values
+            cursor.executemany('''
+                INSERT INTO networth (date, account_id, amount)
+                SELECT ?, id, ? FROM networth_accounts WHERE type = ? AND name = ?
+                ON CONFLICT (date, account_id) DO UPDATE SET amount = excluded.amount
+            ''', values)
             
             conn.commit()
             conn.close()
             
             messagebox.showinfo("Success", "Net worth updated successfully!")
             dialog.destroy()
-            self.update_charts()
+            publish(NETWORTH, DataChange(dates={current_date}))
             
         except ValueError:
             messagebox.showerror("Error", "Please enter valid numbers for all fields")
@@ -178,53 +378,16 @@ class NetWorth(ttk.Frame):
     
     def get_networth_data(self):
         try:
-            conn = sqlite3.connect('financial_data.db')
-            cursor = conn.cursor()
-            
-            # Get latest date
-            cursor.execute('SELECT MAX(date) FROM networth')
-            latest_date = cursor.fetchone()[0]
-            
-            if not latest_date:
+            conn = connect()
+            try:
+                networth_raw_data = fetch_networth_data(conn)
+            finally:
+                conn.close()
+
+            if not networth_raw_data:
                 messagebox.showinfo("Info", "No net worth data available. Please add some data first.")
                 return
-            
-            # Get assets and liabilities
-            cursor.execute('''
-                SELECT asset_name, SUM(amount) as total
-                FROM networth
-                WHERE date = ? AND type = 'asset'
-                GROUP BY asset_name
-            ''', (latest_date,))
-            assets = cursor.fetchall()
-            
-            cursor.execute('''
-                SELECT asset_name, SUM(amount) as total
-                FROM networth
-                WHERE date = ? AND type = 'liability'
-                GROUP BY asset_name
-            ''', (latest_date,))
-            liabilities = cursor.fetchall()
-            
-            # Get net worth over time
-            cursor.execute('''
-                SELECT date,
-                       SUM(CASE WHEN type = 'asset' THEN amount ELSE 0 END) as assets,
-                       SUM(CASE WHEN type = 'liability' THEN amount ELSE 0 END) as liabilities
-                FROM networth
-                GROUP BY date
-                ORDER BY date
-            ''')
-            sum_by_entry = cursor.fetchall()
-            
-            conn.close()
 
-            networth_raw_data = {
-                'assets': assets,
-                'liabilities': liabilities,
-                'total_by_entry': sum_by_entry
-            }
-            
             return networth_raw_data
         
         except Exception as e:
@@ -235,20 +398,49 @@ class NetWorth(ttk.Frame):
         if not networth_raw_data:
             return
 
-        assets = networth_raw_data['assets']
-        liabilities = networth_raw_data['liabilities']
-        total_by_entry = networth_raw_data['total_by_entry']
+        self.latest = (networth_raw_data['assets'], networth_raw_data['liabilities'])
+        self.totals_by_date = {date: (assets, liabilities) for date, assets, liabilities in networth_raw_data['total_by_entry']}
 
         # Clear previous widgets
         for widget in self.chart_frame.winfo_children():
             widget.destroy()
 
         # Split layout
-        table_frame = ttk.Frame(self.chart_frame)
-        table_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(0, 10))
+        self.table_frame = ttk.Frame(self.chart_frame)
+        self.table_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(0, 10))
+
+        self.graph_frame = ttk.Frame(self.chart_frame)
+        self.graph_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
 
-        graph_frame = ttk.Frame(self.chart_frame)
-        graph_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
+        self.show_tables(*self.latest)
+        self.show_graph()
+
+    def on_networth_changed(self, change):
+        """Read back only the dates a save wrote, and redraw the tables only if the latest values changed."""
+        try:
+            if self.totals_by_date is None or change.dates is None:
+                self.update_charts()
+                return
+
+            conn = connect()
+            try:
+                latest = fetch_latest_networth(conn)
+                history = fetch_networth_history(conn, change.dates)
+            finally:
+                conn.close()
+
+            self.totals_by_date.update((date, (assets, liabilities)) for date, assets, liabilities in history)
+            if latest != self.latest:
+                self.latest = latest
+                self.show_tables(*latest)
+            self.show_graph()
+        except Exception as e:
+            messagebox.showerror("Error", f"Error updating charts: {str(e)}")
+
+    def show_tables(self, assets, liabilities):
+        for widget in self.table_frame.winfo_children():
+            widget.destroy()
+        table_frame = self.table_frame
 
         # Totals
         total_assets = sum([a[1] for a in assets])
@@ -256,9 +448,6 @@ class NetWorth(ttk.Frame):
         net_worth_total = total_assets - total_liabilities
 
         # === TABLES FIGURE ===
-        table_fig = Figure(figsize=(5, 6), dpi=100)
-        table_fig.patch.set_facecolor('#f0f4f8')
-
         def create_styled_table(ax, data, title):
             ax.axis('off')
             ax.set_title(title, fontweight='bold', color='navy')
@@ -287,22 +476,19 @@ class NetWorth(ttk.Frame):
                     cell.set_facecolor('#cfe0f3')
                 cell.set_edgecolor('#ccc')
 
-        # === Assets Table ===
-        ax1 = table_fig.add_subplot(211)
         asset_table_data = [["Asset", "Amount ($)"]] + [[a[0], f"{a[1]:,.2f}"] for a in assets]
         asset_table_data.append(["Total", f"{total_assets:,.2f}"])
-        create_styled_table(ax1, asset_table_data, "Assets")
-
-        # === Liabilities Table ===
-        ax2 = table_fig.add_subplot(212)
         liability_table_data = [["Liability", "Amount ($)"]] + [[l[0], f"{l[1]:,.2f}"] for l in liabilities]
         liability_table_data.append(["Total", f"{total_liabilities:,.2f}"])
-        create_styled_table(ax2, liability_table_data, "Liabilities")
 
-        # === Render Table Figure ===
-        table_canvas = FigureCanvasTkAgg(table_fig, master=table_frame)
-        table_canvas.draw()
-        table_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        def draw_tables(fig):
+            fig.patch.set_facecolor('#f0f4f8')
+            create_styled_table(fig.add_subplot(211), asset_table_data, "Assets")
+            create_styled_table(fig.add_subplot(212), liability_table_data, "Liabilities")
+
+        # Rendered figures are cached by their input data, so unchanged charts show instantly
+        show_chart(table_frame, 'networth_tables', (asset_table_data, liability_table_data),
+                   draw_tables, figsize=(5, 6), theme=ThemeManager.current_theme())
 
         # === Total Net Worth Label ===
         ttk.Label(
@@ -313,27 +499,136 @@ class NetWorth(ttk.Frame):
             font=("Helvetica", 12, "bold")
         ).pack(pady=(10, 0))
 
+    def show_graph(self):
+        for widget in self.graph_frame.winfo_children():
+            widget.destroy()
+        graph_frame = self.graph_frame
+
         # === GRAPH FIGURE ===
-        graph_fig = Figure(figsize=(6, 4), dpi=100)
-        graph_fig.patch.set_facecolor('#f0f4f8')
-        ax3 = graph_fig.add_subplot(111)
-        ax3.set_facecolor('#e8ecf0')
-
-        if total_by_entry:
-            dates = [row[0] for row in total_by_entry]
-            asset_totals = [row[1] for row in total_by_entry]
-            liability_totals = [row[2] for row in total_by_entry]
-            net_worth = [a - l for a, l in zip(asset_totals, liability_totals)]
-
-            ax3.plot(dates, net_worth, marker='o', color='navy', label='Net Worth')
-            ax3.set_title("Net Worth Over Time", fontweight='bold')
-            ax3.set_xlabel("Date")
-            ax3.set_ylabel("Amount")
-            ax3.tick_params(axis='x', rotation=45)
-            ax3.grid(True, linestyle='--', alpha=0.5)
-            ax3.legend()
-
-        # Render Graph Figure
-        graph_canvas = FigureCanvasTkAgg(graph_fig, master=graph_frame)
-        graph_canvas.draw()
-        graph_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        total_by_entry = [(date, *totals) for date, totals in sorted(self.totals_by_date.items())]
+        dates, net_worth = networth_series(total_by_entry)
+        self.history = (dates, net_worth)
+        figsize, dpi = (6, 4), 100
+
+        def draw_graph(fig):
+            fig.patch.set_facecolor('#f0f4f8')
+            ax3 = fig.add_subplot(111)
+            ax3.set_facecolor('#e8ecf0')
+
+            if len(dates):
+                # One point per pair of pixels is all the chart can show
+                plot_networth(ax3, dates, net_worth, int(figsize[0] * dpi) // 2)
+
+        show_chart(graph_frame, 'networth_graph', total_by_entry, draw_graph, figsize=figsize, dpi=dpi,
+                   theme=ThemeManager.current_theme())
+
+        ttk.Button(
+            graph_frame,
+            text="Zoom",
+            command=self.show_zoom_window,
+            style='Primary.TButton'
+        ).pack(pady=(10, 0))
+
+    def show_projection_dialog(self):
+        """Ask for return and inflation assumptions, then chart the projected net worth."""
+        dialog = tk.Toplevel(self)
+        dialog.title("Net Worth Projection")
+
+        fields = [
+            ("Years", str(DEFAULT_YEARS)),
+            ("Expected return (% a year)", "6"),
+            ("Volatility (% a year)", "12"),
+            ("Inflation (% a year)", "2"),
+            ("Simulated paths", str(DEFAULT_PATHS)),
+        ]
+        variables = []
+        for row, (label, default) in enumerate(fields):
+            ttk.Label(dialog, text=label).grid(row=row, column=0, sticky='w', padx=10, pady=5)
+            variable = tk.StringVar(value=default)
+            ttk.Entry(dialog, textvariable=variable, width=10).grid(row=row, column=1, padx=10, pady=5)
+            variables.append(variable)
+        real_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(dialog, text="In today's dollars", variable=real_var).grid(
+            row=len(fields), column=0, columnspan=2, sticky='w', padx=10, pady=5)
+
+        def run():
+            try:
+                years, annual_return, volatility, inflation, paths = (variable.get() for variable in variables)
+                years, paths = int(years), int(paths)
+                annual_return, volatility, inflation = (float(value) / 100 for value in (annual_return, volatility, inflation))
+            except ValueError:
+                messagebox.showerror("Error", "Please enter valid numbers for all fields", parent=dialog)
+                return
+            dialog.destroy()
+            self.show_projection(years, annual_return, volatility, inflation, paths, real_var.get())
+
+        ttk.Button(dialog, text="Run", command=run, style='Primary.TButton').grid(
+            row=len(fields) + 1, column=0, columnspan=2, pady=10)
+
+    def show_projection(self, years, annual_return, volatility, inflation, paths, real):
+        """Simulate future net worth from the latest snapshot and show its percentile bands."""
+        try:
+            if self.latest is None:
+                networth_raw_data = self.get_networth_data()
+                if not networth_raw_data:
+                    return
+                self.latest = (networth_raw_data['assets'], networth_raw_data['liabilities'])
+
+            self.config(cursor='watch')
+            self.update_idletasks()
+            try:
+                projection = project_networth(*self.latest, paths=paths, years=years, annual_return=annual_return,
+                                              volatility=volatility, inflation=inflation, real=real)
+            finally:
+                self.config(cursor='')
+        except Exception as e:
+            messagebox.showerror("Error", f"Error projecting net worth: {str(e)}")
+            return
+
+        window = tk.Toplevel(self)
+        window.title("Net Worth Projection")
+
+        fig = Figure(figsize=(10, 6), dpi=100)
+        plot_projection(fig.add_subplot(111), projection, real)
+
+        canvas = FigureCanvasTkAgg(fig, master=window)
+        NavigationToolbar2Tk(canvas, window)
+        canvas.draw()
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+        final = projection.iloc[-1]
+        ttk.Label(
+            window,
+            text=f"In {years} years: median ${final[50]:,.0f}, 10th to 90th percentile ${final[10]:,.0f} to ${final[90]:,.0f}",
+            style='Body.TLabel'
+        ).pack(pady=5)
+
+    def show_zoom_window(self):
+        """Open the net worth history in an interactive chart that resamples as it zooms."""
+        dates, net_worth = self.history
+        if not len(dates):
+            return
+
+        window = tk.Toplevel(self)
+        window.title("Net Worth Over Time")
+
+        fig = Figure(figsize=(10, 6), dpi=100)
+        ax = fig.add_subplot(111)
+        line = plot_networth(ax, dates, net_worth, MAX_ZOOM_POINTS)
+        x = mdates.date2num(dates)
+
+        def resample(ax):
+            # Downsample only the visible range, so zooming in reaches full resolution
+            left, right = ax.get_xlim()
+            start = max(np.searchsorted(x, left) - 1, 0)
+            end = min(np.searchsorted(x, right) + 1, len(x))
+            keep = start + lttb(x[start:end], net_worth[start:end], MAX_ZOOM_POINTS)
+            line.set_data(dates[keep], net_worth[keep])
+            line.set_marker('o' if len(keep) <= MARKER_POINTS else '')
+
+        ax.callbacks.connect('xlim_changed', resample)
+
+        canvas = FigureCanvasTkAgg(fig, master=window)
+        NavigationToolbar2Tk(canvas, window)
+        canvas.draw()
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
@@ -0,0 +1,299 @@
+import os
+import csv
+import warnings
+import importlib.util
+from datetime import datetime
+from config import APP_DIR
+
+# Only this much of a file is read to work out which parser handles it
+SNIFF_BYTES = 4096
+PLUGIN_DIR = os.path.join(APP_DIR, 'parser_plugins')
+
+PARSERS = []
+_plugins_loaded = False
+
+
+def register_parser(cls):
+    """Class decorator that adds a parser to the registry.
+
+    Parsers registered later are tried first, so plugins can override the
+    built in layouts.
+    """
+    PARSERS.insert(0, cls)
+    return cls
+
+
+def load_plugins(plugin_dir=None):
+    """Import every module in the plugin folder so their parsers register themselves."""
+    global _plugins_loaded
+    if _plugins_loaded:
+        return
+    _plugins_loaded = True
+    plugin_dir = plugin_dir or PLUGIN_DIR
+    if not os.path.isdir(plugin_dir):
+        return
+    for file_name in sorted(os.listdir(plugin_dir)):
+        if file_name.endswith('.py') and not file_name.startswith('_'):
+            path = os.path.join(plugin_dir, file_name)
+            spec = importlib.util.spec_from_file_location(f"parser_plugins.{file_name[:-3]}", path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+
+
+def parse_amount(value):
+    value = value.strip().replace(',', '').replace('$', '')
+    return float(value) if value else 0.0
+
+
+def warn_short_rows(file_path, skipped):
+    """Warn once per file about rows with too few columns to read, which were skipped."""
+    if skipped:
+        warnings.warn(f"{os.path.basename(file_path)}: skipped {skipped} row(s) with fewer columns than expected")
+
+
+def sniff_format(file_path):
+    """Return a parser for the file, judged from its first few KB."""
+    load_plugins()
+    with open(file_path, 'r', encoding='utf-8-sig', errors='replace') as f:
+        head = f.read(SNIFF_BYTES)
+
+    for parser_cls in PARSERS:
+        parser = parser_cls.sniff(head)
+        if parser is not None:
+            return parser
+    raise ValueError(f"Unrecognised statement format: {os.path.basename(file_path)}")
+
+
+class StatementParser:
+    """Base class for statement parsers.
+
+    sniff() returns a parser instance when the file head matches the format,
+    and records() streams (date, payee, amount) tuples with the date left as
+    text in the parser's date_format.
+    """
+    name = None
+    date_format = '%Y/%m/%d'
+
+    @classmethod
+    def sniff(cls, head):
+        return None
+
+    def records(self, file_path):
+        raise NotImplementedError
+
+
+def _guess_date_format(value, formats=('%Y/%m/%d', '%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y')):
+    for date_format in formats:
+        try:
+            datetime.strptime(value.strip(), date_format)
+            return date_format
+        except ValueError:
+            continue
+    return None
+
+
+@register_parser
+class BankCsvParser(StatementParser):
+    """The original bank export: five preamble lines, then date, payee and amount in columns 0, 4 and 6."""
+    name = 'bank_csv'
+    skip_lines = 5
+    columns = (0, 4, 6)
+
+    @classmethod
+    def sniff(cls, head):
+        lines = head.splitlines()
+        if len(lines) <= cls.skip_lines:
+            return None
+        header = next(csv.reader([lines[cls.skip_lines]]))
+        return cls() if len(header) > max(cls.columns) else None
+
+    def records(self, file_path):
+        date_col, payee_col, amount_col = self.columns
+        with open(file_path, 'r', newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            for _ in range(self.skip_lines + 1):
+                next(reader, None)
+            skipped = 0
+            for row in reader:
+                if not row:
+                    continue
+                if len(row) <= max(self.columns):
+                    skipped += 1
+                    continue
+                if not row[date_col].strip():
+                    continue
+                yield row[date_col].strip(), row[payee_col].strip(), parse_amount(row[amount_col])
+        warn_short_rows(file_path, skipped)
+
+
+@register_parser
+class HeaderCsvParser(StatementParser):
+    """CSV exports with a named header row and a single signed amount column."""
+    name = 'header_csv'
+    payee_headers = ('payee', 'description', 'details', 'memo', 'narrative')
+
+    def __init__(self, date_col, payee_col, amount_col, date_format):
+        self.date_col = date_col
+        self.payee_col = payee_col
+        self.amount_col = amount_col
+        self.date_format = date_format
+
+    @classmethod
+    def _header_index(cls, header, names):
+        for name in names:
+            if name in header:
+                return header.index(name)
+        return None
+
+    @classmethod
+    def sniff(cls, head):
+        rows = list(csv.reader(head.splitlines()[:2]))
+        if len(rows) < 2:
+            return None
+        header = [h.strip().lower() for h in rows[0]]
+        date_col = cls._header_index(header, ('date', 'transaction date'))
+        payee_col = cls._header_index(header, cls.payee_headers)
+        amount_col = cls._header_index(header, ('amount',))
+        if None in (date_col, payee_col, amount_col) or len(rows[1]) <= date_col:
+            return None
+        date_format = _guess_date_format(rows[1][date_col])
+        if date_format is None:
+            return None
+        return cls(date_col, payee_col, amount_col, date_format)
+
+    def used_columns(self):
+        return (self.date_col, self.payee_col, self.amount_col)
+
+    def rows(self, file_path):
+        """Stream the data rows that have every column this parser reads and a date."""
+        width = max(self.used_columns()) + 1
+        with open(file_path, 'r', newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            skipped = 0
+            for row in reader:
+                if not row:
+                    continue
+                if len(row) < width:
+                    skipped += 1
+                    continue
+                if row[self.date_col].strip():
+                    yield row
+        warn_short_rows(file_path, skipped)
+
+    def records(self, file_path):
+        for row in self.rows(file_path):
+            yield row[self.date_col].strip(), row[self.payee_col].strip(), parse_amount(row[self.amount_col])
+
+
+@register_parser
+class DebitCreditCsvParser(HeaderCsvParser):
+    """CSV exports that split money out and money in into separate Debit and Credit columns."""
+    name = 'debit_credit_csv'
+
+    def __init__(self, date_col, payee_col, debit_col, credit_col, date_format):
+        super().__init__(date_col, payee_col, None, date_format)
+        self.debit_col = debit_col
+        self.credit_col = credit_col
+
+    @classmethod
+    def sniff(cls, head):
+        rows = list(csv.reader(head.splitlines()[:2]))
+        if len(rows) < 2:
+            return None
+        header = [h.strip().lower() for h in rows[0]]
+        date_col = cls._header_index(header, ('date', 'transaction date'))
+        payee_col = cls._header_index(header, cls.payee_headers)
+        debit_col = cls._header_index(header, ('debit', 'withdrawal', 'money out'))
+        credit_col = cls._header_index(header, ('credit', 'deposit', 'money in'))
+        if None in (date_col, payee_col, debit_col, credit_col) or len(rows[1]) <= date_col:
+            return None
+        date_format = _guess_date_format(rows[1][date_col])
+        if date_format is None:
+            return None
+        return cls(date_col, payee_col, debit_col, credit_col, date_format)
+
+    def used_columns(self):
+        return (self.date_col, self.payee_col, self.debit_col, self.credit_col)
+
+    def records(self, file_path):
+        for row in self.rows(file_path):
+            amount = parse_amount(row[self.credit_col]) - abs(parse_amount(row[self.debit_col]))
+            yield row[self.date_col].strip(), row[self.payee_col].strip(), amount
+
+
+@register_parser
+class QifParser(StatementParser):
+    """Quicken Interchange Format: one field per line, records ended by '^'."""
+    name = 'qif'
+    date_format = '%m/%d/%Y'
+
+    @classmethod
+    def sniff(cls, head):
+        return cls() if head.lstrip().startswith('!Type:') else None
+
+    @staticmethod
+    def parse_date(value):
+        """Spell out a QIF date as month/day/four-digit year.
+
+        Quicken writes years from 2000 on after an apostrophe, as 1/15'24,
+        and earlier ones after a slash, as 1/15/99; days may be space padded.
+        """
+        century = 2000 if "'" in value else 1900
+        parts = [part.strip() for part in value.replace("'", '/').replace('-', '/').split('/')]
+        if len(parts) == 3 and len(parts[2]) <= 2 and parts[2].isdigit():
+            parts[2] = str(century + int(parts[2]))
+        return '/'.join(parts)
+
+    def records(self, file_path):
+        date = payee = amount = None
+        with open(file_path, 'r', encoding='utf-8-sig') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('!'):
+                    continue
+                code, value = line[0], line[1:].strip()
+                if code == 'D':
+                    date = self.parse_date(value)
+                elif code in ('T', 'U'):
+                    amount = parse_amount(value)
+                elif code == 'P':
+                    payee = value
+                elif code == 'M' and payee is None:
+                    payee = value
+                elif code == '^':
+                    if date is not None and amount is not None:
+                        yield date, payee or '', amount
+                    date = payee = amount = None
+
+
+@register_parser
+class OfxParser(StatementParser):
+    """Open Financial Exchange (SGML or XML flavoured), read one tag per line."""
+    name = 'ofx'
+    date_format = '%Y%m%d'
+
+    @classmethod
+    def sniff(cls, head):
+        upper = head.upper()
+        return cls() if 'OFXHEADER' in upper or '<OFX>' in upper else None
+
+    def records(self, file_path):
+        fields = None
+        with open(file_path, 'r', encoding='utf-8-sig', errors='replace') as f:
+            for line in f:
+                # Some exports put several tags on one line, so split them apart
+                for part in line.replace('<', '\n<').splitlines():
+                    part = part.strip()
+                    if not part.startswith('<'):
+                        continue
+                    tag, _, value = part[1:].partition('>')
+                    tag = tag.upper()
+                    if tag == 'STMTTRN':
+                        fields = {}
+                    elif tag == '/STMTTRN' and fields is not None:
+                        payee = fields.get('NAME') or fields.get('MEMO', '')
+                        yield fields.get('DTPOSTED', '')[:8], payee, parse_amount(fields.get('TRNAMT', '0'))
+                        fields = None
+                    elif fields is not None and not tag.startswith('/'):
+                        fields[tag] = value.strip()
@@ -0,0 +1,180 @@
+import os
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from categories import get_categories
+from transaction_store import get_transaction_store
+from config import add_arguments, configure_from_args, configure_worker, connect, worker_settings
+
+DEFAULT_PATHS = 10_000
+DEFAULT_YEARS = 30
+PERCENTILES = (10, 25, 50, 75, 90)
+# Months of cash flow history that future months are drawn from
+HISTORY_MONTHS = 24
+# Paths simulated at once; bigger runs are split into chunks of this size,
+# which bounds memory at a few hundred bytes per path-month
+CHUNK_PATHS = 10_000
+# Runs with more paths than this use a worker process per chunk
+PARALLEL_PATHS = 50_000
+# Money moved into savings and investments stays in net worth, so these categories aren't cash flow
+TRANSFER_TYPES = ('Assets',)
+
+
+def cash_flow_history(months=HISTORY_MONTHS, end_period=None, store=None, categories=None):
+    """Net amount per category for each of the last complete months, as a categories x periods DataFrame.
+
+    Amounts are in the reporting currency and signed as in the ledger, so
+    income is positive and spending negative. Transfers into asset
+    categories are left out, and so are months before the ledger starts.
+    """
+    store = store or get_transaction_store()
+    categories = categories or get_categories()
+    if end_period is None:
+        today = datetime.now()
+        end_period = today.year * 12 + today.month - 2
+
+    recorded = store.period[(store.period >= 0) & (store.period <= end_period)]
+    start_period = max(end_period - months + 1, int(recorded.min()) if len(recorded) else end_period)
+    flow_ids = [category.id for category in categories if category.type not in TRANSFER_TYPES]
+    return store.period_totals(start_period, end_period, category_ids=flow_ids)
+
+
+def simulate_networth(assets, liabilities, flows, months, paths, annual_return, volatility,
+                      inflation, real=True, seed=None):
+    """Simulate net worth paths as a paths x (months + 1) array, starting from today's value.
+
+    Each month assets grow by a lognormal return with the given annual mean
+    and volatility, then gain a month of cash flow drawn from the history in
+    flows. Whole months are drawn, so categories that move together still
+    do. Everything is simulated in today's money; with real=False the paths
+    are inflated back to future dollars. Liabilities are held at their
+    current balance, as repayments are already in the spending history.
+
+    A_t = A_(t-1) * g_t + c_t unrolls to A_t = G_t * (A_0 + sum(c_s / G_s)),
+    where G is the running product of growth, so no step loops over months.
+    """
+    rng = np.random.default_rng(seed)
+    flows = np.asarray(flows, dtype=float)
+    if not len(flows):
+        flows = np.zeros(1)
+
+    # Monthly log returns in real terms, with the mean set so the expected annual return matches
+    real_return = np.log1p(annual_return) - np.log1p(inflation)
+    sigma = volatility / np.sqrt(12)
+    growth = rng.normal(real_return / 12 - sigma ** 2 / 2, sigma, (paths, months))
+    np.cumsum(growth, axis=1, out=growth)
+    np.exp(growth, out=growth)
+
+    values = flows[rng.integers(0, len(flows), (paths, months))]
+    values /= growth
+    np.cumsum(values, axis=1, out=values)
+    values += assets
+    values *= growth
+
+    # Nominal debt shrinks in today's money as prices rise
+    deflator = (1 + inflation) ** (np.arange(1, months + 1) / 12)
+    values -= liabilities / deflator
+    if not real:
+        values *= deflator
+
+    result = np.empty((paths, months + 1))
+    result[:, 0] = assets - liabilities
+    result[:, 1:] = values
+    return result
+
+
+def simulate_percentiles(assets, liabilities, flows, months, paths, annual_return, volatility,
+                         inflation, real, seed, percentiles=PERCENTILES):
+    """Simulate one chunk of paths and reduce it to per-month percentiles and mean.
+
+    Runs in worker processes for large projections, so only the small
+    summary is sent back.
+    """
+    values = simulate_networth(assets, liabilities, flows, months, paths, annual_return, volatility,
+                               inflation, real, seed)
+    return np.percentile(values, percentiles, axis=0), values.mean(axis=0)
+
+
+def project_networth(assets, liabilities, paths=DEFAULT_PATHS, years=DEFAULT_YEARS, annual_return=0.06,
+                     volatility=0.12, inflation=0.02, real=True, seed=None, max_workers=None, db_path=None,
+                     percentiles=PERCENTILES):
+    """Project net worth from the latest snapshot and the recent cash flow history.
+
+    assets and liabilities are the (name, total) lists of the latest snapshot,
+    as NetWorth.get_networth_data returns them. Returns a DataFrame indexed
+    by month start with a column per percentile plus the mean.
+
+    Runs over CHUNK_PATHS are simulated in chunks, each with its own seed
+    drawn from one SeedSequence, so a seed gives the same result however
+    many workers share the run. Chunk percentiles are averaged, weighted by
+    size; with chunks this large that matches the pooled percentile to well
+    within the simulation's own noise.
+    """
+    assets = sum(total for _, total in assets)
+    liabilities = sum(total for _, total in liabilities)
+    flows = cash_flow_history(store=get_transaction_store(db_path), categories=get_categories(db_path)).sum(axis=0).to_numpy()
+    months = years * 12
+
+    sizes = [CHUNK_PATHS] * (paths // CHUNK_PATHS) + ([paths % CHUNK_PATHS] if paths % CHUNK_PATHS else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(assets, liabilities, flows, months, size, annual_return, volatility, inflation, real, chunk_seed, percentiles)
+            for size, chunk_seed in zip(sizes, seeds)]
+
+    if len(jobs) == 1 or max_workers == 1 or (max_workers is None and paths <= PARALLEL_PATHS):
+        results = [simulate_percentiles(*job) for job in jobs]
+    else:
+        # Spawn rather than fork so workers don't inherit the Tk interpreter
+        context = multiprocessing.get_context('spawn')
+        workers = min(len(jobs), max_workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=configure_worker, initargs=(worker_settings(),)) as pool:
+            results = list(pool.map(simulate_percentiles, *zip(*jobs)))
+
+    weights = np.array(sizes) / paths
+    bands = sum(weight * chunk_bands for weight, (chunk_bands, _) in zip(weights, results))
+    mean = sum(weight * chunk_mean for weight, (_, chunk_mean) in zip(weights, results))
+
+    today = datetime.now()
+    index = pd.date_range(datetime(today.year, today.month, 1), periods=months + 1, freq='MS')
+    df = pd.DataFrame(bands.T, index=index, columns=list(percentiles))
+    df['mean'] = mean
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Project net worth with a Monte Carlo simulation.")
+    add_arguments(parser)
+    parser.add_argument('--paths', type=int, default=DEFAULT_PATHS)
+    parser.add_argument('--years', type=int, default=DEFAULT_YEARS)
+    parser.add_argument('--return', dest='annual_return', type=float, default=0.06, help="expected annual return, e.g. 0.06")
+    parser.add_argument('--volatility', type=float, default=0.12, help="annual volatility of returns")
+    parser.add_argument('--inflation', type=float, default=0.02, help="annual inflation")
+    parser.add_argument('--nominal', action='store_true', help="report future dollars instead of today's")
+    parser.add_argument('--workers', type=int, help="worker processes (default: one per CPU for large runs)")
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+    configure_from_args(args)
+
+    # Imported here to avoid a circular import with net_worth, whose page runs projections
+    from net_worth import fetch_latest_networth
+
+    conn = connect()
+    try:
+        latest = fetch_latest_networth(conn)
+    finally:
+        conn.close()
+    if latest is None:
+        parser.exit(1, "No net worth has been recorded yet\n")
+
+    started = time.perf_counter()
+    projection = project_networth(*latest, args.paths, args.years, args.annual_return, args.volatility, args.inflation,
+                                  real=not args.nominal, seed=args.seed, max_workers=args.workers)
+    elapsed = time.perf_counter() - started
+    yearly = projection.iloc[::12]
+    yearly.index = yearly.index.year
+    print(yearly.round(0).to_string())
+    print(f"{args.paths:,} paths over {args.years} years in {elapsed:.2f}s")
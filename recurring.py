@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd
+from accounts import account_schema, attach_all_accounts, list_accounts
+from archive import TransactionArchive
+from config import connect
+
+# Cadence name -> (typical days between charges, allowed drift in days)
+CADENCES = {
+    'weekly': (7, 2),
+    'fortnightly': (14, 3),
+    'monthly': (30.4, 4),
+    'quarterly': (91.3, 10),
+    'yearly': (365.25, 20),
+}
+MIN_OCCURRENCES = 3
+# Largest spread allowed in the gaps and amounts, relative to their medians
+MAX_INTERVAL_SPREAD = 0.2
+MAX_AMOUNT_SPREAD = 0.25
+
+
+def create_subscriptions_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS subscriptions (
+            payee_key TEXT PRIMARY KEY,
+            payee TEXT,
+            cadence TEXT,
+            interval_days REAL,
+            amount REAL,
+            occurrences INTEGER,
+            last_date TEXT,
+            next_date TEXT,
+            annual_cost REAL
+        )
+        """)
+
+
+def normalize_payees(payees):
+    """Reduce payee strings to a stable key by dropping reference numbers and punctuation."""
+    return (
+        payees.fillna('').str.upper()
+        .str.replace(r'[^A-Z ]+', ' ', regex=True)
+        .str.split().str[:3].str.join(' ')
+    )
+
+
+def detect_subscriptions(df):
+    """Find recurring charges in a frame of payee, date and amount columns.
+
+    Everything is done with sorted, grouped operations: rows are ordered by
+    payee key and date once, gaps come from a single diff, and each payee's
+    regularity is judged from grouped medians.
+    """
+    columns = ['payee_key', 'payee', 'cadence', 'interval_days', 'amount',
+               'occurrences', 'last_date', 'next_date', 'annual_cost']
+    if df.empty:
+        return pd.DataFrame(columns=columns)
+
+    df = df.assign(
+        payee_key=normalize_payees(df['payee']),
+        when=pd.to_datetime(df['date'], format='%Y/%m/%d', errors='coerce'),
+    ).dropna(subset=['when'])
+    df = df[df['payee_key'] != ''].sort_values(['payee_key', 'when'])
+
+    # Gap to the previous charge from the same payee; the first charge of each payee has none
+    days = (df['when'] - pd.Timestamp('1970-01-01')).dt.days.to_numpy()
+    keys = df['payee_key'].to_numpy()
+    gaps = np.diff(days, prepend=days[:1]).astype(float)
+    gaps[np.r_[True, keys[1:] != keys[:-1]]] = np.nan
+    df['gap'] = gaps
+
+    grouped = df.groupby('payee_key')
+    stats = grouped.agg(
+        payee=('payee', 'last'),
+        occurrences=('when', 'size'),
+        last_when=('when', 'max'),
+        interval_days=('gap', 'median'),
+        amount=('amount', 'median'),
+    )
+    df['gap_deviation'] = (df['gap'] - df['payee_key'].map(stats['interval_days'])).abs()
+    df['amount_deviation'] = (df['amount'] - df['payee_key'].map(stats['amount'])).abs()
+    stats['gap_spread'] = df.groupby('payee_key')['gap_deviation'].median() / stats['interval_days']
+    stats['amount_spread'] = df.groupby('payee_key')['amount_deviation'].median() / stats['amount'].abs()
+
+    # Only money going out counts as a subscription
+    stats = stats[
+        (stats['amount'] < 0)
+        & (stats['occurrences'] >= MIN_OCCURRENCES)
+        & (stats['interval_days'] > 0)
+        & (stats['gap_spread'] <= MAX_INTERVAL_SPREAD)
+        & (stats['amount_spread'] <= MAX_AMOUNT_SPREAD)
+    ].copy()
+
+    # Match each payee's typical gap to the nearest known cadence
+    stats['cadence'] = None
+    for name, (period, drift) in CADENCES.items():
+        stats.loc[(stats['interval_days'] - period).abs() <= drift, 'cadence'] = name
+    stats = stats.dropna(subset=['cadence'])
+
+    stats['next_date'] = (stats['last_when'] + pd.to_timedelta(stats['interval_days'], unit='D')).dt.strftime('%Y/%m/%d')
+    stats['last_date'] = stats['last_when'].dt.strftime('%Y/%m/%d')
+    stats['annual_cost'] = stats['amount'].abs() * 365.25 / stats['interval_days']
+    return stats.reset_index()[columns]
+
+
+def matching_payees(payees, payee_keys):
+    """Return the distinct payee strings that normalize to one of payee_keys."""
+    unique = pd.Series(pd.unique(payees.dropna()), dtype=object)
+    return unique[normalize_payees(unique).isin(payee_keys)].tolist()
+
+
+def load_payments(conn, payee_keys=None, archive=None):
+    """Load payee, date and amount from every ledger and the archive.
+
+    With payee_keys, the distinct payees are matched to those keys first,
+    then only their rows are read, through the payee index and the archive's
+    row filters.
+    """
+    attach_all_accounts(conn)
+    archive = archive or TransactionArchive()
+    columns = ['payee', 'date', 'amount']
+    if payee_keys is None:
+        frames = [pd.read_sql_query('SELECT payee, date, amount FROM all_transactions', conn)]
+        frames += [archive.read(year, columns=columns) for year in archive.archived_years()]
+        return pd.concat(frames, ignore_index=True)
+
+    # Distinct payees come from each ledger's payee index; the view would scan every row
+    schemas = ['main'] + [account_schema(name) for name in list_accounts()]
+    distinct = pd.concat([
+        pd.read_sql_query(f'SELECT DISTINCT payee FROM {schema}.transactions', conn)['payee'] for schema in schemas
+    ])
+    frames = []
+    payees = matching_payees(distinct, payee_keys)
+    if payees:
+        frames.append(pd.read_sql_query(
+            f"SELECT payee, date, amount FROM all_transactions WHERE payee IN ({', '.join('?' * len(payees))})",
+            conn, params=payees
+        ))
+    for year in archive.archived_years():
+        payees = matching_payees(archive.read(year, columns=['payee'])['payee'], payee_keys)
+        if payees:
+            frames.append(archive.read(year, columns=columns, payees=payees))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+
+
+def refresh_subscriptions(db_path=None):
+    """Rebuild the subscriptions table from the full history."""
+    conn = connect(db_path)
+    try:
+        subscriptions = detect_subscriptions(load_payments(conn))
+        cursor = conn.cursor()
+        create_subscriptions_table(cursor)
+        cursor.execute('DELETE FROM subscriptions')
+        _write_subscriptions(cursor, subscriptions)
+        conn.commit()
+        return subscriptions
+    finally:
+        conn.close()
+
+
+def update_subscriptions(payees, db_path=None):
+    """Re-check only the payees touched by an import."""
+    payee_keys = set(normalize_payees(pd.Series(list(payees), dtype=object))) - {''}
+    if not payee_keys:
+        return
+    conn = connect(db_path)
+    try:
+        subscriptions = detect_subscriptions(load_payments(conn, payee_keys))
+        cursor = conn.cursor()
+        create_subscriptions_table(cursor)
+        cursor.executemany('DELETE FROM subscriptions WHERE payee_key = ?', [(key,) for key in payee_keys])
+        _write_subscriptions(cursor, subscriptions)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _write_subscriptions(cursor, subscriptions):
+    cursor.executemany('''
+        INSERT INTO subscriptions (payee_key, payee, cadence, interval_days, amount,
+                                   occurrences, last_date, next_date, annual_cost)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [tuple(row) for row in subscriptions.to_dict('split')['data']])
+
+
+if __name__ == "__main__":
+    subscriptions = refresh_subscriptions()
+    pd.set_option('display.width', 160)
+    print(subscriptions.sort_values('annual_cost', ascending=False).to_string(index=False))
+    print(f"Total annual cost: ${subscriptions['annual_cost'].sum():,.2f}")
@@ -0,0 +1,171 @@
+import os
+import time
+import argparse
+import calendar
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from matplotlib.figure import Figure
+from accounts import attach_all_accounts
+from anomalies import BASELINE_MONTHS, flagged_transaction_counts, unusual_totals
+from archive import TransactionArchive
+from categories import get_categories
+from fx import FX_DATE, to_reporting_currency
+from breakdown import COLUMNS, PIE_TYPES, build_breakdown, breakdown_rows, draw_pie_chart
+from config import add_arguments, configure_from_args, configure_worker, connect, worker_settings
+
+REPORT_DIR = 'reports'
+ROW_COLOURS = {'heading': '#cfe0f3', 'section': '#e6f0ff', 'total': '#d9ead3', 'anomaly': '#f8d7da'}
+# Left edge of each table column, as a fraction of the table width
+TABLE_COLUMNS = (0.0, 0.22, 0.32, 0.42, 0.52, 0.62, 0.72, 0.81, 0.9)
+# Comparisons look back a year, and anomalies over the same baseline
+HISTORY_MONTHS = max(12, BASELINE_MONTHS)
+
+
+def fetch_monthly_totals(conn, start_period, end_period, archive=None):
+    """Sum amounts per month and category for a whole range of months at once.
+
+    Returns a frame with a row per category id and a column per period that
+    has any rows, in the reporting currency. Periods are year * 12 + (month - 1).
+    """
+    df = pd.read_sql_query(f'''
+        SELECT year, month, category_id, currency, {FX_DATE} AS fx_date, SUM(amount) AS amount
+        FROM all_category_amounts
+        WHERE year * 12 + month - 1 BETWEEN ? AND ?
+        GROUP BY year, month, category_id, currency, fx_date
+    ''', conn, params=(start_period, end_period))
+
+    archive = archive or TransactionArchive()
+    frames = [df]
+    for year in archive.archived_years():
+        if start_period // 12 <= year <= end_period // 12:
+            archived = archive.read(year, columns=['year', 'month', 'category_id', 'amount', 'currency', 'date'])
+            frames.append(archived.rename(columns={'date': 'fx_date'}))
+    df = pd.concat(frames, ignore_index=True).dropna(subset=['category_id'])
+    df = to_reporting_currency(df, ['amount'])
+    df['period'] = (df['year'] * 12 + df['month'] - 1).astype(int)
+    df = df[df['period'].between(start_period, end_period)]
+    df['category_id'] = df['category_id'].astype(int)
+    return df.groupby(['category_id', 'period'])['amount'].sum().unstack(fill_value=0)
+
+
+def month_comparisons(totals, period):
+    """Same month last year and trailing 3 and 12 month averages per category id.
+
+    Works like fetch_comparison_totals, but from the monthly totals already
+    fetched for the whole report range; months without rows count as zero.
+    """
+    def trailing(months):
+        return totals.reindex(columns=range(period - months, period), fill_value=0).sum(axis=1)
+
+    last_year = totals.reindex(columns=[period - 12], fill_value=0)[period - 12]
+    average_3 = trailing(3) / 3
+    average_12 = trailing(12) / 12
+    return {
+        int(category_id): (last_year[category_id], average_3[category_id], average_12[category_id])
+        for category_id in totals.index
+    }
+
+
+def report_figure(year, month, section_data, type_amounts):
+    """Draw one month's breakdown table and pie chart onto a new figure."""
+    fig = Figure(figsize=(16, 8), dpi=100)
+    fig.suptitle(f"Monthly Breakdown - {calendar.month_name[month]} {year}", fontweight='bold')
+
+    # Budget table, coloured like the app's treeview. Plain text rows draw far
+    # faster than matplotlib's table artist, which dominates render time.
+    table_ax = fig.add_axes([0.01, 0.02, 0.7, 0.88])
+    table_ax.axis('off')
+    rows = [(tuple(heading for _, heading in COLUMNS), 'heading')]
+    rows += list(breakdown_rows(section_data))
+    row_height = 1 / max(len(rows), 30)
+    table_ax.set_xlim(0, 1)
+    table_ax.set_ylim(0, 1)
+    for i, (values, tag) in enumerate(rows):
+        top = 1 - i * row_height
+        if tag in ROW_COLOURS:
+            table_ax.axhspan(top - row_height, top, color=ROW_COLOURS[tag])
+        weight = 'bold' if tag in ('heading', 'section', 'total') else 'normal'
+        # strict, so a column added to the breakdown can't silently go missing here
+        for x, value in zip(TABLE_COLUMNS, values, strict=True):
+            table_ax.text(x, top - row_height / 2, value, va='center', fontsize=7, fontweight=weight)
+
+    pie_ax = fig.add_axes([0.73, 0.25, 0.26, 0.5])
+    if any(type_amounts.get(t, 0) for t in PIE_TYPES):
+        draw_pie_chart(pie_ax, type_amounts)
+    else:
+        pie_ax.axis('off')
+        pie_ax.text(0.5, 0.5, "No data available", ha='center')
+    return fig
+
+
+def render_month_report(job):
+    """Draw one month's report to a file with the Agg renderer."""
+    year, month, section_data, type_amounts, path = job
+    report_figure(year, month, section_data, type_amounts).savefig(path)
+    return path
+
+
+def generate_reports(start, end, out_dir=REPORT_DIR, fmt='png', max_workers=None, db_path=None):
+    """Render a report file for every month from start to end, both (year, month) inclusive.
+
+    Data for the whole range is fetched once up front; only the rendering is
+    spread across worker processes.
+    """
+    start_period = start[0] * 12 + start[1] - 1
+    end_period = end[0] * 12 + end[1] - 1
+
+    conn = connect(db_path)
+    try:
+        attach_all_accounts(conn)
+        totals = fetch_monthly_totals(conn, start_period - HISTORY_MONTHS, end_period)
+        flagged = {}
+        for period in range(start_period, end_period + 1):
+            year, month = period // 12, period % 12 + 1
+            flagged[period] = set(flagged_transaction_counts(conn, year, month))
+    finally:
+        conn.close()
+
+    categories = get_categories(db_path)
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = []
+    for period in range(start_period, end_period + 1):
+        year, month = period // 12, period % 12 + 1
+        # Categories with unusual transactions or an unusual month total get highlighted
+        flagged[period] |= unusual_totals(totals.abs(), period, BASELINE_MONTHS)
+        month_totals = totals[period].to_dict() if period in totals.columns else {}
+        section_data, type_amounts = build_breakdown(
+            categories, month_totals, flagged=flagged[period], comparisons=month_comparisons(totals, period))
+        path = os.path.join(out_dir, f"breakdown_{year}_{month:02d}.{fmt}")
+        jobs.append((year, month, section_data, type_amounts, path))
+
+    if max_workers == 1 or len(jobs) < 2:
+        return [render_month_report(job) for job in jobs]
+
+    # Spawn rather than fork so workers don't inherit any Tk state
+    context = multiprocessing.get_context('spawn')
+    workers = min(len(jobs), max_workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=configure_worker, initargs=(worker_settings(),)) as pool:
+        return list(pool.map(render_month_report, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+
+
+def parse_month(value):
+    year, month = value.split('-')
+    return int(year), int(month)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render monthly breakdown reports to files.")
+    parser.add_argument('start', type=parse_month, help="first month, YYYY-MM")
+    parser.add_argument('end', type=parse_month, help="last month, YYYY-MM")
+    parser.add_argument('--out', default=REPORT_DIR)
+    parser.add_argument('--format', choices=['png', 'pdf'], default='png')
+    parser.add_argument('--workers', type=int, default=None)
+    add_arguments(parser)
+    args = parser.parse_args()
+    configure_from_args(args)
+
+    started = time.perf_counter()
+    paths = generate_reports(args.start, args.end, args.out, args.format, args.workers)
+    print(f"Wrote {len(paths)} reports to {args.out} in {time.perf_counter() - started:.1f}s")
@@ -1,6 +1,5 @@
 import tkinter as tk
 from tkinter import ttk
-import sqlite3
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import webbrowser
@@ -8,6 +7,35 @@ import os
 from datetime import datetime
 import pandas as pd
 from theme import ThemeManager
+from archive import TransactionArchive
+from categories import get_categories
+from transaction_store import get_transaction_store
+from fx import FX_DATE, to_reporting_currency
+
+
+def fetch_trend_totals(conn, year, category_ids, archive=None):
+    """Sum each month's amounts per category for a year, including an archived year.
+
+    Amounts are converted to the reporting currency. The connection must
+    already have the account ledgers attached.
+    """
+    placeholders = ', '.join('?' * len(category_ids))
+    df = pd.read_sql_query(f'''
+        SELECT month, category_id, currency, {FX_DATE} AS fx_date, SUM(amount) as amount
+        FROM all_category_amounts
+        WHERE year = ? AND category_id IN ({placeholders})
+        GROUP BY month, category_id, currency, fx_date
+    ''', conn, params=[year] + list(category_ids))
+    df = to_reporting_currency(df, ['amount'])
+    df = df.groupby(['month', 'category_id'], as_index=False)['amount'].sum()
+
+    # Add archived totals when the year has been moved out of the database
+    archive = archive or TransactionArchive()
+    if year in archive.archived_years():
+        df = pd.concat([df, archive.monthly_totals(year, category_ids)], ignore_index=True)
+        df = df.groupby(['month', 'category_id'], as_index=False)['amount'].sum()
+    return df
+
 
 class SpendingTrends:
     def __init__(self, parent):
@@ -81,11 +109,7 @@ class SpendingTrends:
     
     def load_categories(self):
         try:
-            conn = sqlite3.connect('financial_data.db')
-            cursor = conn.cursor()
-            cursor.execute('SELECT name FROM categories')
-            categories = [row[0] for row in cursor.fetchall()]
-            conn.close()
+            categories = get_categories().names()
             
             # Create checkboxes for each category
             for i, category in enumerate(categories):
@@ -112,34 +136,11 @@ class SpendingTrends:
                 tk.messagebox.showwarning("Warning", "Please select at least one category")
                 return
             
-            # Get data from database
-            conn = sqlite3.connect('financial_data.db')
-            cursor = conn.cursor()
-            
-            # Create DataFrame to store results
-            data = []
-            
-            for category in selected:
-                cursor.execute('''
-                    SELECT month, SUM(amount) as total
-                    FROM transactions
-                    WHERE category = ? AND year = ?
-                    GROUP BY month
-                    ORDER BY month
-                ''', (category, year))
-                
-                results = cursor.fetchall()
-                for month, total in results:
-                    data.append({
-                        'month': month,
-                        'category': category,
-                        'amount': total
-                    })
-            
-            conn.close()
-            
-            # Create DataFrame
-            df = pd.DataFrame(data)
+            # Totals for every selected category come from the shared in-memory store
+            categories = get_categories()
+            selected_ids = [categories.id_for(name) for name in selected]
+            df = get_transaction_store().monthly_totals(year, selected_ids)
+            df['category'] = df['category_id'].map(categories.name)
             
             # Create figure
             fig = go.Figure()
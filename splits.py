@@ -0,0 +1,72 @@
+import argparse
+from accounts import MAIN_ACCOUNT, attach_all_accounts, list_accounts, account_schema
+from config import add_arguments, configure_from_args, connect
+
+# Splits may differ from their parent by rounding, but by no more than half a cent
+SPLIT_TOLERANCE = 0.005
+
+
+def split_errors(amounts, splits):
+    """Check many split transactions against their parents' amounts at once.
+
+    amounts is a Series of parent amounts indexed by a transaction key, and
+    splits a DataFrame of key, category_id and amount rows. Returns
+    {key: problem} for each transaction whose splits are incomplete or
+    don't add up.
+    """
+    totals = splits.groupby('key')['amount'].agg(['sum', 'count']).reindex(amounts.index)
+    difference = (amounts - totals['sum'].fillna(0)).abs()
+
+    errors = {}
+    for key in difference.index[difference > SPLIT_TOLERANCE]:
+        errors[key] = f"Splits total {totals.at[key, 'sum']:.2f} but the amount is {amounts[key]:.2f}"
+    for key in totals.index[totals['count'].fillna(0) < 2]:
+        errors[key] = "A split needs at least two lines"
+    for key in splits.loc[splits['category_id'].isna(), 'key'].unique():
+        errors[key] = "Every split needs a category"
+    return errors
+
+
+def unbalanced_splits(conn, schema='main', after_id=0):
+    """Find split transactions in a ledger whose splits don't sum to the parent amount.
+
+    One grouped join over the splits index; after_id limits the check to
+    transactions added since a known id.
+    """
+    return conn.execute(f'''
+        SELECT t.id, t.amount, SUM(s.amount)
+        FROM {schema}.transaction_splits s
+        JOIN {schema}.transactions t ON t.id = s.transaction_id
+        WHERE s.transaction_id > ?
+        GROUP BY t.id
+        HAVING ABS(t.amount - SUM(s.amount)) > ?
+    ''', (after_id, SPLIT_TOLERANCE)).fetchall()
+
+
+def check_all_splits(db_path=None):
+    """Return {account: unbalanced rows} for every ledger with split problems."""
+    conn = connect(db_path)
+    try:
+        attach_all_accounts(conn)
+        ledgers = [(MAIN_ACCOUNT, 'main')] + [(name, account_schema(name)) for name in list_accounts()]
+        problems = {}
+        for name, schema in ledgers:
+            rows = unbalanced_splits(conn, schema)
+            if rows:
+                problems[name] = rows
+        return problems
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that split transactions add up.")
+    add_arguments(parser)
+    configure_from_args(parser.parse_args())
+
+    problems = check_all_splits()
+    for account, rows in problems.items():
+        for transaction_id, amount, total in rows:
+            print(f"{account} #{transaction_id}: amount {amount:.2f}, splits total {total:.2f}")
+    if not problems:
+        print("All split transactions balance")
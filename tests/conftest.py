@@ -0,0 +1,103 @@
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+import pytest
+
+# The app's modules live at the repository root; charts render without a display
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import config
+from main import FinancialApp
+from categories import get_categories, invalidate_categories
+from transaction_store import invalidate_transaction_store
+from fx import invalidate_fx_rates
+
+# Ledger sizes every scaling test runs at
+SIZES = (1_000, 10_000, 50_000)
+START_DATE = np.datetime64('2023-01-01')
+DAYS = 730
+
+
+def budget(rows, base, per_row):
+    """A budget that grows linearly with the rows processed, on top of a fixed base."""
+    return base + per_row * rows
+
+
+def measure(func, *args, **kwargs):
+    """Run func twice, once timed and once under tracemalloc.
+
+    Returns (result, seconds, peak bytes). The runs are separate because
+    tracemalloc slows Python code down several times over.
+    """
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    seconds = time.perf_counter() - started
+
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, seconds, peak
+
+
+def assert_within(seconds, peak, max_seconds, max_bytes):
+    assert seconds <= max_seconds, f"took {seconds:.3f}s, budget {max_seconds:.3f}s"
+    assert peak <= max_bytes, f"peaked at {peak / 1e6:.1f}MB, budget {max_bytes / 1e6:.1f}MB"
+
+
+def generate_transactions(rows, category_ids, seed=0):
+    """Random transactions spread over two years, with payees repeating like a real ledger."""
+    rng = np.random.default_rng(seed)
+    dates = pd.to_datetime(START_DATE + rng.integers(0, DAYS, rows))
+    payees = np.array([f"PAYEE {i}" for i in range(max(rows // 20, 10))])
+    return pd.DataFrame({
+        'date': dates.strftime('%Y/%m/%d'),
+        'payee': payees[rng.integers(0, len(payees), rows)],
+        'amount': -np.round(rng.gamma(2.0, 30.0, rows), 2),
+        'category_id': rng.choice(category_ids, rows),
+        'month': dates.month,
+        'year': dates.year,
+    })
+
+
+def insert_transactions(df):
+    conn = config.connect()
+    try:
+        conn.executemany(
+            'INSERT INTO transactions (date, payee, amount, category_id, month, year) VALUES (?, ?, ?, ?, ?, ?)',
+            df[['date', 'payee', 'amount', 'category_id', 'month', 'year']].itertuples(index=False, name=None)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def reset_caches():
+    invalidate_categories()
+    invalidate_transaction_store()
+    invalidate_fx_rates()
+
+
+@pytest.fixture
+def database(tmp_path):
+    """A fresh database with the app's schema and default categories, used by every module."""
+    reset_caches()
+    config.configure(str(tmp_path / 'financial_data.db'), 'file')
+    FinancialApp.create_db()
+    yield config.get_db_path()
+    reset_caches()
+
+
+@pytest.fixture
+def ledger(database, request):
+    """A database filled with generated transactions; parametrize with the row count."""
+    rows = getattr(request, 'param', SIZES[0])
+    df = generate_transactions(rows, [category.id for category in get_categories()])
+    insert_transactions(df)
+    return df
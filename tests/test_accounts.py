@@ -0,0 +1,26 @@
+import pytest
+from config import connect
+from accounts import MAX_ACCOUNTS, attach_account, attach_all_accounts, create_account, list_accounts
+
+
+def test_accounts_are_limited_to_what_one_connection_can_attach(database):
+    names = [f"Card {number}" for number in range(MAX_ACCOUNTS)]
+    for name in names:
+        create_account(name)
+
+    with pytest.raises(ValueError, match=f"already {MAX_ACCOUNTS} account ledgers"):
+        create_account("One too many")
+    conn = connect()
+    try:
+        with pytest.raises(ValueError, match=f"already {MAX_ACCOUNTS} account ledgers"):
+            attach_account(conn, "One too many")
+        # Existing ledgers can still be written to, and reports read them all at once
+        for name in names:
+            schema = attach_account(conn, name)
+            conn.execute(f"INSERT INTO {schema}.transactions (date, payee, amount, month, year) "
+                         f"VALUES ('2024/01/01', 'Shop', -1.0, 1, 2024)")
+        attach_all_accounts(conn)
+        accounts = [row[0] for row in conn.execute('SELECT DISTINCT account FROM all_transactions ORDER BY account')]
+    finally:
+        conn.close()
+    assert accounts == list_accounts() and len(accounts) == MAX_ACCOUNTS
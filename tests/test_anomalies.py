@@ -0,0 +1,72 @@
+import pandas as pd
+import pytest
+from conftest import SIZES, assert_within, budget, generate_transactions, measure
+from config import connect, get_db_path
+from accounts import attach_all_accounts
+from anomalies import flagged_transaction_counts, refresh_category_stats, running_stats, update_category_stats
+from transaction_manager import TransactionWriter
+
+
+def stored_stats():
+    conn = connect()
+    try:
+        return pd.read_sql_query('SELECT * FROM category_stats', conn).set_index('category_id')
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize('ledger', SIZES, indirect=True)
+def test_category_stats_update(ledger):
+    """Adding an import's rows to the stats reads only those rows, so it doesn't grow with the ledger."""
+    rows = len(ledger)
+    conn = connect()
+    try:
+        refresh_category_stats(conn)
+        conn.commit()
+    finally:
+        conn.close()
+
+    new = generate_transactions(200, ledger['category_id'].unique()[:2].tolist(), seed=1)
+    amounts = list(new[['category_id', 'amount']].itertuples(index=False, name=None))
+
+    def update():
+        conn = connect()
+        try:
+            update_category_stats(conn, amounts)
+        finally:
+            conn.close()
+    _, seconds, peak = measure(update)
+
+    writer = TransactionWriter(get_db_path())
+    for row in new.itertuples():
+        writer.add(row.date, row.payee, row.amount, row.category_id, row.month, row.year)
+    writer.close()
+
+    expected = running_stats(pd.concat([ledger, new], ignore_index=True))
+    stats = stored_stats()
+    assert list(stats.index) == sorted(expected.index)
+    for column in ('count', 'total', 'total_squares'):
+        assert stats[column].to_numpy() == pytest.approx(expected.loc[stats.index, column].to_numpy())
+    # Two hundred new rows: a few milliseconds and well under 1MB at any ledger size
+    assert_within(seconds, peak, budget(rows, 0.05, 1e-6), budget(rows, 1e6, 100))
+
+
+def test_flagged_transactions(ledger):
+    """Only amounts far from their category's usual size are counted, including ones added since the rebuild."""
+    category_id = int(ledger['category_id'].iloc[0])
+    conn = connect()
+    try:
+        refresh_category_stats(conn)
+        update_category_stats(conn, [(category_id, -100_000.0)])
+        conn.execute(
+            'INSERT INTO transactions (date, payee, amount, category_id, month, year) VALUES (?, ?, ?, ?, ?, ?)',
+            ('2024/06/15', 'OUTLIER', -100_000.0, category_id, 6, 2024))
+        conn.commit()
+        attach_all_accounts(conn)
+        flagged = flagged_transaction_counts(conn, 2024, 6)
+    finally:
+        conn.close()
+
+    # Generated amounts are gamma distributed, so a few of them are unusual too
+    assert flagged[category_id] >= 1
+    assert sum(flagged.values()) < 0.05 * (ledger[['year', 'month']] == [2024, 6]).all(axis=1).sum()
@@ -0,0 +1,76 @@
+import os
+import sqlite3
+from datetime import datetime
+import pytest
+import forecast
+from accounts import account_path, attach_account, create_account
+from config import connect, get_db_path
+from api_server import ReadOnlyPool, breakdown, trends
+
+
+def test_breakdown_forecasts_through_the_read_only_pool(ledger, monkeypatch):
+    """The current month's forecast reads from the pooled connection rather than opening a writable one."""
+    def refuse(*args, **kwargs):
+        raise AssertionError("forecast opened its own connection")
+    monkeypatch.setattr(forecast, 'connect', refuse)
+
+    pool = ReadOnlyPool(get_db_path(), size=1)
+    try:
+        with pool.connection() as conn:
+            result = breakdown(conn, {}, get_db_path())
+            assert conn.execute('PRAGMA query_only').fetchone() == (1,)
+    finally:
+        pool.close()
+
+    today = datetime.now()
+    assert (result['year'], result['month']) == (today.year, today.month)
+    assert result['sections']
+
+
+def test_trends_see_categories_renamed_elsewhere(ledger):
+    """The long-running server notices a rename made by the app or the command line."""
+    pool = ReadOnlyPool(get_db_path(), size=1)
+    try:
+        with pool.connection() as conn:
+            assert 'Food' in trends(conn, {'categories': ['Food']}, get_db_path())['series']
+
+        writer = connect()
+        try:
+            writer.execute("UPDATE categories SET name = 'Dining' WHERE name = 'Food'")
+            writer.commit()
+        finally:
+            writer.close()
+
+        with pool.connection() as conn:
+            result = trends(conn, {'categories': ['Dining'], 'year': ['2024']}, get_db_path())
+    finally:
+        pool.close()
+    assert any(result['series']['Dining'])
+
+
+def test_pool_reads_ledgers_without_writing_them(database):
+    """Ledgers are attached read-only, so pooled connections can't write or upgrade them."""
+    create_account('Visa')
+    conn = connect()
+    try:
+        schema = attach_account(conn, 'Visa')
+        conn.execute(f"INSERT INTO {schema}.transactions (date, payee, amount, month, year) "
+                     "VALUES ('2024/06/01', 'SHOP', -5.0, 6, 2024)")
+        conn.commit()
+    finally:
+        conn.close()
+    before = os.stat(account_path('Visa')).st_mtime_ns
+
+    pool = ReadOnlyPool(get_db_path(), size=2)
+    try:
+        with pool.connection() as conn:
+            assert conn.execute('PRAGMA query_only').fetchone() == (1,)
+            assert conn.execute("SELECT COUNT(*) FROM all_transactions WHERE account = 'visa'").fetchone() == (1,)
+            # Even with query_only lifted, the ledger itself is open read-only
+            conn.execute('PRAGMA query_only = OFF')
+            with pytest.raises(sqlite3.OperationalError, match='readonly'):
+                conn.execute(f"DELETE FROM {schema}.transactions")
+            conn.execute('PRAGMA query_only = ON')
+    finally:
+        pool.close()
+    assert os.stat(account_path('Visa')).st_mtime_ns == before
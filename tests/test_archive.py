@@ -0,0 +1,114 @@
+import os
+import pandas as pd
+import pytest
+import category_tools
+from main import FinancialApp
+from config import connect, data_path
+from categories import get_categories, invalidate_categories
+from archive import ARCHIVE_DIR, STAGING_DIR, TransactionArchive
+from category_tools import merge_categories
+from transaction_store import TransactionStore
+
+
+def write_named_archive(year, categories):
+    """An archive year as written before transactions referenced categories by id."""
+    os.makedirs(data_path(ARCHIVE_DIR), exist_ok=True)
+    df = pd.DataFrame({
+        'id': range(1, len(categories) + 1),
+        'date': [f'{year}/03/{day:02d}' for day in range(1, len(categories) + 1)],
+        'description': None,
+        'amount': -10.0,
+        'category': categories,
+        'payee': 'SHOP',
+        'month': 3.0,
+        'year': float(year),
+    })
+    df.to_parquet(data_path(ARCHIVE_DIR, f'transactions_{year}.parquet'), index=False)
+
+
+def test_archived_category_names_are_migrated_at_startup(database):
+    write_named_archive(2019, ['Groceries', 'Old Category', 'Groceries', None])
+    write_named_archive(2020, ['Rent'])
+
+    FinancialApp.create_db()
+
+    categories = get_categories()
+    archive = TransactionArchive()
+    assert archive.read(2019)['category_id'].tolist() == [
+        categories.id_for('Groceries'), categories.id_for('Old Category'), categories.id_for('Groceries'), pd.NA
+    ]
+    assert archive.read(2020, category_ids=[categories.id_for('Rent')])['id'].tolist() == [1]
+    assert 'category' not in archive.read(2019).columns
+    # Already migrated years are left alone
+    conn = connect()
+    try:
+        assert archive.migrate_category_ids(conn) == 0
+    finally:
+        conn.close()
+
+
+def archive_groceries(year=2019):
+    """Archive a closed year of Groceries and Food transactions, keeping one live Groceries row."""
+    categories = get_categories()
+    groceries, food = categories.id_for('Groceries'), categories.id_for('Food')
+    conn = connect()
+    try:
+        conn.executemany(
+            'INSERT INTO transactions (date, payee, amount, category_id, month, year) VALUES (?, ?, ?, ?, ?, ?)',
+            [(f'{year}/05/{day:02d}', 'MARKET', -20.0, groceries if day % 2 else food, 5, year) for day in range(1, 11)]
+            + [('2024/05/01', 'MARKET', -30.0, groceries, 5, 2024)]
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    TransactionArchive().archive_year(year)
+    return groceries, food
+
+
+def test_leftover_files_are_not_archived_years(database):
+    """A write interrupted before its rename leaves a .tmp file, which is not an archived year."""
+    archive_groceries()
+    for name in ('transactions_2020.parquet.tmp', 'transactions_2021.csv.gz.tmp', 'transactions_2022.txt'):
+        with open(data_path(ARCHIVE_DIR, name), 'wb') as f:
+            f.write(b'partial')
+
+    assert TransactionArchive().archived_years() == [2019]
+    store = TransactionStore.load()
+    assert len(store) == 11
+
+
+def test_merge_rewrites_archived_years(database):
+    groceries, food = archive_groceries()
+
+    assert merge_categories('Groceries', 'Food') == 6
+
+    archived = TransactionArchive().read(2019)['category_id']
+    assert (archived == food).all()
+    assert not os.listdir(data_path(ARCHIVE_DIR, STAGING_DIR))
+    conn = connect()
+    try:
+        assert conn.execute('SELECT count FROM category_stats WHERE category_id = ?', (food,)).fetchone() == (11,)
+    finally:
+        conn.close()
+
+
+def test_failed_merge_leaves_archives_untouched(database, monkeypatch):
+    """A failure after the archives are staged rolls back the ledgers and drops the staged years."""
+    groceries, food = archive_groceries()
+
+    def fail(*args):
+        raise RuntimeError("stats failed")
+    monkeypatch.setattr(category_tools, 'refresh_category_stats', fail)
+    with pytest.raises(RuntimeError):
+        merge_categories('Groceries', 'Food')
+
+    archived = TransactionArchive().read(2019)['category_id']
+    assert (archived == groceries).sum() == 5
+    assert not os.listdir(data_path(ARCHIVE_DIR, STAGING_DIR))
+    invalidate_categories()
+    assert get_categories().id_for('Groceries') == groceries
+    conn = connect()
+    try:
+        assert conn.execute('SELECT category_id FROM transactions').fetchall() == [(groceries,)]
+    finally:
+        conn.close()
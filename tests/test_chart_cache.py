@@ -0,0 +1,12 @@
+from chart_cache import chart_fingerprint
+from theme import ThemeManager
+
+
+def test_theme_change_misses_the_cache(monkeypatch):
+    """Charts are keyed on the theme, so a new color scheme renders afresh instead of reusing old images."""
+    data = (100.0, 250.0, 80.0)
+    before = chart_fingerprint('breakdown_pie', data, (4, 4), theme=ThemeManager.current_theme())
+    assert chart_fingerprint('breakdown_pie', data, (4, 4), theme=ThemeManager.current_theme()) == before
+
+    monkeypatch.setitem(ThemeManager.COLORS, 'background', '#202020')
+    assert chart_fingerprint('breakdown_pie', data, (4, 4), theme=ThemeManager.current_theme()) != before
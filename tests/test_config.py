@@ -0,0 +1,93 @@
+import os
+import sqlite3
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import pytest
+import config
+from config import DB_ENV, MODE_ENV, MODES
+
+SOURCES = ('from_args', 'from_env', 'from_file')
+
+
+def make_source(path, marker):
+    # Each candidate database holds a table named after where it was chosen from
+    conn = sqlite3.connect(path)
+    conn.execute(f'CREATE TABLE {marker} (id INTEGER)')
+    conn.commit()
+    conn.close()
+
+
+def write_config(path, mode):
+    path.write_text(f"[database]\npath = from_file.db\nmode = {mode}\n")
+
+
+def chosen_source():
+    conn = config.connect()
+    try:
+        names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    finally:
+        conn.close()
+    return names & set(SOURCES)
+
+
+@pytest.fixture
+def sources(tmp_path, monkeypatch):
+    for marker in SOURCES:
+        make_source(tmp_path / f'{marker}.db', marker)
+    # Each step sets the environment it expects, whatever the shell running the tests has
+    monkeypatch.delenv(DB_ENV, raising=False)
+    monkeypatch.delenv(MODE_ENV, raising=False)
+    yield tmp_path
+    config.configure(str(tmp_path / 'from_args.db'), 'file')
+
+
+@pytest.mark.parametrize('mode', MODES)
+def test_arguments_win_over_environment_over_config_file(sources, monkeypatch, mode):
+    other = 'memory' if mode == 'file' else 'file'
+    config_file = sources / 'finance.ini'
+
+    # The config file alone, with its path taken relative to the file
+    write_config(config_file, mode)
+    config.configure(config_file=str(config_file))
+    assert config.get_mode() == mode
+    assert chosen_source() == {'from_file'}
+
+    # The environment wins over the config file
+    write_config(config_file, other)
+    monkeypatch.setenv(DB_ENV, str(sources / 'from_env.db'))
+    monkeypatch.setenv(MODE_ENV, mode)
+    config.configure(config_file=str(config_file))
+    assert config.get_mode() == mode
+    assert chosen_source() == {'from_env'}
+
+    # Arguments win over both
+    monkeypatch.setenv(DB_ENV, str(sources / 'from_env.db'))
+    monkeypatch.setenv(MODE_ENV, other)
+    config.configure(str(sources / 'from_args.db'), mode, str(config_file))
+    assert config.get_mode() == mode
+    assert chosen_source() == {'from_args'}
+
+
+def test_unknown_mode_is_rejected(sources, monkeypatch):
+    monkeypatch.setenv(MODE_ENV, 'tape')
+    with pytest.raises(ValueError, match='Unknown database mode'):
+        config.configure(str(sources / 'from_args.db'))
+
+
+def test_configure_leaves_environment_alone(sources, monkeypatch):
+    """A later configure() without arguments decides afresh instead of reusing the last database."""
+    monkeypatch.chdir(sources)
+    config.configure(str(sources / 'from_args.db'), 'file')
+    assert DB_ENV not in os.environ and MODE_ENV not in os.environ
+
+    (sources / 'finance.ini').write_text("[database]\npath = from_file.db\n")
+    config.configure()
+    assert chosen_source() == {'from_file'}
+
+
+def test_workers_use_the_parent_database(sources):
+    config.configure(str(sources / 'from_args.db'), 'ramdisk')
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=config.configure_worker,
+                             initargs=(config.worker_settings(),)) as pool:
+        assert pool.submit(config.get_db_path).result() == config.get_db_path()
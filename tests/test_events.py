@@ -0,0 +1,82 @@
+import config
+from events import TRANSACTIONS, DataChange, EventBus, subscribe, get_event_bus
+from transaction_manager import TransactionWriter
+from transaction_store import get_transaction_store
+from net_worth import fetch_networth_history
+
+
+class FakeWidget:
+    """Stands in for the Tk root: after() queues a callback until run() is called."""
+
+    def __init__(self):
+        self.jobs = {}
+
+    def after(self, delay, callback):
+        job = len(self.jobs) + 1
+        self.jobs[job] = callback
+        return job
+
+    def after_cancel(self, job):
+        self.jobs.pop(job, None)
+
+    def run(self):
+        jobs, self.jobs = self.jobs, {}
+        for callback in jobs.values():
+            callback()
+
+
+def test_changes_are_coalesced():
+    bus = EventBus()
+    widget = FakeWidget()
+    bus.attach(widget)
+    seen = []
+    bus.subscribe(TRANSACTIONS, seen.append)
+
+    bus.publish(TRANSACTIONS, DataChange(periods={(2024, 1)}, accounts={'main'}))
+    bus.publish(TRANSACTIONS, DataChange(periods={(2024, 2)}, accounts={'visa'}))
+    assert seen == [] and len(widget.jobs) == 1
+    widget.run()
+
+    assert len(seen) == 1
+    assert seen[0].periods == {(2024, 1), (2024, 2)}
+    assert seen[0].accounts == {'main', 'visa'}
+    # A change that doesn't know what it touched covers everything once merged
+    bus.publish(TRANSACTIONS, DataChange(periods={(2024, 3)}))
+    bus.publish(TRANSACTIONS, DataChange())
+    widget.run()
+    assert seen[-1].touches('periods', {(1999, 1)})
+
+
+def test_writer_publishes_what_it_touched(database):
+    store = get_transaction_store()
+    events = []
+    unsubscribe = subscribe(TRANSACTIONS, lambda change: events.append((change, len(store))))
+    try:
+        writer = TransactionWriter(config.get_db_path(), batch_size=2)
+        writer.add('2024/01/15', 'A', -10.0, 1, 1, 2024)
+        writer.add('2024/02/15', 'B', -20.0, 2, 2, 2024)
+        writer.add('2024/03/15', 'C', -30.0, None, 3, 2024, [(3, -10.0), (4, -20.0)])
+        writer.flush()
+    finally:
+        unsubscribe()
+
+    (first, first_rows), (second, second_rows) = events
+    assert first.periods == {(2024, 1), (2024, 2)} and first.categories == {1, 2} and first.accounts == {'main'}
+    assert second.periods == {(2024, 3)} and second.categories == {3, 4}
+    # The store subscribes first, so subscribers already see the new rows; the split adds one per line
+    assert (first_rows, second_rows) == (2, 5)
+    assert not get_event_bus().pending
+
+
+def test_networth_history_for_some_dates(database):
+    conn = config.connect()
+    try:
+        conn.executemany('INSERT INTO networth (date, account_id, amount) VALUES (?, ?, ?)',
+                         [(f'2024-01-{day:02d}', account_id, day * 10.0) for day in range(1, 20) for account_id in (1, 2)])
+        full = {date: (assets, liabilities) for date, assets, liabilities in fetch_networth_history(conn)}
+        part = fetch_networth_history(conn, {'2024-01-05', '2024-01-07'})
+    finally:
+        conn.close()
+
+    assert [row[0] for row in part] == ['2024-01-05', '2024-01-07']
+    assert all(full[date] == (assets, liabilities) for date, assets, liabilities in part)
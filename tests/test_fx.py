@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+import config
+from fx import FxRates, normalize_currency, to_reporting_currency
+
+RATES = FxRates([
+    ('USD', '2024/01/10', 1.60),
+    ('USD', '2024/02/01', 1.65),
+    ('AUD', '2024/01/01', 1.08),
+])
+
+
+def rates_for(currencies, dates):
+    return RATES.rates_for(currencies, pd.to_datetime(pd.Series(dates), format='%Y/%m/%d'))
+
+
+def test_rates_are_looked_up_as_of_each_date():
+    rates = rates_for(['USD', 'usd', 'USD', 'USD', 'AUD', None, 'NZD'],
+                      ['2024/01/09', '2024/01/10', '2024/01/31', '2024/02/01', '2024/03/01', '2024/01/01', '2024/01/01'])
+    # Before the first rate that rate is used, on a rate date it applies, and it holds until the next
+    assert rates == pytest.approx([1.60, 1.60, 1.60, 1.65, 1.08, 1.0, 1.0])
+
+
+def test_currency_without_rates_is_left_out(database):
+    with pytest.warns(UserWarning, match='No exchange rates loaded for EUR; 2 row'):
+        rates = rates_for(['EUR', 'USD', 'EUR'], ['2024/01/15'] * 3)
+    assert np.isnan(rates[[0, 2]]).all() and rates[1] == pytest.approx(1.60)
+
+    df = pd.DataFrame({'amount': [10.0, 20.0, 30.0], 'currency': ['EUR', None, 'GBP'], 'fx_date': '2024/01/15'})
+    with pytest.warns(UserWarning, match='EUR, GBP'):
+        converted = to_reporting_currency(df, ['amount'])
+    assert converted['amount'].tolist() == [20.0]
+
+
+def test_reporting_currency_comes_from_the_config_file(tmp_path):
+    ini = tmp_path / 'finance.ini'
+    ini.write_text(f"[database]\npath = {tmp_path / 'financial_data.db'}\n\n[reporting]\ncurrency = aud\n")
+    try:
+        config.configure(config_file=str(ini))
+        assert config.get_reporting_currency() == 'AUD'
+        assert normalize_currency(' aud ') is None
+        assert normalize_currency('NZD') == 'NZD'
+    finally:
+        config.configure(str(tmp_path / 'financial_data.db'), 'file', config_file=str(tmp_path / 'missing.ini'))
+    assert config.get_reporting_currency() == config.DEFAULT_REPORTING_CURRENCY
@@ -0,0 +1,302 @@
+import os
+import sys
+import csv
+import sqlite3
+import subprocess
+import pandas as pd
+import pytest
+from conftest import SIZES, assert_within, budget, generate_transactions, measure
+import config
+import transaction_manager
+from categories import get_categories
+from events import TRANSACTIONS, subscribe
+from batch_import import parse_statements, read_statement
+from transaction_manager import BatchNotSaved, TransactionWriter
+
+
+def write_bank_csv(path, df):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        for i in range(5):
+            writer.writerow([f"Preamble line {i}"])
+        writer.writerow(['Date', 'Unique Id', 'Tran Type', 'Cheque Number', 'Payee', 'Memo', 'Amount'])
+        for date, payee, amount in zip(df['date'], df['payee'], df['amount']):
+            writer.writerow([date, '', 'DEBIT', '', payee, '', f"{amount:.2f}"])
+
+
+def write_header_csv(path, df):
+    dates = df['date'].str.replace('/', '-')
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Date', 'Description', 'Amount'])
+        writer.writerows(zip(dates, df['payee'], df['amount'].map('{:.2f}'.format)))
+
+
+def write_debit_credit_csv(path, df):
+    day, month, year = df['date'].str[8:10], df['date'].str[5:7], df['date'].str[:4]
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Transaction Date', 'Details', 'Debit', 'Credit'])
+        for d, m, y, payee, amount in zip(day, month, year, df['payee'], df['amount']):
+            writer.writerow([f"{d}/{m}/{y}", payee, f"{-amount:.2f}" if amount < 0 else '', f"{amount:.2f}" if amount >= 0 else ''])
+
+
+def write_qif(path, df):
+    with open(path, 'w') as f:
+        f.write('!Type:Bank\n')
+        for date, payee, amount in zip(df['date'], df['payee'], df['amount']):
+            f.write(f"D{date[5:7]}/{date[8:10]}/{date[:4]}\nT{amount:.2f}\nP{payee}\n^\n")
+
+
+def write_ofx(path, df):
+    with open(path, 'w') as f:
+        f.write('OFXHEADER:100\nDATA:OFXSGML\n\n<OFX>\n<BANKTRANLIST>\n')
+        for date, payee, amount in zip(df['date'], df['payee'], df['amount']):
+            f.write(f"<STMTTRN>\n<DTPOSTED>{date.replace('/', '')}\n<TRNAMT>{amount:.2f}\n<NAME>{payee}\n</STMTTRN>\n")
+        f.write('</BANKTRANLIST>\n</OFX>\n')
+
+
+WRITERS = {
+    'bank_csv': (write_bank_csv, 'csv'),
+    'header_csv': (write_header_csv, 'csv'),
+    'debit_credit_csv': (write_debit_credit_csv, 'csv'),
+    'qif': (write_qif, 'qif'),
+    'ofx': (write_ofx, 'ofx'),
+}
+
+
+@pytest.mark.parametrize('rows', SIZES)
+@pytest.mark.parametrize('fmt', list(WRITERS))
+def test_statement_parsing(tmp_path, fmt, rows):
+    """Every statement format parses to the same rows, at a steady rate per row."""
+    expected = generate_transactions(rows, [1, 2, 3], seed=rows)
+    write, extension = WRITERS[fmt]
+    path = tmp_path / f"statement.{extension}"
+    write(path, expected)
+
+    df, seconds, peak = measure(read_statement, str(path))
+
+    assert len(df) == rows
+    assert list(df['date']) == list(expected['date'])
+    assert list(df['payee']) == list(expected['payee'])
+    assert df['amount'].sum() == pytest.approx(expected['amount'].sum())
+    assert (df['year'] * 100 + df['month']).tolist() == (expected['year'] * 100 + expected['month']).tolist()
+    # Around 10us a row for the slowest parser; a per-row regex or lookup would blow this
+    assert_within(seconds, peak, budget(rows, 0.1, 40e-6), budget(rows, 2e6, 600))
+
+
+def write_statements(tmp_path, rows):
+    """One statement in each format, and the rows they should parse to in order."""
+    paths, frames = [], []
+    for i, (fmt, (write, extension)) in enumerate(WRITERS.items()):
+        frames.append(generate_transactions(rows, [1, 2, 3], seed=i))
+        paths.append(str(tmp_path / f"{fmt}.{extension}"))
+        write(paths[-1], frames[-1])
+    return paths, pd.concat(frames, ignore_index=True)
+
+
+def test_parse_statements_in_process(tmp_path):
+    """A few statements are parsed in this process, in file order, without paying to start workers."""
+    paths, expected = write_statements(tmp_path, SIZES[0])
+    df, seconds, peak = measure(parse_statements, paths)
+
+    assert list(df['payee']) == list(expected['payee'])
+    assert list(df['date']) == list(expected['date'])
+    assert df['amount'].sum() == pytest.approx(expected['amount'].sum())
+    # The same per-row rate as one statement; starting even one worker process takes about a second
+    rows = len(expected)
+    assert_within(seconds, peak, budget(rows, 0.1, 40e-6), budget(rows, 2e6, 600))
+
+
+def test_parse_statements_in_workers(tmp_path):
+    """Worker processes give the same rows in the same order as parsing in process."""
+    paths, _ = write_statements(tmp_path, 100)
+    parallel = parse_statements(paths, max_workers=2, min_bytes=0)
+    pd.testing.assert_frame_equal(parallel, parse_statements(paths, max_workers=1))
+
+
+def test_parse_statements_reports_every_problem(tmp_path):
+    paths, _ = write_statements(tmp_path, 10)
+    unknown = tmp_path / 'notes.csv'
+    unknown.write_text("nothing to see here\n")
+    bad_dates = tmp_path / 'bad_dates.csv'
+    bad_dates.write_text("Date,Description,Amount\n2024-01-15,CAFE,-5.00\n2024-13-40,SHOP,-6.00\n")
+
+    with pytest.raises(ValueError) as error:
+        parse_statements([paths[0], str(unknown), paths[1], str(bad_dates)])
+    assert str(error.value).splitlines() == [
+        "Unrecognised statement format: notes.csv",
+        "bad_dates.csv: 1 row(s) with invalid dates",
+        "  row 2: '2024-13-40' (SHOP)",
+    ]
+
+
+def save_all(df, splits=None):
+    """Feed rows through the review window's writer, as save_transaction does one by one."""
+    writer = TransactionWriter(config.get_db_path())
+    splits = splits or {}
+    for i, (date, payee, amount, category_id, month, year) in enumerate(
+            df[['date', 'payee', 'amount', 'category_id', 'month', 'year']].itertuples(index=False, name=None)):
+        writer.add(date, payee, amount, int(category_id), int(month), int(year), splits.get(i))
+    writer.flush()
+    return writer
+
+
+@pytest.mark.parametrize('rows', SIZES)
+def test_save_transactions(database, rows):
+    """Reviewed rows are written in batches, so saving scales with the rows and not the ledger."""
+    ids = [category.id for category in get_categories()]
+    df = generate_transactions(rows, ids, seed=rows)
+
+    # The timed run and the tracemalloc run each save every row, so the ledger ends up doubled
+    _, seconds, peak = measure(save_all, df)
+
+    conn = config.connect()
+    try:
+        count, total = conn.execute('SELECT COUNT(*), SUM(amount) FROM transactions').fetchone()
+    finally:
+        conn.close()
+    assert count == 2 * rows
+    assert total == pytest.approx(2 * df['amount'].sum())
+    # Rows are committed 50 at a time, so this is mostly commit cost; a lookup per row would double it
+    assert_within(seconds, peak, budget(rows, 0.2, 150e-6), budget(rows, 1e6, 500))
+
+
+def test_save_split_transactions(database):
+    """Splits are stored against their parent and reported in place of its category."""
+    ids = [category.id for category in get_categories()]
+    df = generate_transactions(200, ids, seed=1)
+    first, second = ids[0], ids[1]
+    splits = {i: [(first, round(amount * 0.25, 2)), (second, round(amount - round(amount * 0.25, 2), 2))]
+              for i, amount in enumerate(df['amount']) if i % 4 == 0}
+    save_all(df, splits)
+
+    conn = config.connect()
+    try:
+        parents = conn.execute('SELECT COUNT(*) FROM transactions WHERE category_id IS NULL').fetchone()[0]
+        lines = conn.execute('SELECT COUNT(*), SUM(amount) FROM transaction_splits').fetchone()
+    finally:
+        conn.close()
+    assert parents == len(splits)
+    assert lines[0] == 2 * len(splits)
+    assert lines[1] == pytest.approx(sum(df['amount'][i] for i in splits))
+
+
+def saved_payees():
+    conn = config.connect()
+    try:
+        return [row[0] for row in conn.execute('SELECT payee FROM transactions ORDER BY id')]
+    finally:
+        conn.close()
+
+
+def test_unbalanced_split_is_rejected(database):
+    writer = TransactionWriter(config.get_db_path())
+    ids = [category.id for category in get_categories()]
+    with pytest.raises(ValueError, match='Splits total -90.00'):
+        writer.add('2024/01/15', 'SUPERMARKET', -100.0, None, 1, 2024, [(ids[0], -70.0), (ids[1], -20.0)])
+
+    # Nothing was queued, so the next row saves normally
+    writer.add('2024/01/16', 'CAFE', -5.0, ids[0], 1, 2024)
+    writer.close()
+    assert saved_payees() == ['CAFE']
+
+
+def test_failed_batch_is_dropped(database, monkeypatch):
+    """A batch that can't be written is rolled back once, not retried by every later add() and at exit."""
+    writer = TransactionWriter(config.get_db_path())
+    writer.add('2024/01/15', 'SUPERMARKET', -10.0, 1, 1, 2024, key=0)
+    monkeypatch.setattr(transaction_manager, 'unbalanced_splits', lambda *args: [(1, -10.0, 0.0)])
+    writer.add('2024/01/15', 'BUTCHER', -20.0, None, 1, 2024, [(1, -15.0), (2, -5.0)], key=1)
+    with pytest.raises(BatchNotSaved, match='2 transaction\\(s\\) were not saved') as error:
+        writer.flush()
+    monkeypatch.undo()
+    # The review puts these rows back in its queue
+    assert error.value.keys == [0, 1]
+
+    writer.add('2024/01/16', 'CAFE', -5.0, 2, 1, 2024)
+    writer.close()
+    assert saved_payees() == ['CAFE']
+
+
+def test_batch_is_written_once_when_a_subscriber_fails(database):
+    def fail(change):
+        raise RuntimeError("page refresh failed")
+
+    unsubscribe = subscribe(TRANSACTIONS, fail)
+    try:
+        writer = TransactionWriter(config.get_db_path())
+        writer.add('2024/01/15', 'SUPERMARKET', -10.0, 1, 1, 2024)
+        with pytest.raises(RuntimeError):
+            writer.flush()
+        writer.close()
+    finally:
+        unsubscribe()
+    assert saved_payees() == ['SUPERMARKET']
+
+
+EXIT_SCRIPT = """
+import sys
+import config
+from transaction_manager import TransactionWriter
+config.configure(sys.argv[1], 'file')
+writer = TransactionWriter(config.get_db_path())
+writer.add('2024/01/15', 'SUPERMARKET', -10.0, 1, 1, 2024)
+writer.add('2024/01/16', 'CAFE', -5.0, 2, 1, 2024)
+raise KeyboardInterrupt
+"""
+
+
+def test_pending_rows_are_saved_at_exit(database):
+    """Rows still waiting for a full batch are written if the app is interrupted mid-review."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-c', EXIT_SCRIPT, database], cwd=root, capture_output=True, text=True)
+    assert 'KeyboardInterrupt' in result.stderr
+
+    conn = config.connect()
+    try:
+        assert conn.execute('SELECT payee FROM transactions ORDER BY id').fetchall() == [('SUPERMARKET',), ('CAFE',)]
+    finally:
+        conn.close()
+
+
+class Var:
+    """Stands in for the review window's Tk variables."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+def test_review_saves_each_row_once_after_a_failed_batch(database, monkeypatch):
+    """Rows from a batch that failed to save are reviewed again at the end, and the current one isn't added twice."""
+    categories = get_categories()
+    manager = transaction_manager.TransactionManager.__new__(transaction_manager.TransactionManager)
+    manager.db_path = config.get_db_path()
+    manager.df = generate_transactions(3, [category.id for category in categories])
+    manager.order = [0, 1, 2]
+    manager.current_index = 0
+    manager.categories = categories.names()
+    manager.category_var = Var(categories.names()[0])
+    manager.amount_var = Var('-10.00')
+    manager.writer = TransactionWriter(manager.db_path, batch_size=2)
+    errors = []
+    monkeypatch.setattr(manager, 'show_current_row', lambda: None)
+    monkeypatch.setattr(transaction_manager.messagebox, 'showerror', lambda title, message: errors.append(message))
+
+    def locked(db_path=None):
+        raise sqlite3.OperationalError("database is locked")
+
+    manager.save_transaction()
+    with monkeypatch.context() as patch:
+        patch.setattr(transaction_manager, 'connect', locked)
+        manager.save_transaction()
+    assert manager.order == [0, 1, 2, 0, 1] and manager.current_index == 2
+    assert len(errors) == 1 and 'database is locked' in errors[0]
+
+    while manager.current_index < len(manager.order):
+        manager.save_transaction()
+    manager.writer.close()
+    assert sorted(saved_payees()) == sorted(manager.df['payee'])
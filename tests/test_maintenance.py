@@ -0,0 +1,100 @@
+import os
+import config
+import maintenance
+from conftest import reset_caches
+from main import FinancialApp
+from config import connect, data_path
+from accounts import create_account
+from maintenance import BACKUP_DIR, MAX_BACKUP_RESTARTS, SNAPSHOT_DIR, backup_database, run_maintenance, snapshot_all
+
+
+class InterruptedSource:
+    """Wraps the backup's source connection, writing to the database from another connection after each step."""
+
+    def __init__(self, conn, path):
+        self.conn = conn
+        self.path = path
+        self.backups = []
+
+    def backup(self, target, **kwargs):
+        self.backups.append(kwargs)
+        progress = kwargs.get('progress')
+        if progress is not None:
+            def write_then_report(status, remaining, total):
+                writer = connect(self.path)
+                try:
+                    writer.execute("INSERT INTO transactions (date, payee, amount, month, year) "
+                                   "VALUES ('2024/01/01', 'DURING BACKUP', -1.0, 1, 2024)")
+                    writer.commit()
+                finally:
+                    writer.close()
+                progress(status, remaining, total)
+            kwargs['progress'] = write_then_report
+        return self.conn.backup(target, **kwargs)
+
+    def close(self):
+        self.conn.close()
+
+
+def test_backup_falls_back_to_one_step_under_writes(ledger, monkeypatch):
+    """Each write restarts a stepped backup; after a few restarts it copies everything at once."""
+    source_path = data_path('financial_data.db')
+    sources = []
+
+    def connect_source(path, **kwargs):
+        conn = connect(path, **kwargs)
+        if path != source_path:
+            return conn
+        sources.append(InterruptedSource(conn, path))
+        return sources[-1]
+    monkeypatch.setattr(maintenance, 'connect', connect_source)
+
+    dest = data_path(BACKUP_DIR, 'financial_data.db')
+    assert backup_database(source_path, dest, pages=1, sleep=0) == os.path.getsize(dest)
+
+    # A stepped attempt, abandoned after MAX_BACKUP_RESTARTS writes, then one single-step copy
+    (source,) = sources
+    assert [call.get('pages') for call in source.backups] == [1, None]
+    conn = connect(source_path)
+    copy = connect(dest)
+    try:
+        written = conn.execute("SELECT COUNT(*) FROM transactions WHERE payee = 'DURING BACKUP'").fetchone()[0]
+        assert written >= MAX_BACKUP_RESTARTS
+        assert copy.execute('SELECT COUNT(*) FROM transactions').fetchone() == conn.execute('SELECT COUNT(*) FROM transactions').fetchone()
+    finally:
+        copy.close()
+        conn.close()
+    assert not os.path.exists(f"{dest}.tmp")
+
+
+def test_snapshots_rotate(database):
+    """Only the newest snapshots are kept, each with every ledger, and half-written ones are cleared away."""
+    create_account('Visa')
+    snapshot_dir = data_path(SNAPSHOT_DIR)
+    os.makedirs(os.path.join(snapshot_dir, '.20240101_000000_000000', 'accounts'))
+
+    created = []
+    for _ in range(5):
+        before = set(os.listdir(snapshot_dir))
+        snapshot_all(keep=3)
+        created += sorted(set(os.listdir(snapshot_dir)) - before)
+
+    snapshots = sorted(os.listdir(snapshot_dir))
+    assert snapshots == created[-3:]
+    for name in snapshots:
+        assert sorted(os.listdir(os.path.join(snapshot_dir, name))) == ['accounts', 'financial_data.db']
+        assert os.listdir(os.path.join(snapshot_dir, name, 'accounts')) == ['visa.db']
+
+
+def test_memory_mode_skips_maintenance(tmp_path):
+    """After an import the database's URI is passed in, which must not be mistaken for a file."""
+    reset_caches()
+    config.configure(':memory:')
+    try:
+        FinancialApp.create_db()
+        assert run_maintenance(config.get_db_path()) == []
+        assert run_maintenance() == []
+        assert not os.path.exists(data_path(BACKUP_DIR))
+    finally:
+        config.configure(str(tmp_path / 'financial_data.db'), 'file')
+        reset_caches()
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import SIZES, assert_within, budget, measure
+from config import connect
+from net_worth import MAX_ZOOM_POINTS, fetch_networth_data, lttb, networth_series
+
+
+def insert_snapshots(rows, seed=0):
+    """Daily snapshots of the default accounts, rows values in all, returned as a frame."""
+    conn = connect()
+    try:
+        accounts = pd.read_sql_query('SELECT id AS account_id, name, type FROM networth_accounts ORDER BY position, id', conn)
+        rng = np.random.default_rng(seed)
+        days = rows // len(accounts)
+        dates = pd.date_range('2012-01-01', periods=days).strftime('%Y-%m-%d')
+        df = pd.DataFrame({
+            'date': np.repeat(dates, len(accounts)),
+            'account_id': np.tile(accounts['account_id'], days),
+            'amount': np.round(rng.gamma(2.0, 5000.0, days * len(accounts)), 2),
+        })
+        conn.executemany('INSERT INTO networth (date, account_id, amount) VALUES (?, ?, ?)',
+                         df.itertuples(index=False, name=None))
+        conn.commit()
+    finally:
+        conn.close()
+    return df.merge(accounts, on='account_id', how='left')
+
+
+def load_chart_data():
+    """What NetWorth.get_networth_data and update_charts do before drawing."""
+    conn = connect()
+    try:
+        data = fetch_networth_data(conn)
+    finally:
+        conn.close()
+    dates, net_worth = networth_series(data['total_by_entry'])
+    return data, dates, net_worth
+
+
+def test_no_snapshots(database):
+    conn = connect()
+    try:
+        assert fetch_networth_data(conn) is None
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize('rows', SIZES)
+def test_networth_history(database, rows):
+    """Latest values and the history match the snapshots, with one grouped query however long the history."""
+    df = insert_snapshots(rows)
+
+    (data, dates, net_worth), seconds, peak = measure(load_chart_data)
+
+    latest = df[df['date'] == df['date'].max()]
+    assert [total for _, total in data['assets']] == pytest.approx(latest.loc[latest['type'] == 'asset', 'amount'].tolist())
+    assert [name for name, _ in data['liabilities']] == latest.loc[latest['type'] == 'liability', 'name'].tolist()
+
+    signed = df['amount'].where(df['type'] == 'asset', -df['amount'])
+    expected = signed.groupby(df['date']).sum()
+    assert len(dates) == len(expected)
+    assert net_worth == pytest.approx(expected.to_numpy())
+    assert_within(seconds, peak, budget(rows, 0.05, 4e-6), budget(rows, 2e6, 300))
+
+
+@pytest.mark.parametrize('points', [10, MAX_ZOOM_POINTS, 50_000])
+def test_lttb_downsampling(points):
+    """The zoom chart keeps the ends and at most MAX_ZOOM_POINTS points, whatever the history length."""
+    rng = np.random.default_rng(points)
+    x = np.arange(points, dtype=float)
+    y = np.cumsum(rng.normal(0, 1, points))
+
+    keep, seconds, peak = measure(lttb, x, y, MAX_ZOOM_POINTS)
+
+    assert len(keep) == min(points, MAX_ZOOM_POINTS)
+    assert keep[0] == 0 and keep[-1] == points - 1
+    assert np.all(np.diff(keep) > 0)
+    if points > MAX_ZOOM_POINTS:
+        # The extremes make the largest triangles, so the shape's peak and trough survive
+        assert np.argmax(y) in keep and np.argmin(y) in keep
+    # A loop over the buckets, not the points: the cost is set by the threshold
+    assert_within(seconds, peak, 0.1, budget(points, 1e6, 40))
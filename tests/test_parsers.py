@@ -0,0 +1,86 @@
+import pytest
+import parsers
+from parsers import HeaderCsvParser, sniff_format
+from batch_import import read_statement
+
+PLUGIN = '''
+from parsers import HeaderCsvParser, register_parser
+
+
+@register_parser
+class CardCsvParser(HeaderCsvParser):
+    """Same layout as header_csv, but payees are tagged so the test can tell who parsed the file."""
+    name = 'card_csv'
+
+    def records(self, file_path):
+        for date, payee, amount in super().records(file_path):
+            yield date, f"CARD {payee}", amount
+'''
+
+
+@pytest.fixture
+def plugin_dir(tmp_path, monkeypatch):
+    """An empty parser_plugins folder under a temporary app folder, with the registry restored afterwards."""
+    path = tmp_path / 'parser_plugins'
+    path.mkdir()
+    monkeypatch.setattr(parsers, 'PLUGIN_DIR', str(path))
+    monkeypatch.setattr(parsers, 'PARSERS', list(parsers.PARSERS))
+    monkeypatch.setattr(parsers, '_plugins_loaded', False)
+    return path
+
+
+@pytest.fixture
+def statement(tmp_path):
+    path = tmp_path / 'statement.csv'
+    path.write_text('Date,Description,Amount\n2024-01-15,Supermarket,-42.50\n2024-01-16,Salary,1000.00\n')
+    return str(path)
+
+
+def test_plugins_are_discovered(plugin_dir):
+    """Every public .py file in the folder is imported once, and its parsers go ahead of the built in ones."""
+    built_in = list(parsers.PARSERS)
+    (plugin_dir / 'card.py').write_text(PLUGIN)
+    (plugin_dir / '_helpers.py').write_text('raise RuntimeError("private modules are not plugins")\n')
+    (plugin_dir / 'notes.txt').write_text('not a plugin\n')
+
+    parsers.load_plugins()
+    assert [cls.name for cls in parsers.PARSERS] == ['card_csv'] + [cls.name for cls in built_in]
+
+    # Plugins load once per process, however often statements are sniffed
+    (plugin_dir / 'later.py').write_text(PLUGIN.replace("'card_csv'", "'later_csv'"))
+    parsers.load_plugins()
+    assert len(parsers.PARSERS) == len(built_in) + 1
+
+
+def test_plugin_takes_precedence_when_sniffing(plugin_dir, statement):
+    """A plugin matching the same layout as a built in parser wins, and its records are what get imported."""
+    assert type(sniff_format(statement)) is HeaderCsvParser
+    parsers._plugins_loaded = False
+    (plugin_dir / 'card.py').write_text(PLUGIN)
+
+    parser = sniff_format(statement)
+    assert parser.name == 'card_csv' and isinstance(parser, HeaderCsvParser)
+    df = read_statement(statement)
+    assert df['payee'].tolist() == ['CARD Supermarket', 'CARD Salary']
+    assert df['date'].tolist() == ['2024/01/15', '2024/01/16']
+
+
+def test_short_rows_are_skipped_with_a_warning(tmp_path):
+    """Rows missing the columns a parser reads are counted and skipped rather than failing the import."""
+    path = tmp_path / 'statement.csv'
+    path.write_text('Date,Description,Amount\n2024-01-15,Supermarket,-42.50\n2024-01-16,Truncated\n\n'
+                    '2024-01-17\n2024-01-18,Salary,1000.00\n')
+
+    with pytest.warns(UserWarning, match='skipped 2 row'):
+        df = read_statement(str(path))
+    assert df['payee'].tolist() == ['Supermarket', 'Salary']
+
+
+def test_qif_dates(tmp_path):
+    """Years after an apostrophe are from 2000 on, two-digit years after a slash are 1900s."""
+    path = tmp_path / 'statement.qif'
+    records = [("1/15'24", 'Supermarket'), (" 2/ 3'05", 'Pharmacy'), ('12/31/99', 'Party'), ('03/01/2023', 'Rent')]
+    path.write_text('!Type:Bank\n' + ''.join(f'D{date}\nT-10.00\nP{payee}\n^\n' for date, payee in records))
+
+    df = read_statement(str(path))
+    assert df['date'].tolist() == ['2024/01/15', '2005/02/03', '1999/12/31', '2023/03/01']
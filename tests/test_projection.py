@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from conftest import assert_within, measure
+from categories import get_categories
+from projection import (DEFAULT_PATHS, DEFAULT_YEARS, PERCENTILES, TRANSFER_TYPES, cash_flow_history,
+                        project_networth, simulate_networth)
+
+SNAPSHOT = ([('Savings', 50_000.0), ('Shares', 20_000.0)], [('Mortgage', 30_000.0)])
+
+
+def test_deterministic_growth():
+    """With no volatility or cash flow, assets compound at the real return and debt is deflated."""
+    values = simulate_networth(1000.0, 500.0, [0.0], 120, 3, 0.06, 0.0, 0.02)
+    assert values[:, 0] == pytest.approx(500.0)
+    assert values[:, -1] == pytest.approx(1000 * (1.06 / 1.02) ** 10 - 500 / 1.02 ** 10)
+
+    nominal = simulate_networth(1000.0, 500.0, [0.0], 120, 3, 0.06, 0.0, 0.02, real=False)
+    assert nominal[:, -1] == pytest.approx(1000 * 1.06 ** 10 - 500)
+
+
+def test_cash_flow_is_added_monthly():
+    values = simulate_networth(0.0, 0.0, [100.0], 24, 2, 0.0, 0.0, 0.0)
+    assert values[0] == pytest.approx(np.arange(25) * 100.0)
+
+
+def test_cash_flow_history_leaves_out_transfers(ledger):
+    """Money moved into asset categories stays in net worth, so only other categories count as cash flow."""
+    transfer_ids = [category.id for category in get_categories() if category.type in TRANSFER_TYPES]
+    history = cash_flow_history(end_period=2024 * 12 + 11)
+
+    assert list(history.columns) == list(range(2023 * 12, 2025 * 12))
+    assert not set(history.index) & set(transfer_ids)
+    flows = ledger[~ledger['category_id'].isin(transfer_ids)]
+    assert history.to_numpy().sum() == pytest.approx(flows['amount'].sum())
+
+
+def test_projection_budget(ledger):
+    """Ten thousand paths over thirty years run in under a second on one core."""
+    projection, seconds, peak = measure(project_networth, *SNAPSHOT, paths=DEFAULT_PATHS, years=DEFAULT_YEARS,
+                                        seed=1, max_workers=1)
+
+    assert len(projection) == DEFAULT_YEARS * 12 + 1
+    assert projection.iloc[0].to_numpy() == pytest.approx(40_000.0)
+    bands = projection[list(PERCENTILES)].to_numpy()
+    assert np.all(np.diff(bands, axis=1) >= 0)
+    # Three paths x months float64 arrays are alive at the peak, plus the chunk summary
+    assert_within(seconds, peak, 1.0, 4 * DEFAULT_PATHS * DEFAULT_YEARS * 12 * 8)
+
+
+def test_projection_is_reproducible_across_chunks(ledger):
+    """A seed fixes the result, whether the chunks run in one process or several."""
+    first = project_networth(*SNAPSHOT, paths=25_000, years=2, seed=3, max_workers=1)
+    second = project_networth(*SNAPSHOT, paths=25_000, years=2, seed=3, max_workers=2)
+    assert first.to_numpy() == pytest.approx(second.to_numpy())
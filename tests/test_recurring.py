@@ -0,0 +1,91 @@
+import pandas as pd
+import pytest
+from conftest import SIZES, assert_within, budget, insert_transactions, measure
+from config import connect
+from archive import TransactionArchive
+from recurring import detect_subscriptions, load_payments, refresh_subscriptions, update_subscriptions
+
+
+def charges(payees, start, days, amounts):
+    """Rows charged on the given days after start, cycling through payees and amounts."""
+    dates = pd.Timestamp(start) + pd.to_timedelta(days, unit='D')
+    count = len(days)
+    return pd.DataFrame({
+        'payee': [payees[i % len(payees)] for i in range(count)] if isinstance(payees, list) else payees,
+        'date': dates.strftime('%Y/%m/%d'),
+        'amount': [amounts[i % len(amounts)] for i in range(count)] if isinstance(amounts, list) else amounts,
+    })
+
+
+def test_detect_subscriptions():
+    df = pd.concat([
+        # Reference numbers vary between charges but the payee key is the same
+        charges(['NETFLIX.COM 1234', 'NETFLIX.COM 9876'], '2024-01-03', [0, 31, 60, 91, 121, 152], -15.99),
+        charges('CITY GYM', '2024-01-01', [0, 7, 14, 22, 28, 35], -12.0),
+        charges('EMPLOYER LTD', '2024-01-15', [0, 31, 60, 91], 3300.0),
+        charges('SPOTIFY', '2024-01-05', [0, 31], -9.99),
+        charges('HARDWARE STORE', '2024-01-02', [0, 3, 40, 45, 100], -30.0),
+        charges('POWER CO', '2024-01-20', [0, 30, 61, 91], [-50.0, -200.0, -20.0, -120.0]),
+    ], ignore_index=True)
+
+    found = detect_subscriptions(df).set_index('payee_key')
+
+    assert sorted(found.index) == ['CITY GYM', 'NETFLIX COM']
+    netflix = found.loc['NETFLIX COM']
+    assert (netflix['cadence'], netflix['occurrences'], netflix['amount']) == ('monthly', 6, -15.99)
+    assert netflix['last_date'] == '2024/06/03'
+    # The median gap is 31 days, so the next charge is expected 31 days after the last
+    assert netflix['next_date'] == '2024/07/04'
+    assert netflix['annual_cost'] == pytest.approx(15.99 * 365.25 / 31)
+    assert found.loc['CITY GYM', 'cadence'] == 'weekly'
+    assert detect_subscriptions(df.iloc[:0]).empty
+
+
+def ledger_rows(df, category_id):
+    when = pd.to_datetime(df['date'], format='%Y/%m/%d')
+    return df.assign(category_id=category_id, month=when.dt.month, year=when.dt.year)
+
+
+def test_update_matches_full_refresh(database):
+    """Re-checking one payee reads only its rows, archived years included, and agrees with a full rebuild."""
+    netflix = charges(['NETFLIX.COM 1234', 'NETFLIX.COM 9876'], '2023-09-03', range(0, 300, 30), -15.99)
+    insert_transactions(ledger_rows(pd.concat([
+        netflix,
+        charges('CITY GYM', '2023-11-01', range(0, 140, 7), -12.0),
+        charges('HARDWARE STORE', '2023-10-02', [0, 3, 40, 45, 100], -30.0),
+    ], ignore_index=True), 1))
+    TransactionArchive().archive_year(2023)
+
+    full = refresh_subscriptions().set_index('payee_key')
+    conn = connect()
+    try:
+        assert len(load_payments(conn, {'NETFLIX COM'})) == len(netflix)
+        conn.execute('DELETE FROM subscriptions')
+        conn.commit()
+    finally:
+        conn.close()
+
+    update_subscriptions(['NETFLIX.COM 5555'])
+    conn = connect()
+    try:
+        stored = pd.read_sql_query('SELECT * FROM subscriptions', conn).set_index('payee_key')
+    finally:
+        conn.close()
+    assert list(stored.index) == ['NETFLIX COM']
+    assert stored.loc['NETFLIX COM'].to_dict() == full.loc['NETFLIX COM'].to_dict()
+
+
+@pytest.mark.parametrize('ledger', SIZES, indirect=True)
+def test_update_subscriptions_cost(ledger):
+    """Re-checking an import's payees reads only their rows, so it stays well under a second."""
+    insert_transactions(ledger_rows(charges('NETFLIX.COM 1234', '2024-01-03', range(0, 360, 30), -15.99), 1))
+    conn = connect()
+    try:
+        assert len(load_payments(conn, {'NETFLIX COM'})) == 12
+    finally:
+        conn.close()
+
+    rows = len(ledger)
+    _, seconds, peak = measure(update_subscriptions, ['NETFLIX.COM 1234'])
+    # The distinct payee scan grows with the ledger; everything after it only with the payee's rows
+    assert_within(seconds, peak, budget(rows, 0.05, 2e-6), budget(rows, 2e6, 50))
@@ -0,0 +1,213 @@
+import os
+import time
+import pandas as pd
+import pytest
+from matplotlib.colors import to_hex
+from conftest import SIZES, assert_within, budget, insert_transactions, measure
+from accounts import attach_all_accounts
+from categories import get_categories
+from config import connect
+from breakdown import COLUMNS, PIE_TYPES, build_breakdown, fetch_category_totals, fetch_comparison_totals
+import reports
+from spending_trends import fetch_trend_totals
+from transaction_store import TransactionStore, get_transaction_store, refresh_transaction_store
+
+YEAR, MONTH = 2024, 6
+
+
+def reference_totals(df, year, month):
+    selected = df[(df['year'] == year) & (df['month'] == month)]
+    return selected.groupby('category_id')['amount'].sum().to_dict()
+
+
+def assert_totals_equal(actual, expected):
+    assert set(actual) == set(expected)
+    for category_id, amount in expected.items():
+        assert actual[category_id] == pytest.approx(amount, abs=0.01)
+
+
+@pytest.mark.parametrize('ledger', SIZES, indirect=True)
+def test_store_load(ledger):
+    """Loading the store is one scan per ledger, and each row costs a few dozen bytes."""
+    rows = len(ledger)
+    store, seconds, peak = measure(TransactionStore.load)
+
+    assert len(store) == rows
+    assert store.cents.sum() / 100 == pytest.approx(ledger['amount'].sum())
+    # Peak covers the pandas frame read from SQLite, which dwarfs the columns kept afterwards
+    assert store.nbytes <= 40 * rows
+    assert_within(seconds, peak, budget(rows, 0.2, 10e-6), budget(rows, 2e6, 1200))
+
+
+@pytest.mark.parametrize('ledger', SIZES, indirect=True)
+def test_monthly_breakdown(ledger):
+    """The totals behind MonthlyBreakdown.load_data match a groupby, in near constant time from the store."""
+    rows = len(ledger)
+    store = TransactionStore.load()
+    categories = get_categories()
+
+    def load_data():
+        totals = store.category_totals(YEAR, MONTH)
+        comparisons = store.comparison_totals(YEAR, MONTH)
+        return totals, comparisons, build_breakdown(categories, totals, comparisons=comparisons)
+
+    (totals, comparisons, (section_data, type_amounts)), seconds, peak = measure(load_data)
+
+    expected = reference_totals(ledger, YEAR, MONTH)
+    assert_totals_equal(totals, expected)
+    by_type = {}
+    for category_id, _, cat_type, _ in categories:
+        by_type[cat_type] = by_type.get(cat_type, 0) + abs(expected.get(category_id, 0))
+    for section in PIE_TYPES:
+        assert type_amounts[section] == pytest.approx(by_type.get(section, 0), abs=0.01)
+    assert sum(len(entries) for entries in section_data.values()) == len(categories)
+
+    last_year = reference_totals(ledger, YEAR - 1, MONTH)
+    for category_id, amount in last_year.items():
+        assert comparisons[category_id][0] == pytest.approx(amount, abs=0.01)
+
+    # Selecting a month is a pass over the columns; 100ns a row leaves room for the mask and bincount
+    assert_within(seconds, peak, budget(rows, 0.01, 100e-9), budget(rows, 1e6, 40))
+
+
+@pytest.mark.parametrize('ledger', SIZES, indirect=True)
+def test_breakdown_sql_matches_store(ledger):
+    """The SQL fallback queries agree with the store and stay on the covering indexes."""
+    rows = len(ledger)
+    store = TransactionStore.load()
+    conn = connect()
+    try:
+        attach_all_accounts(conn)
+        totals, seconds, peak = measure(fetch_category_totals, conn, YEAR, MONTH)
+        comparisons = fetch_comparison_totals(conn, YEAR, MONTH)
+    finally:
+        conn.close()
+
+    assert_totals_equal(totals, store.category_totals(YEAR, MONTH))
+    for category_id, expected in store.comparison_totals(YEAR, MONTH).items():
+        assert comparisons.get(category_id, (0, 0, 0)) == pytest.approx(expected, abs=0.01)
+    # One month is a range scan of the period index, so this barely grows with the ledger
+    assert_within(seconds, peak, budget(rows, 0.02, 200e-9), 2e6)
+
+
+def test_generate_reports(ledger, tmp_path, monkeypatch):
+    """A small report run draws every column, highlights anomalies and compares like the page does."""
+    category_id = int(ledger['category_id'].iloc[0])
+    # A month far above the category's usual total
+    insert_transactions(pd.DataFrame({
+        'date': [f'{YEAR}/{MONTH:02d}/15'], 'payee': ['OUTLIER'], 'amount': [-100_000.0],
+        'category_id': [category_id], 'month': [MONTH], 'year': [YEAR],
+    }))
+    jobs = []
+    render = reports.render_month_report
+    monkeypatch.setattr(reports, 'render_month_report', lambda job: jobs.append(job) or render(job))
+
+    started = time.perf_counter()
+    paths = reports.generate_reports((YEAR, MONTH - 1), (YEAR, MONTH), tmp_path / 'out', max_workers=1)
+    seconds = time.perf_counter() - started
+
+    assert [os.path.basename(path) for path in paths] == [f'breakdown_{YEAR}_{m:02d}.png' for m in (MONTH - 1, MONTH)]
+    assert all(os.path.getsize(path) > 0 for path in paths)
+
+    year, month, section_data, type_amounts, _ = jobs[-1]
+    entries = {entry['category']: entry for entries in section_data.values() for entry in entries}
+    name = next(category.name for category in get_categories() if category.id == category_id)
+    assert entries[name]['anomaly']
+    store = TransactionStore.load()
+    for category in get_categories():
+        last_year, average_3, average_12 = store.comparison_totals(YEAR, MONTH).get(category.id, (0, 0, 0))
+        entry = entries[category.name]
+        assert (entry['last_year'], entry['average_3'], entry['average_12']) == pytest.approx(
+            (abs(last_year), abs(average_3), abs(average_12)), abs=0.01)
+
+    fig = reports.report_figure(year, month, section_data, type_amounts)
+    table_ax = fig.axes[0]
+    texts = [text.get_text() for text in table_ax.texts]
+    assert texts[:len(COLUMNS)] == [heading for _, heading in COLUMNS]
+    assert f"${entries[name]['average_12']:,.2f}" in texts
+    colours = [to_hex(patch.get_facecolor()) for patch in table_ax.patches]
+    assert reports.ROW_COLOURS['anomaly'] in colours
+    # Drawing dominates, at about half a second a month with the Agg renderer
+    assert seconds <= budget(len(paths), 1.0, 1.0), f"took {seconds:.3f}s"
+
+
+@pytest.mark.parametrize('ledger', SIZES, indirect=True)
+def test_spending_trends(ledger):
+    """SpendingTrends.update_chart's monthly totals match a groupby, from the store and from SQL."""
+    rows = len(ledger)
+    store = TransactionStore.load()
+    category_ids = [category.id for category in get_categories()][:4]
+
+    df, seconds, peak = measure(store.monthly_totals, YEAR, category_ids)
+
+    selected = ledger[(ledger['year'] == YEAR) & ledger['category_id'].isin(category_ids)]
+    expected = selected.groupby(['month', 'category_id'], as_index=False)['amount'].sum()
+    assert df[['month', 'category_id']].values.tolist() == expected[['month', 'category_id']].values.tolist()
+    assert df['amount'].to_numpy() == pytest.approx(expected['amount'].to_numpy(), abs=0.01)
+
+    conn = connect()
+    try:
+        attach_all_accounts(conn)
+        from_sql = fetch_trend_totals(conn, YEAR, category_ids)
+    finally:
+        conn.close()
+    assert from_sql['amount'].to_numpy() == pytest.approx(expected['amount'].to_numpy(), abs=0.01)
+    assert_within(seconds, peak, budget(rows, 0.01, 100e-9), budget(rows, 1e6, 40))
+
+
+def test_store_reloads_after_changes_made_elsewhere(ledger):
+    """Writes the event bus never hears about, like the command line tools', reload the store on next use."""
+    groceries, food = get_categories().id_for('Groceries'), get_categories().id_for('Food')
+    store = get_transaction_store()
+    before = store.category_totals(YEAR, MONTH)
+
+    # Writes to other tables keep the loaded store
+    conn = connect()
+    try:
+        conn.execute("INSERT INTO networth (date, account_id, amount) VALUES ('2024-06-30', 1, 100.0)")
+        conn.commit()
+        assert get_transaction_store() is store
+
+        # As python category_tools.py merge would, from another process
+        conn.execute('UPDATE transactions SET category_id = ? WHERE category_id = ?', (food, groceries))
+        conn.commit()
+        merged = get_transaction_store().category_totals(YEAR, MONTH)
+        assert groceries not in merged
+        assert merged[food] == pytest.approx(before[food] + before[groceries], abs=0.02)
+
+        # As python fx.py load would: a rate for rows held in another currency
+        conn.execute("UPDATE transactions SET currency = 'USD' WHERE category_id = ?", (food,))
+        conn.execute("INSERT INTO fx_rates (currency, date, rate) VALUES ('USD', '2020/01/01', 1.0)")
+        conn.commit()
+        assert get_transaction_store().category_totals(YEAR, MONTH)[food] == pytest.approx(merged[food])
+        conn.execute("UPDATE fx_rates SET rate = 1.5 WHERE currency = 'USD'")
+        conn.commit()
+    finally:
+        conn.close()
+    assert get_transaction_store().category_totals(YEAR, MONTH)[food] == pytest.approx(1.5 * merged[food], abs=0.02)
+
+
+def test_store_reloads_when_loaded_rows_changed_before_an_import(ledger):
+    """A merge made elsewhere isn't marked current by the next import's refresh."""
+    groceries, food = get_categories().id_for('Groceries'), get_categories().id_for('Food')
+    store = get_transaction_store()
+    before = store.category_totals(YEAR, MONTH)
+
+    conn = connect()
+    try:
+        # As python category_tools.py merge would, from another process
+        conn.execute('UPDATE transactions SET category_id = ? WHERE category_id = ?', (food, groceries))
+        conn.commit()
+    finally:
+        conn.close()
+
+    # Then a one-row import in this process, which refreshes the store as it is saved
+    insert_transactions(pd.DataFrame([{
+        'date': f'{YEAR}/{MONTH:02d}/15', 'payee': 'NEW PAYEE', 'amount': -10.0,
+        'category_id': food, 'month': MONTH, 'year': YEAR,
+    }]))
+    refresh_transaction_store()
+
+    totals = get_transaction_store().category_totals(YEAR, MONTH)
+    assert groceries not in totals
+    assert totals[food] == pytest.approx(before[food] + before[groceries] - 10.0, abs=0.02)
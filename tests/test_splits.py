@@ -0,0 +1,55 @@
+import pandas as pd
+import pytest
+from config import connect
+from accounts import attach_account
+from splits import SPLIT_TOLERANCE, check_all_splits, split_errors, unbalanced_splits
+
+
+def test_split_errors():
+    amounts = pd.Series({'ok': -100.0, 'rounded': -10.0, 'short': -50.0, 'single': -20.0, 'uncategorized': -30.0,
+                         'missing': -40.0})
+    splits = pd.DataFrame([
+        ('ok', 1, -60.0), ('ok', 2, -40.0),
+        ('rounded', 1, -3.33), ('rounded', 2, -6.67 + SPLIT_TOLERANCE / 2),
+        ('short', 1, -20.0), ('short', 2, -20.0),
+        ('single', 1, -20.0),
+        ('uncategorized', 1, -15.0), ('uncategorized', None, -15.0),
+    ], columns=['key', 'category_id', 'amount'])
+
+    errors = split_errors(amounts, splits)
+
+    assert set(errors) == {'short', 'single', 'uncategorized', 'missing'}
+    assert errors['short'] == "Splits total -40.00 but the amount is -50.00"
+    assert errors['single'] == errors['missing'] == "A split needs at least two lines"
+    assert errors['uncategorized'] == "Every split needs a category"
+
+
+def insert_split(conn, schema, amount, lines):
+    cursor = conn.execute(f"INSERT INTO {schema}.transactions (date, payee, amount, month, year) "
+                          f"VALUES ('2024/01/15', 'SHOP', ?, 1, 2024)", (amount,))
+    conn.executemany(f'INSERT INTO {schema}.transaction_splits (transaction_id, category_id, amount) VALUES (?, ?, ?)',
+                     [(cursor.lastrowid, category_id, line) for category_id, line in lines])
+    return cursor.lastrowid
+
+
+def test_unbalanced_splits(database):
+    conn = connect()
+    try:
+        schema = attach_account(conn, 'Visa')
+        insert_split(conn, 'main', -100.0, [(1, -60.0), (2, -40.0)])
+        bad = insert_split(conn, 'main', -100.0, [(1, -60.0), (2, -30.0)])
+        recent = insert_split(conn, 'main', -50.0, [(1, -10.0), (2, -10.0)])
+        card = insert_split(conn, schema, -25.0, [(1, -5.0), (2, -5.0)])
+        conn.commit()
+
+        assert unbalanced_splits(conn) == [(bad, -100.0, -90.0), (recent, -50.0, -20.0)]
+        # Only transactions after a known id are checked, as the writer does for each batch
+        assert unbalanced_splits(conn, after_id=bad) == [(recent, -50.0, -20.0)]
+        assert unbalanced_splits(conn, schema) == [(card, -25.0, -10.0)]
+    finally:
+        conn.close()
+
+    problems = check_all_splits()
+    assert set(problems) == {'main', 'visa'}
+    assert [row[0] for row in problems['main']] == [bad, recent]
+    assert problems['visa'] == [(card, -25.0, pytest.approx(-10.0))]
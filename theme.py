@@ -24,6 +24,11 @@ class ThemeManager:
         'small': ('Helvetica', 10)
     }
     
+    @classmethod
+    def current_theme(cls):
+        """The colors and fonts in use, as a value cached charts can be keyed on."""
+        return tuple(sorted(cls.COLORS.items())), tuple(sorted(cls.FONTS.items()))
+
     @classmethod
     def apply_theme(cls, root):
         # Configure root window
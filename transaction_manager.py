@@ -1,110 +1,442 @@
 import tkinter as tk
-from tkinter import filedialog, messagebox, ttk
+from tkinter import filedialog, messagebox, simpledialog, ttk
 import pandas as pd
-import sqlite3
-from datetime import datetime
+import atexit
+from accounts import MAIN_ACCOUNT, attach_account, attach_all_accounts, account_slug, check_account_limit
+from batch_import import parse_statements, read_statement
+from categories import get_categories
+from recurring import update_subscriptions
+from anomalies import update_category_stats
+from fx import account_currency
+from maintenance import schedule_maintenance
+from splits import split_errors, unbalanced_splits
+from events import TRANSACTIONS, DataChange, publish
+from config import connect, get_db_path
+
+# How many upcoming rows to look up suggested categories for at a time
+PREFETCH_ROWS = 25
+
+
+def suggest_categories(db_path, payees):
+    """Return the most used category for each payee seen before, in one query."""
+    payees = list(payees)
+    if not payees:
+        return {}
+    conn = connect(db_path)
+    try:
+        attach_all_accounts(conn)
+        placeholders = ', '.join('?' * len(payees))
+        rows = conn.execute(f'''
+            SELECT payee, category_id, COUNT(*) AS uses
+            FROM all_transactions
+            WHERE payee IN ({placeholders})
+              AND category_id IS NOT NULL
+            GROUP BY payee, category_id
+            ORDER BY uses
+        ''', payees).fetchall()
+    finally:
+        conn.close()
+    # Ordered by use count, so the most used category for a payee wins
+    categories = get_categories(db_path)
+    return {payee: categories.name(category_id) for payee, category_id, _ in rows}
+
+
+class BatchNotSaved(ValueError):
+    """Raised when a batch couldn't be written; keys are its rows, as passed to TransactionWriter.add()."""
+
+    def __init__(self, message, keys):
+        super().__init__(message)
+        self.keys = keys
+
+
+class TransactionWriter:
+    """Buffer reviewed transactions and write them to the ledger in bulk.
+
+    Pending rows are also flushed when the process exits, so closing the main
+    window or Ctrl-C mid-review doesn't lose them. Call close() once done.
+    """
+
+    def __init__(self, db_path, account=None, batch_size=50):
+        self.db_path = db_path
+        self.account = account
+        # Statements for a foreign account are stored in that account's currency
+        self.currency = account_currency(account or MAIN_ACCOUNT, db_path)
+        self.batch_size = batch_size
+        self.pending = []
+        # The caller's key for each pending row, to say which rows a failed batch held
+        self.pending_keys = []
+        # (position in pending, category_id, amount) for each line of a split transaction
+        self.pending_splits = []
+        atexit.register(self.flush)
+
+    def add(self, date, payee, amount, category_id, month, year, splits=None, key=None):
+        """Queue a transaction, spread over (category_id, amount) splits if given.
+
+        Splits that don't add up raise ValueError and nothing is queued. Once
+        the row is queued, a full batch is written, and BatchNotSaved means
+        that write failed, taking this row and those queued before it with it.
+        """
+        if splits:
+            errors = split_errors(
+                pd.Series({payee: amount}),
+                pd.DataFrame(splits, columns=['category_id', 'amount']).assign(key=payee)
+            )
+            if errors:
+                raise ValueError(f"{payee}: {errors[payee]}")
+            # The parent's category stays empty; reports take categories from the splits
+            category_id = None
+            self.pending_splits.extend((len(self.pending), split_category, split_amount)
+                                       for split_category, split_amount in splits)
+        self.pending.append((date, payee, amount, category_id, month, year, self.currency))
+        self.pending_keys.append(key)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write all pending rows and their splits in a single transaction.
+
+        The stored splits are checked again before committing. The batch is
+        taken off the queue first, so if writing fails it is rolled back and
+        dropped rather than failing again on every later add() and at exit.
+        """
+        if not self.pending:
+            return
+        pending, pending_keys, pending_splits = self.pending, self.pending_keys, self.pending_splits
+        self.pending = []
+        self.pending_keys = []
+        self.pending_splits = []
+
+        try:
+            self._write(pending, pending_splits)
+        except Exception as e:
+            raise BatchNotSaved(f"{len(pending)} transaction(s) were not saved: {e}", pending_keys) from e
+
+        # Tell open pages which months, categories and account the batch touched
+        categories = {row[3] for row in pending if row[3] is not None}
+        categories.update(category_id for _, category_id, _ in pending_splits)
+        publish(TRANSACTIONS, DataChange(
+            periods={(row[5], row[4]) for row in pending},
+            categories=categories,
+            accounts={self.account or MAIN_ACCOUNT}
+        ))
+
+    def _write(self, pending, pending_splits):
+        conn = connect(self.db_path)
+        try:
+            # Each account's transactions live in their own attached ledger file
+            schema = 'main'
+            if self.account and self.account != MAIN_ACCOUNT:
+                schema = attach_account(conn, self.account)
+
+            conn.executemany(f'''
+                INSERT INTO {schema}.transactions (date, payee, amount, category_id, month, year, currency)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', pending)
+
+            if pending_splits:
+                # The write lock is held until commit, so the newest ids are this batch's, in order
+                ids = [row[0] for row in conn.execute(
+                    f'SELECT id FROM {schema}.transactions ORDER BY id DESC LIMIT ?', (len(pending),)
+                )][::-1]
+                conn.executemany(
+                    f'INSERT INTO {schema}.transaction_splits (transaction_id, category_id, amount) VALUES (?, ?, ?)',
+                    [(ids[key], category_id, amount) for key, category_id, amount in pending_splits]
+                )
+                if unbalanced_splits(conn, schema, ids[0] - 1):
+                    raise ValueError("Split amounts no longer match their transactions; nothing was saved")
+
+            # The cached outlier stats take in the new amounts in the same transaction
+            amounts = [(row[3], row[2]) for row in pending]
+            amounts += [(category_id, amount) for _, category_id, amount in pending_splits]
+            update_category_stats(conn, amounts)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def close(self):
+        """Write what's pending; there's nothing left to save at exit."""
+        self.flush()
+        atexit.unregister(self.flush)
+
 
 class TransactionManager:
-    def __init__(self, parent):
+    def __init__(self, parent, account=None):
         self.parent = parent
-        self.db_path = 'financial_data.db'
+        self.db_path = get_db_path()
+        self.account = account
         self.current_index = 0
         self.df = None
+        self.writer = None
+        self.popup = None
+        self.suggestions = {}
         self.show_file_dialog()
 
     def show_file_dialog(self):
-        """Open file dialog to select a CSV file."""
-        file_path = filedialog.askopenfilename(
-            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
+        """Open file dialog to select one or more statement files."""
+        file_paths = filedialog.askopenfilenames(
+            filetypes=[("Statements", "*.csv *.ofx *.qfx *.qif"), ("All files", "*.*")]
         )
 
-        if file_path:
+        if file_paths:
+            if self.account is None:
+                self.account = self.ask_account()
+                if self.account is None:
+                    return
             try:
-                self.df = self.process_csv(file_path)
+                # Several statements are parsed in parallel and reviewed as one batch
+                if len(file_paths) == 1:
+                    self.df = self.process_csv(file_paths[0])
+                else:
+                    self.df = parse_statements(file_paths)
+                self.writer = TransactionWriter(self.db_path, self.account)
                 self.show_transaction_popup()
             except Exception as e:
-                messagebox.showerror("Error", f"Error loading CSV file: {str(e)}")
+                messagebox.showerror("Error", f"Error loading statement: {str(e)}")
+
+    def ask_account(self):
+        """Ask which account the statement belongs to."""
+        name = simpledialog.askstring(
+            "Account",
+            "Account for this statement (leave as main for the shared ledger):",
+            initialvalue=MAIN_ACCOUNT,
+            parent=self.parent
+        )
+        if name is None:
+            return None
+        try:
+            if not name.strip():
+                return MAIN_ACCOUNT
+            check_account_limit(name)
+            return account_slug(name)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return None
 
     def process_csv(self, file_path):
         """Read and process the CSV file."""
-        df = pd.read_csv(file_path, skiprows=5)
-        df = df.iloc[:, [0, 4, 6]]
-        df.columns = ['date', 'payee', 'amount']
-        return df
+        return read_statement(file_path)
 
     def show_transaction_popup(self):
-        """Show a pop-up window to categorize transactions one by one."""
-        if self.current_index >= len(self.df):
-            messagebox.showinfo("Finished", "All transactions have been processed.")
-            return
+        """Show the review window, building it once and reusing it for every transaction."""
+        if self.popup is None:
+            self.categories = self.load_categories()
+            self.order = list(range(len(self.df)))
+            self.build_review_window()
+        self.show_current_row()
 
-        row = self.df.iloc[self.current_index]
+    def build_review_window(self):
+        """Create the review widgets once; rows are swapped into them in place."""
         self.popup = tk.Toplevel(self.parent)
         self.popup.title("Review Transaction")
-        self.popup.geometry("400x300")
+        self.popup.geometry("480x380")
+        self.popup.protocol("WM_DELETE_WINDOW", self.close_popup)
+
+        self.progress_var = tk.StringVar()
+        self.date_var = tk.StringVar()
+        self.payee_var = tk.StringVar()
+        self.amount_var = tk.StringVar()
+        self.category_var = tk.StringVar()
 
-        tk.Label(self.popup, text=f"Date: {row['date']}").pack(pady=5)
-        tk.Label(self.popup, text=f"Payee: {row['payee']}").pack(pady=5)
+        tk.Label(self.popup, textvariable=self.progress_var, fg="gray").pack(pady=(5, 0))
+        tk.Label(self.popup, textvariable=self.date_var).pack(pady=5)
+        tk.Label(self.popup, textvariable=self.payee_var).pack(pady=5)
 
-        self.amount_var = tk.StringVar(value=f"{row['amount']:.2f}")
         tk.Label(self.popup, text="Amount:").pack()
         self.amount_entry = tk.Entry(self.popup, textvariable=self.amount_var)
         self.amount_entry.pack(pady=5)
 
         tk.Label(self.popup, text="Category:").pack()
-        self.category_var = tk.StringVar()
-        self.categories = self.load_categories()
         self.category_dropdown = ttk.Combobox(self.popup, textvariable=self.category_var, values=self.categories)
         self.category_dropdown.pack(pady=5)
-        self.category_dropdown.set("Select Category")
 
-        tk.Button(self.popup, text="Save", command=self.save_transaction, bg="green", fg="white").pack(pady=5)
-        tk.Button(self.popup, text="Delete", command=self.delete_transaction, bg="red", fg="white").pack(pady=5)
+        buttons = tk.Frame(self.popup)
+        buttons.pack(pady=5)
+        tk.Button(buttons, text="Save (Enter)", command=self.save_transaction, bg="green", fg="white").pack(side=tk.LEFT, padx=3)
+        tk.Button(buttons, text="Split...", command=self.show_split_dialog).pack(side=tk.LEFT, padx=3)
+        tk.Button(buttons, text="Skip (Ctrl+S)", command=self.skip_transaction).pack(side=tk.LEFT, padx=3)
+        tk.Button(buttons, text="Delete (Ctrl+D)", command=self.delete_transaction, bg="red", fg="white").pack(side=tk.LEFT, padx=3)
+
+        # Alt+1..9 and Alt+0 pick the first ten categories
+        shortcuts = self.categories[:10]
+        legend = "  ".join(f"{(i + 1) % 10}:{name}" for i, name in enumerate(shortcuts))
+        tk.Label(self.popup, text=f"Alt+ {legend}", wraplength=400, fg="gray", justify=tk.LEFT).pack(pady=5)
+        for i, name in enumerate(shortcuts):
+            self.popup.bind(f"<Alt-Key-{(i + 1) % 10}>", lambda e, name=name: self.category_var.set(name))
+
+        self.popup.bind("<Return>", lambda e: self.save_transaction())
+        self.popup.bind("<Control-s>", lambda e: self.skip_transaction())
+        self.popup.bind("<Control-d>", lambda e: self.delete_transaction())
+
+    def show_current_row(self):
+        """Swap the current row's data into the review window."""
+        if self.current_index >= len(self.order):
+            try:
+                self.writer.close()
+            except BatchNotSaved as e:
+                self.requeue(e)
+                self.show_current_row()
+                return
+            self.popup.destroy()
+            self.popup = None
+            self.after_import()
+            messagebox.showinfo("Finished", "All transactions have been processed.")
+            return
+
+        row = self.df.iloc[self.order[self.current_index]]
+        self.progress_var.set(f"Transaction {self.current_index + 1} of {len(self.order)}")
+        self.date_var.set(f"Date: {row['date']}")
+        self.payee_var.set(f"Payee: {row['payee']}")
+        self.amount_var.set(f"{row['amount']:.2f}")
+
+        # Preselect the category this payee was last given, if known
+        if self.current_index not in self.suggestions:
+            self.prefetch_suggestions(self.current_index)
+        self.category_dropdown.set(self.suggestions.get(self.current_index) or "Select Category")
+        self.category_dropdown.focus_set()
+
+        # Fetch the following rows' suggestions while the user reviews this one
+        upcoming = self.current_index + PREFETCH_ROWS // 2
+        if upcoming < len(self.order) and upcoming not in self.suggestions:
+            self.parent.after_idle(self.prefetch_suggestions, upcoming)
+
+    def prefetch_suggestions(self, start):
+        """Look up suggested categories for the next block of rows in one query."""
+        positions = range(start, min(start + PREFETCH_ROWS, len(self.order)))
+        payees = {self.df.iloc[self.order[i]]['payee'] for i in positions}
+        known = suggest_categories(self.db_path, payees)
+        for i in positions:
+            self.suggestions[i] = known.get(self.df.iloc[self.order[i]]['payee'])
 
     def load_categories(self):
-        """Load categories from the database."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT name FROM categories')
-        categories = [row[0] for row in cursor.fetchall()]
-        conn.close()
-        return categories
+        """Load category names from the session's category lookup."""
+        return get_categories(self.db_path).names()
 
-    def save_transaction(self):
-        """Save the current transaction to the database."""
+    def save_transaction(self, splits=None):
+        """Save the current transaction to the database, optionally split over categories."""
         category = self.category_var.get()
-        if category == "Select Category":
+        if splits is None and category not in self.categories:
             messagebox.showwarning("Warning", "Please select a category.")
             return
 
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            row = self.df.iloc[self.current_index]
+            row = self.df.iloc[self.order[self.current_index]]
             date = row['date']
             payee = row['payee']
             amount = float(self.amount_var.get())
-            trans_date = datetime.strptime(date, '%Y/%m/%d')
-            month, year = trans_date.month, trans_date.year
+            month, year = int(row['month']), int(row['year'])
 
-            cursor.execute('''
-                INSERT INTO transactions (date, payee, amount, category, month, year)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (date, payee, amount, category, month, year))
-
-            conn.commit()
-            conn.close()
+            # Rows are buffered and committed in batches by the writer
+            category_id = get_categories(self.db_path).id_for(category)
+            try:
+                self.writer.add(date, payee, amount, category_id, month, year, splits, key=self.order[self.current_index])
+            except BatchNotSaved as e:
+                # This row was queued, so moving on can't save it twice; the lost batch comes round again
+                self.requeue(e)
 
-            self.popup.destroy()
             self.current_index += 1
-            self.show_transaction_popup()
+            self.show_current_row()
         except Exception as e:
             messagebox.showerror("Error", f"Error saving transaction: {str(e)}")
 
+    def requeue(self, error):
+        """Put the rows of a batch that failed to save back at the end of the review."""
+        self.order.extend(error.keys)
+        messagebox.showerror("Error", f"{error}\nThey have been added back to the end of the review.")
+
+    def show_split_dialog(self):
+        """Spread the current transaction over several categories before saving it."""
+        try:
+            amount = float(self.amount_var.get())
+        except ValueError:
+            messagebox.showwarning("Warning", "Please enter a valid amount before splitting.")
+            return
+
+        dialog = tk.Toplevel(self.popup)
+        dialog.title("Split Transaction")
+        dialog.transient(self.popup)
+        rows_frame = tk.Frame(dialog)
+        rows_frame.pack(padx=10, pady=5)
+        remaining_var = tk.StringVar()
+        lines = []
+
+        def entered_total():
+            total = 0
+            for _, amount_var in lines:
+                try:
+                    total += float(amount_var.get() or 0)
+                except ValueError:
+                    pass
+            return total
+
+        def add_line(category='', value=''):
+            category_var = tk.StringVar(value=category)
+            amount_var = tk.StringVar(value=value)
+            row = len(lines)
+            ttk.Combobox(rows_frame, textvariable=category_var, values=self.categories).grid(row=row, column=0, padx=3, pady=2)
+            tk.Entry(rows_frame, textvariable=amount_var, width=12).grid(row=row, column=1, padx=3, pady=2)
+            amount_var.trace_add('write', lambda *args: remaining_var.set(f"Remaining: {amount - entered_total():.2f}"))
+            lines.append((category_var, amount_var))
+            remaining_var.set(f"Remaining: {amount - entered_total():.2f}")
+
+        def save_split():
+            categories = get_categories(self.db_path)
+            try:
+                splits = [
+                    (categories.id_for(category_var.get()), float(amount_var.get()))
+                    for category_var, amount_var in lines if amount_var.get().strip()
+                ]
+            except ValueError:
+                messagebox.showwarning("Warning", "Split amounts must be numbers.", parent=dialog)
+                return
+            errors = split_errors(
+                pd.Series({'': amount}),
+                pd.DataFrame(splits, columns=['category_id', 'amount']).assign(key='')
+            )
+            if errors:
+                messagebox.showwarning("Warning", errors[''], parent=dialog)
+                return
+            dialog.destroy()
+            self.save_transaction(splits)
+
+        # Start from the selected category holding the whole amount, plus an empty line
+        selected = self.category_var.get()
+        add_line(selected if selected in self.categories else '', f"{amount:.2f}")
+        add_line()
+
+        tk.Label(dialog, textvariable=remaining_var, fg="gray").pack()
+        buttons = tk.Frame(dialog)
+        buttons.pack(pady=5)
+        tk.Button(buttons, text="Add Line", command=add_line).pack(side=tk.LEFT, padx=3)
+        tk.Button(buttons, text="Save Split", command=save_split, bg="green", fg="white").pack(side=tk.LEFT, padx=3)
+        dialog.bind("<Return>", lambda e: save_split())
+
+    def skip_transaction(self):
+        """Move the current transaction to the end of the queue to review later."""
+        self.order.append(self.order[self.current_index])
+        self.suggestions[len(self.order) - 1] = self.suggestions.get(self.current_index)
+        self.current_index += 1
+        self.show_current_row()
+
     def delete_transaction(self):
-        """Delete the current transaction and move to the next one."""
-        self.df.drop(self.df.index[self.current_index], inplace=True)
-        self.df.reset_index(drop=True, inplace=True)
+        """Drop the current transaction from the import and move to the next one."""
+        self.current_index += 1
+        self.show_current_row()
+
+    def after_import(self):
+        """Refresh data derived from the ledger for the payees in this import."""
+        try:
+            update_subscriptions(self.df['payee'], self.db_path)
+        except Exception as e:
+            messagebox.showerror("Error", f"Error updating derived data: {str(e)}")
+        # Back up and tidy the database in the background now the new rows are in
+        schedule_maintenance(self.parent, self.db_path)
+
+    def close_popup(self):
+        """Save anything already reviewed when the review window is closed early."""
+        try:
+            self.writer.close()
+        except Exception as e:
+            messagebox.showerror("Error", f"Error saving transactions: {str(e)}")
         self.popup.destroy()
-        self.show_transaction_popup()
+        self.popup = None
+        self.after_import()
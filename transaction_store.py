@@ -0,0 +1,298 @@
+import os
+import time
+import hashlib
+import numpy as np
+import pandas as pd
+from accounts import (ACCOUNTS_DIR, ALL_ACCOUNTS, MAIN_ACCOUNT, SPLIT_COLUMNS, TRANSACTION_COLUMNS, attach_all_accounts,
+                      list_accounts, account_schema)
+from archive import ARCHIVE_DIR, TransactionArchive, archive_file_year
+from fx import fx_version, get_fx_rates
+from config import connect, data_path, get_db_path
+from events import TRANSACTIONS, subscribe
+
+# Category code for transactions without a category
+NO_CATEGORY = -1
+EPOCH = np.datetime64('1970-01-01', 'D')
+
+# One store per database, loaded on first use and kept for the session
+_stores = {}
+
+
+def data_version(db_path=None):
+    """Fingerprint the database, account ledger and archive files.
+
+    Any commit changes the size or modification time of the database or its
+    WAL, and archiving or adding an account changes the file listings, so the
+    version moves whenever anything read from them could.
+    """
+    db_path = db_path or get_db_path()
+    paths = [db_path, f"{db_path}-wal"]
+    for directory in (data_path(ACCOUNTS_DIR), data_path(ARCHIVE_DIR)):
+        if os.path.isdir(directory):
+            paths += sorted(os.path.join(directory, name) for name in os.listdir(directory))
+    stamp = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        stamp.append((path, stat.st_mtime_ns, stat.st_size))
+    return hashlib.sha1(repr(stamp).encode()).hexdigest()[:16]
+
+
+class TransactionStore:
+    """Every transaction held as compact NumPy columns for fast grouped queries.
+
+    Dates are int32 days since 1970, amounts int64 cents in the reporting
+    currency, categories int16 ids and payees int32 codes into a shared
+    dictionary, so a row costs a few dozen bytes. Archived years are loaded
+    alongside the live ledgers, and a split transaction adds a row per split.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path
+        self._clear()
+
+    def _clear(self):
+        self.accounts = [MAIN_ACCOUNT]
+        self.payees = []
+        self.payee_codes = {}
+        # Highest transaction id loaded from each ledger, so refresh() only reads newer rows
+        self.last_ids = {}
+        # data_version and content_version as of the last load or refresh, used to spot changes made elsewhere
+        self.stamp = None
+        self.version = None
+
+        self.account = np.empty(0, dtype=np.int8)
+        self.id = np.empty(0, dtype=np.int64)
+        self.day = np.empty(0, dtype=np.int32)
+        self.period = np.empty(0, dtype=np.int32)
+        self.cents = np.empty(0, dtype=np.int64)
+        self.category = np.empty(0, dtype=np.int16)
+        self.payee = np.empty(0, dtype=np.int32)
+
+    @classmethod
+    def load(cls, db_path=None, archive=None):
+        store = cls(db_path)
+        store.reload(archive)
+        return store
+
+    def reload(self, archive=None):
+        """Read every archived year and ledger again, for changes refresh() can't append."""
+        self._clear()
+        archive = archive or TransactionArchive(self.db_path)
+        frames = [archive.read(year).assign(account=MAIN_ACCOUNT) for year in archive.archived_years()]
+        if frames:
+            self._append(pd.concat(frames, ignore_index=True), track_ids=False)
+        return self.refresh()
+
+    def __len__(self):
+        return len(self.cents)
+
+    @property
+    def nbytes(self):
+        columns = (self.account, self.id, self.day, self.period, self.cents, self.category, self.payee)
+        return sum(column.nbytes for column in columns)
+
+    def refresh(self):
+        """Append transactions added to any ledger since the last load.
+
+        Rows already loaded may have been changed too, such as by a category
+        merge in another process, so those are checked first and the whole
+        store is reloaded if they no longer match. Returns the rows read.
+        """
+        stamp = data_version(self.db_path)
+        conn = connect(self.db_path)
+        try:
+            attach_all_accounts(conn)
+            # One read transaction, so the new rows and the summary of them agree
+            conn.execute('BEGIN')
+            stale = self.version is not None and self.content_version(conn, self.last_ids) != self.version
+            if not stale:
+                df = self._read_new_rows(conn)
+                last_ids = dict(self.last_ids)
+                for name, last_id in df.groupby('account')['id'].max().items():
+                    last_ids[name] = max(last_ids.get(name, 0), int(last_id))
+                version = self.content_version(conn, last_ids)
+        finally:
+            conn.close()
+        if stale:
+            return self.reload()
+        if not df.empty:
+            self._append(df)
+        self.stamp, self.version = stamp, version
+        return len(df)
+
+    def _read_new_rows(self, conn):
+        frames = []
+        for name in [MAIN_ACCOUNT] + list_accounts():
+            schema = 'main' if name == MAIN_ACCOUNT else account_schema(name)
+            params = (self.last_ids.get(name, 0),)
+            frames.append(pd.read_sql_query(
+                f'SELECT {TRANSACTION_COLUMNS} FROM {schema}.transactions WHERE id > ? ORDER BY id',
+                conn, params=params
+            ).assign(account=name))
+            # Split transactions have no category of their own; each split becomes a row instead
+            frames.append(pd.read_sql_query(f"""
+                SELECT {SPLIT_COLUMNS}
+                FROM {schema}.transaction_splits s
+                JOIN {schema}.transactions t ON t.id = s.transaction_id
+                WHERE s.transaction_id > ?
+            """, conn, params=params).assign(account=name))
+        return pd.concat(frames, ignore_index=True)
+
+    def content_version(self, conn, last_ids):
+        """Summarize the rows loaded up to last_ids, on a connection with the ledgers attached.
+
+        Row counts and sums per ledger catch loaded rows that were restored,
+        recategorized or removed, the archive listing catches years archived
+        or restored, and fx_version catches new rates. Rows added since and
+        writes to other tables leave it alone.
+        """
+        ledgers = []
+        for name in [MAIN_ACCOUNT] + list_accounts():
+            schema = 'main' if name == MAIN_ACCOUNT else account_schema(name)
+            params = (last_ids.get(name, 0),)
+            ledgers.append(conn.execute(f"""
+                SELECT COUNT(*), TOTAL(id), TOTAL(amount), TOTAL(id * IFNULL(category_id, -1))
+                FROM {schema}.transactions
+                WHERE id <= ?
+            """, params).fetchone())
+            ledgers.append(conn.execute(f"""
+                SELECT COUNT(*), TOTAL(transaction_id * category_id), TOTAL(amount)
+                FROM {schema}.transaction_splits
+                WHERE transaction_id <= ?
+            """, params).fetchone())
+        archive_dir = TransactionArchive(self.db_path).archive_dir
+        names = sorted(os.listdir(archive_dir)) if os.path.isdir(archive_dir) else []
+        archived = [(name, os.stat(os.path.join(archive_dir, name)).st_mtime_ns)
+                    for name in names if archive_file_year(name) is not None]
+        return ledgers, archived, fx_version(conn)
+
+    def _encode(self, values, codes, dictionary):
+        """Map values to small integer codes, adding unseen ones to the dictionary."""
+        uniques, inverse = np.unique(values, return_inverse=True)
+        mapping = np.empty(len(uniques), dtype=np.int32)
+        for i, value in enumerate(uniques):
+            if value not in codes:
+                codes[value] = len(dictionary)
+                dictionary.append(value)
+            mapping[i] = codes[value]
+        return mapping[inverse]
+
+    def _append(self, df, track_ids=True):
+        dates = pd.to_datetime(df['date'], format='%Y/%m/%d', errors='coerce').to_numpy(dtype='datetime64[D]')
+        days = np.where(np.isnat(dates), -1, (dates - EPOCH).astype(np.int64)).astype(np.int32)
+        # Foreign amounts are converted once here, at the rate in effect on each date
+        rates = get_fx_rates(self.db_path).rates_for(df.get('currency', pd.Series(None, index=df.index)), dates)
+        account_codes = {name: i for i, name in enumerate(self.accounts)}
+
+        new_columns = {
+            'account': self._encode(df['account'].to_numpy(dtype=object), account_codes, self.accounts).astype(np.int8),
+            'id': df['id'].fillna(0).to_numpy(dtype=np.int64),
+            'day': days,
+            'period': (df['year'] * 12 + df['month'] - 1).fillna(-1).to_numpy(dtype=np.int32),
+            # Rows in a currency without rates count as nothing until rates are loaded, which reloads the store
+            'cents': np.rint(np.nan_to_num(df['amount'].fillna(0).to_numpy(dtype=float) * rates) * 100).astype(np.int64),
+            'category': df['category_id'].fillna(NO_CATEGORY).to_numpy(dtype=np.int16),
+            'payee': self._encode(df['payee'].fillna('').to_numpy(dtype=str), self.payee_codes, self.payees),
+        }
+        for name, values in new_columns.items():
+            setattr(self, name, np.concatenate([getattr(self, name), values]))
+
+        if track_ids:
+            for name, last_id in df.groupby('account')['id'].max().items():
+                self.last_ids[name] = max(self.last_ids.get(name, 0), int(last_id))
+
+    def mask(self, start_period=None, end_period=None, account=ALL_ACCOUNTS, category_ids=None):
+        """Boolean selection of rows in a period range, account and set of categories."""
+        selected = np.ones(len(self), dtype=bool)
+        if start_period is not None:
+            selected &= self.period >= start_period
+        if end_period is not None:
+            selected &= self.period <= end_period
+        if account != ALL_ACCOUNTS:
+            code = self.accounts.index(account) if account in self.accounts else -1
+            selected &= self.account == code
+        if category_ids is not None:
+            selected &= np.isin(self.category, list(category_ids))
+        return selected
+
+    def category_totals(self, year, month, account=ALL_ACCOUNTS):
+        """Sum one month's amounts per category id."""
+        period = year * 12 + month - 1
+        selected = self.mask(period, period, account) & (self.category != NO_CATEGORY)
+        cents = np.bincount(self.category[selected], weights=self.cents[selected])
+        present = np.bincount(self.category[selected])
+        return {category_id: cents[category_id] / 100 for category_id in np.flatnonzero(present)}
+
+    def period_totals(self, start_period, end_period, account=ALL_ACCOUNTS, category_ids=None):
+        """Sum amounts into a categories x periods DataFrame, zero where nothing was spent."""
+        selected = self.mask(start_period, end_period, account, category_ids) & (self.category != NO_CATEGORY)
+        categories, rows = np.unique(self.category[selected], return_inverse=True)
+        n_periods = end_period - start_period + 1
+        cells = rows * n_periods + (self.period[selected] - start_period)
+        cents = np.bincount(cells, weights=self.cents[selected], minlength=len(categories) * n_periods)
+        return pd.DataFrame(
+            cents.reshape(len(categories), n_periods) / 100,
+            index=pd.Index(categories.astype(int), name='category_id'),
+            columns=range(start_period, end_period + 1)
+        )
+
+    def comparison_totals(self, year, month, account=ALL_ACCOUNTS):
+        """Same month last year and trailing 3 and 12 month averages per category id."""
+        period = year * 12 + month - 1
+        totals = self.period_totals(period - 12, period - 1, account)
+        values = totals.to_numpy()
+        comparisons = zip(values[:, 0], values[:, -3:].sum(axis=1) / 3, values.sum(axis=1) / 12)
+        return dict(zip(totals.index, comparisons))
+
+    def monthly_totals(self, year, category_ids):
+        """Sum a year's amounts per month and category id, as rows of month, category_id and amount."""
+        selected = self.mask(year * 12, year * 12 + 11, category_ids=category_ids) & (self.category != NO_CATEGORY)
+        cells = self.category[selected].astype(np.int64) * 12 + (self.period[selected] - year * 12)
+        present, inverse = np.unique(cells, return_inverse=True)
+        cents = np.bincount(inverse, weights=self.cents[selected], minlength=len(present))
+        df = pd.DataFrame({'month': present % 12 + 1, 'category_id': present // 12, 'amount': cents / 100})
+        return df.sort_values(['month', 'category_id'], ignore_index=True)
+
+
+def get_transaction_store(db_path=None):
+    """Return the session's transaction store, loading it the first time.
+
+    Only a file stamp is compared while nothing has been written. After any
+    write, including archive restores, rate loads and category merges run
+    from the command line, the store refreshes, which reloads it if rows it
+    had already loaded were changed.
+    """
+    db_path = db_path or get_db_path()
+    if db_path not in _stores:
+        _stores[db_path] = TransactionStore.load(db_path)
+    elif _stores[db_path].stamp != data_version(db_path):
+        _stores[db_path].refresh()
+    return _stores[db_path]
+
+
+def refresh_transaction_store(db_path=None):
+    """Pick up newly imported transactions if the store has been loaded."""
+    db_path = db_path or get_db_path()
+    if db_path in _stores:
+        _stores[db_path].refresh()
+
+
+def invalidate_transaction_store():
+    """Forget loaded stores after rows were changed or removed rather than added."""
+    _stores.clear()
+
+
+# Loaded stores pick up new rows before any page hears about them, as this subscribes first
+subscribe(TRANSACTIONS, lambda change: refresh_transaction_store())
+
+
+if __name__ == "__main__":
+    started = time.perf_counter()
+    store = get_transaction_store()
+    elapsed = time.perf_counter() - started
+    print(f"Loaded {len(store)} transactions in {elapsed:.2f}s")
+    print(f"{store.nbytes:,} bytes in columns, {store.nbytes / max(len(store), 1):.1f} bytes per transaction")
+    print(f"{len(store.payees)} distinct payees, {len(store.accounts)} accounts")